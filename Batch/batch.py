@@ -0,0 +1,236 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+
+from Environment.Environment import Environment
+from Exception.RPALException import RPALException
+from CSE.memo import Memo
+from CSE.nativeLibrary import loadLibraries
+from CSE.programCache import CACHE_DIRECTORY, fileKey
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES, compileFile, loadOrCompileFile
+
+"""
+Batch runner for many RPAL programs (--batch).
+
+The programs, the files of a directory or the paths listed in a manifest, run in a
+pool of worker processes that each import the interpreter once and then run one
+program after another. A worker captures each program's output and error, and
+times its phases. A program still running after the timeout is stopped by killing
+its worker, which is replaced by a new one.
+
+The result is a summary with one record per program, in the order listed:
+
+    {"path": ..., "status": "ok" | "error" | "timeout", "output": ..., "error": ...,
+     "timings": {"compile": seconds, "run": seconds, "total": seconds}}
+
+followed by the totals of the batch.
+"""
+
+DEFAULT_TIMEOUT = 60.0
+
+def listPrograms(source):
+    """
+    Lists the programs of a batch.
+
+    Args:
+        source (str): A directory, whose files (not hidden, not in subdirectories) are
+            the programs, or a manifest file listing one program path per line, relative
+            to the manifest's directory. Blank lines and lines starting with '#' are ignored.
+
+    Returns:
+        list: The program paths, sorted for a directory and in the manifest's order otherwise.
+
+    Raises:
+        RPALException: If the source does not exist or lists no programs.
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in sorted(os.listdir(source))
+                 if not name.startswith(".") and name != CACHE_DIRECTORY and os.path.isfile(os.path.join(source, name))]
+    elif os.path.isfile(source):
+        directory = os.path.dirname(source)
+        with open(source, encoding="utf-8") as manifest:
+            lines = [line.strip() for line in manifest]
+        paths = [os.path.join(directory, line) for line in lines if line and not line.startswith("#")]
+    else:
+        raise RPALException(f"Batch source '{source}' is neither a directory nor a manifest file.")
+    if not paths:
+        raise RPALException(f"Batch source '{source}' lists no programs.")
+    return paths
+
+def runProgram(path, options):
+    """
+    Compiles and runs one program, capturing its output.
+
+    Args:
+        path (str): The program's path.
+        options (dict): The run options: engine, useCache, fold, libraries and
+            memoCapacity (None to not memoize), as given on the command line.
+
+    Returns:
+        dict: The program's record (see the module docstring).
+    """
+    record = {"path": path, "status": "ok", "output": "", "error": None, "timings": {}}
+    timings = record["timings"]
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        # Warnings of the front end are part of the output, as when a program runs alone
+        with contextlib.redirect_stdout(output):
+            with open(path, "rb") as file:
+                if options["useCache"]:
+                    key = fileKey(file, "" if options["fold"] else "no-fold")
+                    controlStructures = loadOrCompileFile(file, path, key, options["fold"])
+                else:
+                    controlStructures = compileFile(file, fold=options["fold"])
+            compiled = time.perf_counter()
+            timings["compile"] = compiled - start
+
+            primitiveVariables = loadLibraries(options["libraries"], PRIMITIVE_ENVIRONMENT_VARIABLES)
+            memo = None
+            if options["memoCapacity"] is not None:
+                memo = Memo(controlStructures, primitiveVariables, options["memoCapacity"])
+            machine = ENGINES[options["engine"]](controlStructures, Environment(0, variables=primitiveVariables), memo)
+            machine.interpret()
+            timings["run"] = time.perf_counter() - compiled
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+    record["output"] = output.getvalue()
+    timings["total"] = time.perf_counter() - start
+    return record
+
+def workerLoop(connection, options):
+    """
+    Runs the programs sent by the batch runner (as (index, path) pairs) until it sends None.
+    """
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        index, path = task
+        connection.send((index, runProgram(path, options)))
+
+class Worker:
+    """
+    A worker process of the batch pool and the program it is running.
+    """
+    def __init__(self, context, options):
+        self.connection, workerConnection = context.Pipe()
+        self.process = context.Process(target=workerLoop, args=(workerConnection, options), daemon=True)
+        self.process.start()
+        # Only the worker holds its end, so the runner sees end of file if it dies
+        workerConnection.close()
+        self.task = None
+        self.started = None
+
+    def send(self, task):
+        self.connection.send(task)
+        self.task = task
+        self.started = time.perf_counter()
+
+    def stop(self):
+        """
+        Kills the worker, abandoning its program.
+        """
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+    def close(self):
+        """
+        Lets an idle worker exit.
+        """
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join()
+        self.connection.close()
+
+def failedRecord(path, status, error, elapsed):
+    return {"path": path, "status": status, "output": "", "error": error, "timings": {"total": elapsed}}
+
+def runBatch(source, jobs, timeout, options):
+    """
+    Runs the programs of a batch in a pool of worker processes.
+
+    Args:
+        source (str): The directory or manifest of the programs (see listPrograms).
+        jobs (int): The number of worker processes (None for one per CPU).
+        timeout (float): The seconds a program may run before its worker is killed.
+        options (dict): The run options (see runProgram).
+
+    Returns:
+        dict: {"programs": [record, ...], "summary": totals} (see the module docstring).
+
+    Raises:
+        RPALException: If the source lists no programs.
+    """
+    paths = listPrograms(source)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(paths)))
+    # Forked workers inherit the interpreter's imports instead of importing it again
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+    start = time.perf_counter()
+    records = [None] * len(paths)
+    pending = list(enumerate(paths))
+    pending.reverse()
+    workers = [Worker(context, options) for _ in range(jobs)]
+    try:
+        while pending or any(worker.task is not None for worker in workers):
+            for worker in workers:
+                if worker.task is None and pending:
+                    worker.send(pending.pop())
+            busy = [worker for worker in workers if worker.task is not None]
+            now = time.perf_counter()
+            deadline = min(worker.started + timeout for worker in busy)
+            ready = wait([worker.connection for worker in busy], max(0.0, deadline - now))
+
+            for index, worker in enumerate(workers):
+                if worker.task is None:
+                    continue
+                taskIndex, path = worker.task
+                elapsed = time.perf_counter() - worker.started
+                if worker.connection in ready:
+                    try:
+                        resultIndex, record = worker.connection.recv()
+                    except EOFError:
+                        # Reaped first, as the exit code is only known once it is
+                        worker.stop()
+                        exitCode = worker.process.exitcode
+                        records[taskIndex] = failedRecord(path, "error", f"Worker exited with code {exitCode}.", elapsed)
+                        workers[index] = Worker(context, options)
+                        continue
+                    records[resultIndex] = record
+                    worker.task = None
+                elif elapsed >= timeout:
+                    worker.stop()
+                    records[taskIndex] = failedRecord(path, "timeout", f"Timed out after {timeout:g} s.", elapsed)
+                    workers[index] = Worker(context, options)
+    finally:
+        for worker in workers:
+            if worker.task is None:
+                worker.close()
+            else:
+                worker.stop()
+    wall = time.perf_counter() - start
+
+    statuses = [record["status"] for record in records]
+    summary = {
+        "programs": len(records),
+        "ok": statuses.count("ok"),
+        "errors": statuses.count("error"),
+        "timeouts": statuses.count("timeout"),
+        "jobs": jobs,
+        "wall": wall,
+        "throughput": len(records) / wall if wall > 0 else None,
+        "timings": {
+            phase: sum(record["timings"].get(phase, 0.0) for record in records)
+            for phase in ("compile", "run", "total")
+        },
+    }
+    return {"programs": records, "summary": summary}
@@ -1,15 +1,30 @@
 from Environment.Environment import Environment
 from Exception.RPALException import RPALException
-from CSE.generateCS import ControlStructure, Eta, Lambda, Tau
+from CSE.generateCS import Constant, ControlStructure, Eta, Lambda, Rec, Tau
+from Parser.resolver import Reference
+from CSE.values import DUMMY, MISSING, NIL, Native, Primitive, RPALTuple
+from CSE.operators import BINARY_FUNCTIONS, BUILTIN_OPERATOR_FUNCTIONS, UNARY_FUNCTIONS, conc, formatValue
 from Tokenizer.tokenizer import Token
 
 # List of supported binary and unary operators
-BINARY_OPERATORS = ["+", "-", "*", "/", "eq", "gr", "ge", "ls", "le","aug"]
+BINARY_OPERATORS = ["+", "-", "*", "/", "**", "eq", "ne", "gr", "ge", "ls", "le", "aug", "&", "or"]
 UNARY_OPERATORS = ["not", "neg"]
 BUILTIN_FUNCTIONS = ['print']
 OTHER_KEYWORDS = ['nil', 'Y',"Print"]
 BUILTIN_OPERATORS = ['conc', 'stem', 'stern', 'isInteger', 'isString', 'isTruthValue', 'isFunction', 'isTuple', 'isDummy','order', 'null']
 
+# Marks the end of an application made by a native function through CSEMachine.call
+CALL_MARKER = object()
+
+class MemoStore:
+    """
+    A control element storing the result of a memoized application under its key.
+    """
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
 class CSEMachine:
     """
     The CSEMachine class implements the Control Stack Environment (CSE) machine
@@ -17,16 +32,23 @@ class CSEMachine:
     It manages control structures, environments, and a stack to interpret and execute code.
     """
 
-    def __init__(self, controls, environment):
+    def __init__(self, controls, environment, memo=None):
         """
         Initializes the CSEMachine with the given control structures and environment.
         Sets up the control stack and main stack for execution.
+        Applications of the functions memoized by `memo` (a CSE.memo.Memo), if given,
+        are looked up in and stored to it.
         """
         self.controls = controls
+        self.environment = environment
+        self.memo = memo
         self.controlStack = []
         self.stack = []
+        # One (saved environment, stack height) pair per function body being evaluated
+        self.frames = [(environment, 0)]
         self.currentEnvironment = environment
-        self.environments = [ environment ]  # List to keep track of all environments
+        # Environments are only referenced by closures and frames, so they are
+        # reclaimed as soon as nothing live refers to them
         self.totalEnvironments = 1
 
         self.controlStack.append(self.currentEnvironment)
@@ -41,8 +63,6 @@ class CSEMachine:
             raise RPALException("Control structure with number 0 is not a valid ControlStructure.")
         self.insertControlStructure(defaultControl)
 
-        self.stack.append(self.currentEnvironment)
-
         #print("Initial Conditions:")
         #self.printStack('control')
         #self.printStack('main')
@@ -61,11 +81,11 @@ class CSEMachine:
                     printable = f"e({item.number})"
                 elif type(item) is Lambda:
                     if item.c is not None:
-                        printable = f"<{item.c} lambda({item.variables} {item.k})>"
+                        printable = f"<{item.c.number} lambda({item.variables} {item.k})>"
                     else:
                         printable = f"<lambda({item.variables} {item.k})>"
                 elif type(item) is Eta:
-                    printable = f"<{item.c} eta({item.variables} {item.k})>"
+                    printable = f"<{item.c.number} eta({item.variables} {item.k})>"
                 elif type(item) is Tau:
                     printable = f"tau({item.elementNumber})"
                 else:
@@ -83,11 +103,11 @@ class CSEMachine:
                     printable = f"e({item.number})"
                 elif type(item) is Lambda:
                     if item.c is not None:
-                        printable = f"<{item.c} lambda({item.variables} {item.k})>"
+                        printable = f"<{item.c.number} lambda({item.variables} {item.k})>"
                     else:
                         printable = f"<lambda({item.variables} {item.k})>"
                 elif type(item) is Eta:
-                    printable = f"<{item.c} eta({item.variables} {item.k})>"
+                    printable = f"<{item.c.number} eta({item.variables} {item.k})>"
                 elif type(item) is Tau:
                     printable = f"tau({item.elementNumber})"
                 else:
@@ -95,20 +115,14 @@ class CSEMachine:
                 print(printable, end=",")
         print()
 
-    def findEnvironment(self, number):
-        """
-        Finds and returns the environment with the specified number.
-        Raises an exception if not found.
-        """
-        for env in self.environments:
-            if env.number == number:
-                return env
-        raise RPALException(f"Environment with number {number} not found.")
     def findControlStructure(self, number):
         """
         Finds and returns the control structure with the specified number.
         Raises an exception if not found.
         """
+        # Control structures are generated in order, so the number is usually the index
+        if number < len(self.controls) and self.controls[number].number == number:
+            return self.controls[number]
         for control in self.controls:
             if control.number == number:
                 return control
@@ -123,126 +137,133 @@ class CSEMachine:
             self.controlStack.append(element)
     
 
+    def pushFrame(self, newEnv):
+        """
+        Enters the body of a function application in the environment newEnv.
+        Saves the caller's environment and the stack height on the frame stack and marks the
+        end of the body with newEnv on the control stack, so rule 5 returns in constant time.
+
+        An application is in tail position when the next control element is the caller's
+        marker (with the stack back at the caller's height). The caller has nothing left
+        to do, so its frame is replaced and tail-recursive loops run in constant stack space;
+        rule 5 at the end of the callee then returns straight to the caller's caller.
+        """
+        savedEnvironment = self.currentEnvironment
+        if type(self.controlStack[-1]) is Environment and len(self.stack) == self.frames[-1][1]:
+            self.controlStack.pop()
+            savedEnvironment = self.frames.pop()[0]
+        self.frames.append((savedEnvironment, len(self.stack)))
+        self.controlStack.append(newEnv)
+        self.currentEnvironment = newEnv
+
     def rule1(self):
         """
         CSE Rule 1: Handles variable lookup.
         Pops a variable name from the control stack, looks up its value in the current environment,
-        and pushes the value onto the stack.
+        and pushes the value onto the stack. Resolved identifiers are found through their lexical address,
+        and constants push their value.
         """
         name = self.controlStack.pop()
 
-        value = self.currentEnvironment.lookUpValue(name)
+        if type(name) is Constant:
+            value = name.value
+        elif type(name) is Reference:
+            value = self.currentEnvironment.lookUpReference(name)
+        else:
+            value = self.currentEnvironment.lookUpValue(name)
         self.stack.append(value)
         return
 
     def rule2(self):
         """
         CSE Rule 2: Handles lambda.
-        Pops a Lambda control structure from the control stack, sets its environment,
-        and pushes it onto the stack.
+        Pops a Lambda control structure from the control stack and pushes a closure
+        of it over the current environment onto the stack. The control structure's
+        own Lambda is left untouched, so closures made in different environments
+        never share one.
         """
         lambdaControl = self.controlStack.pop()
         if (type(lambdaControl) is not Lambda):
             raise RPALException("Expected a Lambda control structure.")
         
-        lambdaControl.setC(self.currentEnvironment.number)
-        self.stack.append(lambdaControl)
+        closure = Lambda(lambdaControl.k, lambdaControl.variables)
+        closure.setC(self.currentEnvironment)
+        self.stack.append(closure)
         return
     
+    def ruleRec(self):
+        """
+        Handles a recursive definition.
+        Pops a Rec from the control stack and pushes the functions it defines, made
+        as closures over a new environment (whose parent is the current one) binding
+        the definition's variables to them.
+        """
+        rec = self.controlStack.pop()
+        frame = Environment(self.totalEnvironments, self.currentEnvironment, values=[None] * len(rec.variables))
+        self.totalEnvironments += 1
+        self.stack.append(rec.close(frame))
+        return
+
     def rule3(self):
         """
         CSE RULE 3 Handles various unary and binary operations for the RPAL abstract machine.
 
         This function pops an operator from the stack and applies the corresponding operation
-        to the operands on the stack. The supported operations include string concatenation,
-        string manipulation, type checking, and tuple/list operations
+        (looked up in CSE.operators) to the operands on the stack. The supported operations
+        include string concatenation, string manipulation, type checking, and tuple/list operations
 
         Raises:
             RPALException: If operand types do not match the requirements of the operation.
 
         Notes:
-            - For 'conc', both operands must be strings. The function strips single quotes before concatenation.
+            - For 'conc', both operands must be strings.
             - For 'isTuple', only non-empty lists are considered tuples.
-            - For 'null', if the value is "nil", returns True. Otherwise, expects a list and checks if it is empty.
+            - For 'null', if the value is nil, returns True. Otherwise, expects a list and checks if it is empty.
         """
         self.controlStack.pop()
         #print("popping gamma")
         operator = self.stack.pop()
-        if operator == 'conc':
+        if operator.name == 'conc':
             self.controlStack.pop()  # Pop 'gamma' control structure since it is a binary operation
             #print("concatenating strings")
             value1 = self.stack.pop()
             value2 = self.stack.pop()
-            if type(value1) is not str or type(value2) is not str:
-                raise RPALException("Both operands must be strings for 'conc' operation.")
-            result = value1.strip("'") + value2.strip("'")
-            self.stack.append(result)
-        elif operator == 'stem':
-            #print("getting first character of string")
-            value = self.stack.pop()
-            if type(value) is not str:
-                raise RPALException("Operand must be a string for 'stem' operation.")
-            result = value[0] if len(value) > 0 else ''
-            self.stack.append(result)
-        elif operator == 'stern':
-            #print("getting rest of string after first character")
-            value = self.stack.pop()
-            if type(value) is not str:
-                raise RPALException("Operand must be a string for 'stern' operation.")
-            result = value[1:] if len(value) > 1 else ''
-            self.stack.append(result)
-        elif operator == 'isInteger':
-            #print("checking if value is an integer")
-            value = self.stack.pop()
-            result = isinstance(value, int)
-            self.stack.append(result)
-        elif operator == 'isString':
-            #print("checking if value is a string")
-            value = self.stack.pop()
-            result = isinstance(value, str)
-            self.stack.append(result)
-        elif operator == 'isTruthValue':
-            #print("checking if value is a truth value")
-            value = self.stack.pop()
-            result = isinstance(value, bool)
-            self.stack.append(result)
-        elif operator == 'isFunction':
-            #print("checking if value is a function")
-            value = self.stack.pop()
-            result = isinstance(value, Lambda) or isinstance(value, Eta)
-            self.stack.append(result)
-        elif operator == 'isTuple':
-            #print("checking if value is a tuple")
-            value = self.stack.pop()
-            result = isinstance(value, list) and len(value) > 0
-            self.stack.append(result)
-        elif operator == 'isDummy':
-            #print("checking if value is a dummy token")
-            value = self.stack.pop()
-            result = isinstance(value, Token) and value.getType() == "DUMMY"
-            self.stack.append(result)
-        elif operator == "order":
-            value = self.stack.pop()
-            if type(value) is not list:
-                raise RPALException("Operand must be a list for 'order' operation.")
-            result = len(value)
-            self.stack.append(result)
-        elif operator == "null":
-            #print("checking if value is nil")
+            self.stack.append(conc(value1, value2))
+        else:
             value = self.stack.pop()
-            if value == "nil":
-                result = True
-            else:
-                if type(value) is not list:
-                    raise RPALException("Operand must be a list for 'null' operation.")
-                result = (len(value) == 0)
+            self.stack.append(BUILTIN_OPERATOR_FUNCTIONS[operator.name](value))
+
+    def memoized(self, closure, value):
+        """
+        Looks up the application of a closure to a value in the memo table. On a hit,
+        pushes the result and returns True; on a miss, schedules storing the result
+        once the function body has been evaluated and returns False.
+        """
+        if self.memo is None:
+            return False
+        key = self.memo.key(closure, value)
+        if key is None:
+            return False
+        result = self.memo.lookUp(key)
+        if result is not MISSING:
             self.stack.append(result)
+            return True
+        # Below the body's environment marker, so the call is never taken for a tail call
+        self.controlStack.append(MemoStore(key))
+        return False
+
+    def storeMemoized(self):
+        """
+        Stores the result of a memoized application, on top of the stack, in the memo table.
+        """
+        self.memo.store(self.controlStack.pop().key, self.stack[-1])
 
     def rule4(self):
         """
         CSE Rule 4: Handles function application (gamma) to lambda.
         Pops 'gamma' from the control stack, applies a Lambda function to a value,
         creates a new environment, and updates the control and main stacks accordingly.
+        A call in tail position replaces the caller's frame (see pushFrame).
         """
         self.controlStack.pop()
         lambdaControl = self.stack.pop()
@@ -250,14 +271,10 @@ class CSEMachine:
         if (type(lambdaControl) is not Lambda):
             raise RPALException("Expected a Lambda control structure.")
         
-        variable = lambdaControl.variables[0] if len(lambdaControl.variables) == 1 else lambdaControl.variables
-        if type(variable) is Token:
-            variable = variable.getValue()
-        
         value = self.stack.pop()
+        if self.memoized(lambdaControl, value):
+            return
         
-        if type(value) is Token:
-            value = value.getValue()
         #find the control structure for the lambda
         newControl = self.findControlStructure(lambdaControl.k)
 
@@ -265,46 +282,27 @@ class CSEMachine:
             raise RPALException(f"Control structure with number {lambdaControl.k} is not a valid ControlStructure.")
         #print('searching for parent environment with number', lambdaControl.c)
         
-        parentEnv = self.findEnvironment(lambdaControl.c)
+        parentEnv = lambdaControl.c
         if type(parentEnv) is not Environment:
-            raise RPALException(f"Parent environment with number {lambdaControl.c} is not a valid Environment.")
-        # Create a new environment for the lambda binding with new variable
-        newEnv = Environment(self.totalEnvironments, parentEnv, {variable: value})
-        #print(f"Creating new environment {newEnv.number} with parent {parentEnv.number} and variable binding {variable}: {value}")
-        self.currentEnvironment = newEnv
-        self.environments.append(newEnv)
+            raise RPALException(f"Parent environment of lambda {lambdaControl.k} is not a valid Environment.")
+        # Create a new frame for the lambda binding with new variable in slot 0
+        newEnv = Environment(self.totalEnvironments, parentEnv, values=[value])
+        #print(f"Creating new environment {newEnv.number} with parent {parentEnv.number} and variable binding {value}")
         self.totalEnvironments += 1
         #print(f"Total environments: {self.totalEnvironments}")
 
-        self.controlStack.append(newEnv)
+        self.pushFrame(newEnv)
         self.insertControlStructure(newControl)
-
-        self.stack.append(newEnv)
         return
     
     def rule5(self):
         """
         CSE Rule 5: Handles environment removal.
-        Pops the environment from the control stack and removes the corresponding environment from the stack.
+        Pops the environment marker from the control stack and the frame from the frame stack,
+        and restores the environment saved when the function body was entered.
         """
         self.controlStack.pop()
-        # Traverse the stack to find and pop the first Environment object
-        for i in range(len(self.stack)-1, -1, -1):
-            if type(self.stack[i]) is Environment:
-                self.stack.pop(i)
-                break
-        
-        # Traverse the control stack to find the first Environment object
-        nextEnv = None
-        #print("searching for next environment in control stack")
-        #print(self.controlStack)
-        for i in range(len(self.controlStack)-1, -1, -1):
-            #print(f"Checking control stack item at index {i}: {self.controlStack[i]}")
-            if type(self.controlStack[i]) is Environment:
-                nextEnv = self.controlStack[i]
-                #print(f"Found next environment: {nextEnv.number}")
-                break
-        self.currentEnvironment = nextEnv
+        self.currentEnvironment = self.frames.pop()[0]
         #print(f"Current environment set to {self.currentEnvironment.number} after rule 5 execution.")
 
     def rule6(self):
@@ -317,38 +315,8 @@ class CSEMachine:
 
         operand1 = self.stack.pop()
         operand2 = self.stack.pop()
-        if type(operand1) is Token:
-            operand1 = operand1.getValue()
-        if type(operand2) is Token:
-            operand2 = operand2.getValue()
-        
-        if operator == "+":
-            result = operand1 + operand2
-        elif operator == "-":
-            result = operand1 - operand2
-        elif operator == "*":
-            result = operand1 * operand2
-        elif operator == "/":
-            if operand2 == 0:
-                raise RPALException("Division by zero.")
-            result = int(operand1 / operand2)
-        elif operator == "eq":
-            result = (operand1 == operand2)
-        elif operator == "gr":
-            result = (operand1 > operand2)
-        elif operator == "ge":
-            result = (operand1 >= operand2)
-        elif operator == "ls":
-            result = (operand1 < operand2)
-        elif operator == "le":
-            result = (operand1 <= operand2)
-        elif operator == "aug":
-            if operand1 == "nil":
-                result = [operand2]
-            elif type(operand1) is list:
-                result = operand1 + [operand2]
         
-
+        result = BINARY_FUNCTIONS[operator](operand1, operand2)
         self.stack.append(result)
         return
 
@@ -361,16 +329,7 @@ class CSEMachine:
         operator = self.controlStack.pop()
         operand = self.stack.pop()
 
-        if type(operand) is Token:
-            operand = operand.getValue()
-
-        if operator == "not":
-            result = not operand
-        elif operator == "neg":
-            result = -operand
-        elif operator == "print":
-            print(operand)	
-        
+        result = UNARY_FUNCTIONS[operator](operand)
         self.stack.append(result)
         return
     
@@ -397,13 +356,13 @@ class CSEMachine:
         """
         CSE Rule 9: Handles tuple construction (tau).
         Pops a Tau control structure from the control stack and collects the specified number of elements from the stack,
-        then pushes the constructed tuple (as a list) onto the stack.
+        then pushes the constructed tuple (an RPALTuple) onto the stack.
         """
         tau = self.controlStack.pop()
         if type(tau) is not Tau:
             raise RPALException("Expected 'tau' in control stack.")
         
-        if len(self.stack) > 0 and self.stack[-1] == "nil":
+        if len(self.stack) > 0 and self.stack[-1] == NIL:
             return
 
 
@@ -411,23 +370,17 @@ class CSEMachine:
         
         listOfElements = []
         for i in range(numberOfElements):
-            if len(self.stack) == 0:
+            if len(self.stack) == self.frames[-1][1]:
+                # Do not pop past the start of the current function body
                 return
-            element = self.stack.pop()
-            if type(element) is Environment:
-                return
-            if type(element) is Token:
-                element = element.getValue()
-            if type(element) is str:
-                element = element.strip("'")
-            listOfElements.append(element)
+            listOfElements.append(self.stack.pop())
 
-        self.stack.append(listOfElements)
+        self.stack.append(RPALTuple(listOfElements))
 
     def rule10(self):
         """
         CSE Rule 10: Handles tuple element selection.
-        Pops 'gamma' from the control stack, a tuple (list) from the stack, and an index from the stack.
+        Pops 'gamma' from the control stack, a tuple (RPALTuple) from the stack, and an index from the stack.
         Pushes the selected tuple element onto the stack (1-based indexing).
         """
         gamma = self.controlStack.pop()
@@ -435,10 +388,10 @@ class CSEMachine:
 
         if type(gamma) is not str or gamma != "gamma":
             raise RPALException("Expected 'gamma' in control stack.")
-        if type(tupleElements) is not list:
+        if type(tupleElements) is not RPALTuple:
             raise RPALException("Expected a list of elements on the stack for 'gamma' operation.")
         index = self.stack.pop()
-        if not isinstance(index, int):
+        if type(index) is not int:
             raise RPALException("Index must be an integer.")
         if index < 0 or index-1 >= len(tupleElements):
             raise RPALException("Index out of bounds for tuple elements.")
@@ -459,29 +412,21 @@ class CSEMachine:
         if type(lambdaControl) is not Lambda:
             raise RPALException("Expected a Lambda control structure on the stack for 'gamma' operation.")
         values = self.stack.pop()
-        if type(values) is not list:
+        if type(values) is not RPALTuple:
             raise RPALException("Expected a list of names on the stack for 'gamma' operation.")
         if len(values) != len(lambdaControl.variables):
             raise RPALException("Number of names does not match number of variables in lambda.")
+        if self.memoized(lambdaControl, values):
+            return
 
-        dataDict = {}
-        for var, name in zip(lambdaControl.variables, values):
-            if type(var) is Token:
-                var = var.getValue()
-            if type(name) is Token:
-                name = name.getValue()
-            dataDict[var] = name
-        parentEnv = self.findEnvironment(lambdaControl.c)
+        parentEnv = lambdaControl.c
         if type(parentEnv) is not Environment:
-            raise RPALException(f"Parent environment with number {lambdaControl.c} is not a valid Environment.")
-        # Create a new environment for the lambda application
-        newEnv = Environment(self.totalEnvironments, parentEnv, dataDict)
-        #print(f"Creating new environment {newEnv.number} with parent {parentEnv.number} and variable bindings: {dataDict}")
-        self.currentEnvironment = newEnv
-        self.environments.append(newEnv)
+            raise RPALException(f"Parent environment of lambda {lambdaControl.k} is not a valid Environment.")
+        # Create a new frame for the lambda application, binding the values by slot in order
+        newEnv = Environment(self.totalEnvironments, parentEnv, values=list(values))
+        #print(f"Creating new environment {newEnv.number} with parent {parentEnv.number} and variable bindings: {values}")
         self.totalEnvironments += 1
-        self.controlStack.append(newEnv)
-        self.stack.append(newEnv)
+        self.pushFrame(newEnv)
         newControl = self.findControlStructure(lambdaControl.k)
         if type(newControl) is not ControlStructure:
             raise RPALException(f"Control structure with number {lambdaControl.k} is not a valid ControlStructure.")
@@ -499,7 +444,7 @@ class CSEMachine:
         if gamma != "gamma":
             raise RPALException("Expected 'gamma' in control stack.")
         yStar = self.stack.pop()
-        if yStar != "Y":
+        if type(yStar) is not Primitive or yStar.name != "Y":
             raise RPALException("Expected 'Y' for yStar in control stack.")
         lambdaControl = self.stack.pop()
         if type(lambdaControl) is not Lambda:
@@ -530,59 +475,70 @@ class CSEMachine:
         Pops a built-in function name from the control stack and applies it to the top of the stack.
         """
         self.controlStack.pop()  # Pop 'gamma'
-        functionName = self.stack.pop()
+        functionName = self.stack.pop().name
         if functionName not in BUILTIN_FUNCTIONS:
             raise RPALException(f"Unknown built-in function: {functionName}")
         
         value = self.stack.pop()
         
         if functionName == "print":
-            if type(value) is Token:
-                value = value.getValue()
-            elif type(value) is Lambda:
-                if len(value.variables) == 1:
-                    variable = value.variables[0]
-                    if type(variable) is Token:
-                        variable = variable.getValue()
-                    value = f"[lambda closure: {variable}: {value.k}]"
-                else:
-                    variables = [v.getValue() if isinstance(v, Token) else v for v in value.variables]
-                    value = f"[lambda closure: {variables}: {value.k}]"
-            elif type(value) is list:
-                temp = []
-                for item in value:
-                    if type(item) is Token:
-                        temp.append(item.getValue())
-                    else:
-                        if type(item) is Lambda:
-                            if len(item.variables) == 1:
-                                variable = item.variables[0]
-                                if type(variable) is Token:
-                                    variable = variable.getValue()
-                                temp.append(f"[lambda closure: {variable}: {item.k}]")
-                            else:
-                                variables = [v.getValue() if isinstance(v, Token) else v for v in item.variables]
-                                temp.append(f"[lambda closure: {variables}: {item.k}]")
-                        else:
-                            temp.append(str(item))
-                value = "(" + ", ".join(temp) + ")"
-            else:
-                value = str(value).strip("'")
-            print(value, end="")
+            print(formatValue(value), end="")
+        self.stack.append(DUMMY)
 
         return
 
+    def applyNative(self):
+        """
+        Handles the application of a native library function.
+        Pops 'gamma' from the control stack and the function and its argument from the stack,
+        and pushes the result (a native awaiting more arguments, or the function's value).
+        """
+        self.controlStack.pop()
+        native = self.stack.pop()
+        value = self.stack.pop()
+        self.stack.append(native.apply(value, self.call))
+
+    def call(self, function, argument):
+        """
+        Applies a function value to an argument on behalf of a native function and
+        returns the result, running the machine until the application is done.
+        The application is entered below a marker, so it is never taken for a tail call.
+        """
+        self.controlStack.append(CALL_MARKER)
+        height = len(self.controlStack)
+        self.stack.append(argument)
+        self.stack.append(function)
+        self.controlStack.append("gamma")
+        self.interpret(height)
+        self.controlStack.pop()
+        return self.stack.pop()
+
         
 
-    def interpret(self):
+    def evaluate(self):
+        """
+        Evaluates control structure 0 in the machine's environment and returns its value.
+        Can be called again after structure 0 is replaced by a later program (see
+        Session.session), which may use the closures made by the earlier ones.
+        """
+        self.controlStack = [self.environment]
+        self.stack = []
+        self.frames = [(self.environment, 0)]
+        self.currentEnvironment = self.environment
+        self.insertControlStructure(self.findControlStructure(0))
+        self.interpret()
+        return self.stack.pop()
+
+    def interpret(self, height=0):
         """
         Main interpreter loop.
-        Processes the control stack and applies the appropriate rules until the control stack is empty.
+        Processes the control stack and applies the appropriate rules until the control stack is empty
+        (or back to `height` elements, for a call from a native function).
         Returns the final result of the computation.
         """
-        while len(self.controlStack) > 0:
+        while len(self.controlStack) > height:
             #NOTE : The rule numbers are similar to the ones in the lecture note.
-            if type(self.controlStack[-1]) is Token or self.controlStack[-1] in OTHER_KEYWORDS:
+            if type(self.controlStack[-1]) is Constant or type(self.controlStack[-1]) is Reference or type(self.controlStack[-1]) is Token or self.controlStack[-1] in OTHER_KEYWORDS:
                 #print("Rule 1")
                 self.rule1()
                 #self.printStack('control')
@@ -592,7 +548,11 @@ class CSEMachine:
                 self.rule2()
                 #self.printStack('control')
                 #self.printStack('main')
-            elif self.controlStack[-1] == "gamma" and type(self.stack[-1]) is str and self.stack[-1] in BUILTIN_OPERATORS:
+            elif type(self.controlStack[-1]) is Rec:
+                self.ruleRec()
+            elif type(self.controlStack[-1]) is MemoStore:
+                self.storeMemoized()
+            elif self.controlStack[-1] == "gamma" and type(self.stack[-1]) is Primitive and self.stack[-1].name in BUILTIN_OPERATORS:
                 #print("Rule 3")
                 self.rule3()
                 #self.printStack('control')
@@ -627,7 +587,7 @@ class CSEMachine:
                 self.rule9()
                 #self.printStack('control')
                 #self.printStack('main')
-            elif self.controlStack[-1] == "gamma" and type(self.stack[-1]) is list and len(self.stack[-1]) > 0:
+            elif self.controlStack[-1] == "gamma" and type(self.stack[-1]) is RPALTuple and len(self.stack[-1]) > 0:
                 #print("Rule 10")
                 self.rule10()
                 #self.printStack('control')
@@ -637,17 +597,19 @@ class CSEMachine:
                 self.rule11()
                 #self.printStack('control')
                 #self.printStack('main')
-            elif self.controlStack[-1] == "gamma" and type(self.stack[-1]) is str and self.stack[-1] == "Y":
+            elif self.controlStack[-1] == "gamma" and type(self.stack[-1]) is Primitive and self.stack[-1].name == "Y":
                 #print("Rule 12")
                 self.rule12()
                 #self.printStack('control')
                 #self.printStack('main')
+            elif self.controlStack[-1] == "gamma" and type(self.stack[-1]) is Native:
+                self.applyNative()
             elif self.controlStack[-1] == "gamma" and type(self.stack[-1]) is Eta:
                 #print("Rule 13")
                 self.rule13()
                 #self.printStack('control')
                 #self.printStack('main')
-            elif self.controlStack[-1] == "gamma" and self.stack[-1] in BUILTIN_FUNCTIONS:
+            elif self.controlStack[-1] == "gamma" and type(self.stack[-1]) is Primitive and self.stack[-1].name in BUILTIN_FUNCTIONS:
                 #print("Rule Builtin Function")
                 self.builtinFunction()
                 #self.printStack('control')
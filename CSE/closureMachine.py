@@ -0,0 +1,402 @@
+import sys
+import threading
+
+from Environment.Environment import Environment
+from Exception.RPALException import RPALException
+from CSE.generateCS import Constant, ControlStructure, Eta, Lambda, Rec, Tau
+from CSE.values import DUMMY, MISSING, NIL, Native, Primitive, RPALTuple
+from CSE.operators import BINARY_FUNCTIONS, BUILTIN_OPERATOR_FUNCTIONS, UNARY_FUNCTIONS, conc, formatValue
+from CSE.CSEMachine import BUILTIN_FUNCTIONS, OTHER_KEYWORDS
+from Parser.resolver import Reference
+from Tokenizer.tokenizer import Token
+
+# Python recursion limit and thread stack size while a program runs. Every RPAL
+# application that is not in tail position nests about three Python calls, which
+# since Python 3.11 take no C stack, so the limit is set for recursion as deep as
+# the CSE machine's (hundreds of thousands of levels and more)
+RECURSION_LIMIT = 100_000_000
+STACK_SIZE = 512 * 1024 * 1024
+
+class TailCall:
+    """
+    An application in tail position, returned to the application loop of the
+    caller instead of being made, so tail-recursive loops run in constant stack space.
+    """
+    __slots__ = ("function", "argument")
+
+    def __init__(self, function, argument):
+        self.function = function
+        self.argument = argument
+
+class ConcPartial:
+    """
+    'Conc' applied to its first argument, waiting for the second.
+    """
+    __slots__ = ("first",)
+
+    def __init__(self, first):
+        self.first = first
+
+def makeClosure(k, variables, environment):
+    """
+    Returns a closure of the lambda with body k over the given environment.
+    """
+    closure = Lambda(k, variables)
+    closure.c = environment
+    return closure
+
+def tupleOf(values):
+    """
+    Returns the value of a tau over its elements' values, as rule 9 of the CSE
+    machine builds it: a tuple whose first element is nil is nil itself.
+    """
+    if values[0] == NIL:
+        return NIL
+    return RPALTuple(values)
+
+class ClosureRuntime:
+    """
+    Runs programs compiled into Python functions, one per function body: applies
+    function values, loops over tail calls and evaluates the program in a thread
+    with a large stack. Shared by ClosureMachine and the modules written by
+    CSE.transpiler.
+    """
+
+    def __init__(self, environment=None, memo=None):
+        """
+        Initializes the runtime for a program run in the given environment.
+        bodies[k] is the compiled body of the lambdas with control structure k,
+        and bodies[0] the program itself. Applications of the functions memoized
+        by `memo` (a CSE.memo.Memo), if given, are looked up in and stored to it.
+        """
+        self.environment = environment
+        self.bodies = []
+        self.totalEnvironments = 1
+        self.memo = memo
+        self.memoized = memo.functions if memo is not None else ()
+
+    def closeRec(self, rec, environment):
+        """
+        Makes the functions of a recursive definition, over a new environment binding them.
+        """
+        self.totalEnvironments += 1
+        return rec.close(Environment(self.totalEnvironments, environment, values=[None] * len(rec.variables)))
+
+    def tailApply(self, function, argument):
+        """
+        Makes an application in tail position: functions are returned to the
+        application loop of the enclosing function as a TailCall.
+        """
+        if type(function) is Lambda or type(function) is Eta:
+            return TailCall(function, argument)
+        return self.apply(function, argument)
+
+    def apply(self, function, argument):
+        """
+        Applies a function value to an argument, running tail calls in a loop.
+        """
+        bodies = self.bodies
+        while True:
+            functionType = type(function)
+            if functionType is Lambda:
+                if function.k in self.memoized:
+                    return self.applyMemoized(function, argument)
+                # Rules 4 and 11
+                variables = function.variables
+                if len(variables) == 1:
+                    values = [argument]
+                else:
+                    if type(argument) is not RPALTuple:
+                        raise RPALException("Expected a list of names on the stack for 'gamma' operation.")
+                    if len(argument) != len(variables):
+                        raise RPALException("Number of names does not match number of variables in lambda.")
+                    values = list(argument)
+                self.totalEnvironments += 1
+                result = bodies[function.k](Environment(self.totalEnvironments, function.c, values=values))
+                if type(result) is TailCall:
+                    function = result.function
+                    argument = result.argument
+                    continue
+                return result
+            if functionType is Eta:
+                # Rule 13: apply the lambda to the eta itself, then the result to the argument
+                function = self.apply(function.toLambda(), function)
+                continue
+            if functionType is Primitive:
+                return self.applyPrimitive(function.name, argument)
+            if functionType is ConcPartial:
+                return conc(function.first, argument)
+            if functionType is Native:
+                return function.apply(argument, self.apply)
+            if functionType is RPALTuple and len(function) > 0:
+                return self.select(function, argument)
+            raise RPALException(f"Illegal Function Appication")
+
+    def applyMemoized(self, function, argument):
+        """
+        Applies a memoized function, through the memo table. The body's tail calls are
+        made before its result is stored, so they are not looped over.
+        """
+        key = self.memo.key(function, argument)
+        if key is not None:
+            result = self.memo.lookUp(key)
+            if result is not MISSING:
+                return result
+        if len(function.variables) == 1:
+            values = [argument]
+        else:
+            if type(argument) is not RPALTuple:
+                raise RPALException("Expected a list of names on the stack for 'gamma' operation.")
+            if len(argument) != len(function.variables):
+                raise RPALException("Number of names does not match number of variables in lambda.")
+            values = list(argument)
+        self.totalEnvironments += 1
+        result = self.bodies[function.k](Environment(self.totalEnvironments, function.c, values=values))
+        if type(result) is TailCall:
+            result = self.apply(result.function, result.argument)
+        if key is not None:
+            self.memo.store(key, result)
+        return result
+
+    def applyPrimitive(self, name, argument):
+        """
+        Rules 3 and 12 and the built-in functions.
+        """
+        operator = BUILTIN_OPERATOR_FUNCTIONS.get(name)
+        if operator is not None:
+            return operator(argument)
+        if name == "conc":
+            return ConcPartial(argument)
+        if name == "Y":
+            if type(argument) is not Lambda:
+                raise RPALException("Expected a Lambda control structure on the stack for 'gamma' operation.")
+            return Eta(argument)
+        if name in BUILTIN_FUNCTIONS:
+            print(formatValue(argument), end="")
+            return DUMMY
+        raise RPALException(f"Illegal Function Appication")
+
+    def select(self, tupleElements, index):
+        """
+        Rule 10: tuple element selection (1-based).
+        """
+        if type(index) is not int:
+            raise RPALException("Index must be an integer.")
+        if index < 0 or index-1 >= len(tupleElements):
+            raise RPALException("Index out of bounds for tuple elements.")
+        return tupleElements[index-1]
+
+    def illegal(self):
+        """
+        Raises the error for an element that cannot be evaluated.
+        """
+        raise RPALException(f"Illegal Function Appication")
+
+    def run(self):
+        """
+        Evaluates the program in its environment and returns its value.
+        """
+        return self.bodies[0](self.environment)
+
+    def interpret(self):
+        """
+        Runs the program in a thread with a large stack and recursion limit, so deep
+        (non-tail) recursion runs as deep as on the CSE machine, up to about
+        RECURSION_LIMIT / 3 levels. Errors are raised in the calling thread.
+
+        Returns:
+            The value of the program.
+        """
+        errors = []
+        results = []
+        def target():
+            try:
+                results.append(self.run())
+            except BaseException as e:
+                errors.append(e)
+
+        recursionLimit = sys.getrecursionlimit()
+        stackSize = threading.stack_size()
+        sys.setrecursionlimit(RECURSION_LIMIT)
+        try:
+            threading.stack_size(STACK_SIZE)
+            thread = threading.Thread(target=target)
+            thread.start()
+            thread.join()
+        finally:
+            threading.stack_size(stackSize)
+            sys.setrecursionlimit(recursionLimit)
+        if errors:
+            raise errors[0]
+        return results[0]
+
+class ClosureMachine(ClosureRuntime):
+    """
+    An engine compiling the control structures into nested Python closures, one per
+    node of the expression each control structure stands for. Running a closure
+    evaluates its node directly, operands right to left as the CSE machine does,
+    so there is no control stack or value stack to maintain. Function bodies run
+    in frames addressed by the resolver's References, and applications in tail
+    position are returned to the caller's application loop. Produces the same
+    output as CSEMachine.
+    """
+
+    def __init__(self, controls, environment, memo=None):
+        """
+        Initializes the ClosureMachine with the given control structures and environment,
+        memoizing applications with `memo` (a CSE.memo.Memo) if given.
+        """
+        if len(controls) == 0 or len(controls[0].elements) == 0:
+            raise RPALException("Control structure with number 0 has no elements.")
+        super().__init__(environment, memo)
+        self.controls = controls
+        self.bodies = [None] * len(controls)
+
+    def compileStructure(self, number, tail):
+        """
+        Compiles the control structure with the given number into one closure of an environment.
+        """
+        elements = self.controls[number].elements
+        code, end = self.compileElement(elements, 0, tail)
+        if end != len(elements):
+            raise RPALException(f"Control structure {number} is not a single expression.")
+        return code
+
+    def compileElement(self, elements, index, tail):
+        """
+        Compiles the expression starting at elements[index] (control structures list
+        expressions in prefix order).
+
+        Returns:
+            tuple: The closure evaluating the expression, and the index following it.
+        """
+        if index >= len(elements):
+            raise RPALException("Control structure ended in the middle of an expression.")
+        element = elements[index]
+        index += 1
+
+        if type(element) is Constant:
+            value = element.value
+            return (lambda env: value), index
+        if type(element) is Reference:
+            return self.compileReference(element), index
+        if type(element) is Lambda:
+            return self.compileLambda(element), index
+        if type(element) is Rec:
+            return self.compileRec(element), index
+        if type(element) is Tau:
+            items = []
+            for _ in range(element.getNumberOfElements()):
+                item, index = self.compileElement(elements, index, False)
+                items.append(item)
+            return self.compileTuple(items), index
+        if type(element) is ControlStructure:
+            if index + 1 >= len(elements) or type(elements[index]) is not ControlStructure or elements[index + 1] != "beta":
+                raise RPALException("Expected 'beta' after the branches of a conditional.")
+            then = self.compileStructure(element.number, tail)
+            otherwise = self.compileStructure(elements[index].number, tail)
+            guard, index = self.compileElement(elements, index + 2, False)
+            return (lambda env: then(env) if guard(env) else otherwise(env)), index
+        if type(element) is Token or element in OTHER_KEYWORDS:
+            return (lambda env: env.lookUpValue(element)), index
+        if element == "gamma":
+            rator, index = self.compileElement(elements, index, False)
+            rand, index = self.compileElement(elements, index, False)
+            return self.compileApplication(rator, rand, tail), index
+        if element in BINARY_FUNCTIONS:
+            function = BINARY_FUNCTIONS[element]
+            left, index = self.compileElement(elements, index, False)
+            right, index = self.compileElement(elements, index, False)
+            def binary(env):
+                operand2 = right(env)
+                return function(left(env), operand2)
+            return binary, index
+        if element in UNARY_FUNCTIONS:
+            function = UNARY_FUNCTIONS[element]
+            operand, index = self.compileElement(elements, index, False)
+            return (lambda env: function(operand(env))), index
+
+        illegal = self.illegal
+        return (lambda env: illegal()), index
+
+    def compileReference(self, reference):
+        """
+        Compiles a resolved identifier into a closure reading its frame slot.
+        """
+        if reference.isGlobal():
+            return lambda env: env.lookUpReference(reference)
+        slot = reference.slot
+        if reference.depth == 0:
+            return lambda env: env.values[slot]
+        if reference.depth == 1:
+            return lambda env: env.parent.values[slot]
+        depth = reference.depth
+        def lookUp(env):
+            for _ in range(depth):
+                env = env.parent
+            return env.values[slot]
+        return lookUp
+
+    def compileLambda(self, lambdaControl):
+        """
+        Compiles a lambda into a closure making a closure of it over the current environment.
+        """
+        k = lambdaControl.k
+        variables = lambdaControl.variables
+        if self.bodies[k] is None:
+            self.bodies[k] = self.compileStructure(k, True)
+        return lambda env: makeClosure(k, variables, env)
+
+    def compileRec(self, rec):
+        """
+        Compiles a recursive definition into a closure making its functions.
+        """
+        for lambdaControl in rec.lambdas:
+            if self.bodies[lambdaControl.k] is None:
+                self.bodies[lambdaControl.k] = self.compileStructure(lambdaControl.k, True)
+        closeRec = self.closeRec
+        return lambda env: closeRec(rec, env)
+
+    def compileTuple(self, items):
+        """
+        Compiles a tuple, evaluating its elements right to left.
+        """
+        items = items[::-1]
+        def buildTuple(env):
+            values = [item(env) for item in items]
+            values.reverse()
+            return tupleOf(values)
+        return buildTuple
+
+    def compileApplication(self, rator, rand, tail):
+        """
+        Compiles a 'gamma'. In tail position, applications of functions are returned
+        as TailCalls to the application loop of the enclosing function.
+        """
+        apply = self.apply
+        if tail:
+            tailApply = self.tailApply
+            def tailApplication(env):
+                argument = rand(env)
+                return tailApply(rator(env), argument)
+            return tailApplication
+        def application(env):
+            argument = rand(env)
+            return apply(rator(env), argument)
+        return application
+
+    def run(self):
+        """
+        Compiles the program and evaluates it in the primitive environment.
+        """
+        self.bodies[0] = self.compileStructure(0, False)
+        return super().run()
+
+    def evaluate(self):
+        """
+        Evaluates control structure 0 in the machine's environment and returns its value.
+        Can be called again after structure 0 is replaced by a later program (see
+        Session.session); the bodies compiled for earlier programs are kept.
+        """
+        self.bodies.extend([None] * (len(self.controls) - len(self.bodies)))
+        return self.interpret()
@@ -1,5 +1,10 @@
 from Exception.RPALException import RPALException
-from Tokenizer.tokenizer import Token
+from Parser.resolver import Reference, ResolveAST
+from CSE.values import DUMMY, NIL, RPALTuple
+from Tokenizer.tokenizer import Token, decodeString
+
+# Values of the literal labels of the standardized tree
+LITERAL_VALUES = {"true": True, "false": False, "nil": NIL, "dummy": DUMMY}
 
 class Lambda:
     """
@@ -16,14 +21,14 @@ class Lambda:
 
     def setC(self, c):
         """
-        Sets the environment number associated with this lambda.
+        Sets the environment associated with this lambda.
         Args:
-            c: The environment to associate with this lambda.
+            c (Environment): The environment to associate with this lambda.
         """
         self.c = c
     def getC(self):
         """
-        Returns the environment number associated with this lambda.
+        Returns the environment associated with this lambda.
         """
         return self.c
     
@@ -72,6 +77,69 @@ class Eta:
         lambdaNode.setC(self.c)
         return lambdaNode
 
+class Constant:
+    """
+    Represents a literal in the control structure (an integer, string, truth value,
+    nil or dummy), holding its already decoded value.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+class Rec:
+    """
+    Represents a recursive definition ('rec') in the control structure, in place of
+    the application of Y to a lambda whose body only makes functions (one lambda,
+    or a tuple of lambdas for simultaneous definitions). Evaluating it makes the
+    functions as closures over one new environment that binds the variables to
+    them, so recursive calls find the functions directly instead of unrolling an
+    Eta on every call.
+    """
+    __slots__ = ("variables", "lambdas")
+
+    def __init__(self, variables, lambdas):
+        self.variables = variables
+        self.lambdas = lambdas
+
+    def close(self, frame):
+        """
+        Makes the functions as closures over `frame`, a new environment with one
+        (unset) slot per variable, and binds the variables to them.
+
+        Returns:
+            The value of the definition: the function, or the tuple of functions.
+        """
+        closures = []
+        for lambdaControl in self.lambdas:
+            closure = Lambda(lambdaControl.k, lambdaControl.variables)
+            closure.c = frame
+            closures.append(closure)
+        value = closures[0] if len(closures) == 1 else RPALTuple(closures)
+        if len(self.variables) == 1:
+            frame.values[0] = value
+        else:
+            frame.values[:] = closures
+        return value
+
+def literalConstant(node):
+    """
+    Returns the Constant a literal node of the standardized tree stands for
+    (an INT or STRING token, true, false, nil, dummy, or an already folded Constant),
+    or None if the node is not a literal.
+    """
+    label = node.head
+    if type(label) is Constant:
+        return label
+    if type(label) is Token:
+        if label.getType() == "INT":
+            return Constant(int(label.getValue()))
+        if label.getType() == "STRING":
+            return Constant(decodeString(label.getValue()))
+    elif type(label) is str and label in LITERAL_VALUES and not node.child:
+        return Constant(LITERAL_VALUES[label])
+    return None
+
 class ControlStructure:
     """
     Represents a control structure (delta) which contains a sequence of structures.
@@ -86,8 +154,14 @@ class CSGenerator:
     Generates control structures (deltas) from an abstract syntax tree (AST).
     Each control structure corresponds to a node or sub-tree in the AST.
     """
-    def __init__(self):
+    def __init__(self, recursiveDefinitions=True):
+        """
+        Args:
+            recursiveDefinitions (bool): Generate applications of Y to function-making
+                lambdas as Rec elements (otherwise they are left to Y and Eta).
+        """
         self.controlStructures = []
+        self.recursiveDefinitions = recursiveDefinitions
     
     def printControlStructures(self):
         for cs in self.controlStructures:
@@ -99,6 +173,10 @@ class CSGenerator:
                     print(f"<tau({element.elementNumber})>", end=" ")
                 elif isinstance(element, ControlStructure):
                     print(f"<delta {element.number}>", end=" ")
+                elif isinstance(element, Rec):
+                    print(f"<rec {[l.k for l in element.lambdas]}>", end=" ")
+                elif isinstance(element, Constant):
+                    print(f"<{element.value!r}>", end=" ")
                 elif isinstance(element, Token):
                     print(f"<{element.value}>", end=" ")
                 else:
@@ -201,8 +279,27 @@ class CSGenerator:
 
             return
         
-        # Handle all other nodes (e.g., operators, constants, identifiers)
+        # Recursive definitions make their functions directly
+        if self.recursiveDefinitions and self.isRecursiveDefinition(node):
+            binder, body = node.child[1].child
+            lambdas = body.child if body.head == "tau" else [body]
+            variables = binder.child if binder.head == "," else [binder]
+            rec = Rec([variable.head for variable in variables], [])
+            for lambdaNode in lambdas:
+                lambdaControl = ControlStructure(-1)
+                self.addToControlStructure(lambdaControl, lambdaNode)
+                rec.lambdas.append(lambdaControl.elements[0])
+            cs.elements.append(rec)
+            return
+
+        # Literals are decoded once, here, into constants
+        constant = literalConstant(node)
+        if constant is not None:
+            cs.elements.append(constant)
+            return
         label = node.head
+
+        # Handle all other nodes (e.g., operators, constants, identifiers)
         #printLabel = label.getValue() if isinstance(label, Token) else label
         #print(f"adding<{#printLabel}> to control structure {cs.number}")
         cs.elements.append(label)
@@ -212,9 +309,34 @@ class CSGenerator:
             if len(node.child) > 1:
                 self.addToControlStructure(cs, node.child[1])
 
+    def isRecursiveDefinition(self, node):
+        """
+        Checks whether a node is the application of Y (the primitive, not a variable
+        named Y) to a lambda whose body is a lambda, or a tuple of lambdas that is
+        either bound to one variable or to as many variables as it has elements.
+        Such applications are generated as a Rec.
+        """
+        if node.head != "gamma" or len(node.child) != 2:
+            return False
+        rator, rand = node.child
+        if type(rator.head) is not Reference or rator.head.name != "Y" or not rator.head.isGlobal():
+            return False
+        if rand.head != "lambda" or len(rand.child) != 2:
+            return False
+        binder, body = rand.child
+        if body.head == "lambda":
+            return binder.head != ","
+        if body.head != "tau" or any(child.head != "lambda" for child in body.child):
+            return False
+        return binder.head != "," or len(binder.child) == len(body.child)
+
     def generate(self, node):
         """
         Entry point for generating control structures from the ST.
+        Identifiers not yet resolved to lexical addresses are resolved first.
+        Generating another tree with the same generator (see Session.session) replaces
+        control structure 0 and numbers the new structures after the earlier ones,
+        which stay valid for the closures made from them.
         Args:
             node (Node): The root node of the Standardized Tree.
         Returns:
@@ -222,5 +344,11 @@ class CSGenerator:
         """
         if node is None:
             raise RPALException("Node cannot be None")
-        self.createControlStructure(0, node)
+        ResolveAST().resolve(node)
+        if not self.controlStructures:
+            self.createControlStructure(0, node)
+        else:
+            cs = ControlStructure(0)
+            self.controlStructures[0] = cs
+            self.addToControlStructure(cs, node)
         return self.getControlStructures()
\ No newline at end of file
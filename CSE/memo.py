@@ -0,0 +1,285 @@
+from collections import OrderedDict
+
+from CSE.generateCS import Constant, ControlStructure, Lambda, Rec, Tau
+from CSE.operators import BINARY_FUNCTIONS, UNARY_FUNCTIONS
+from CSE.values import MISSING, Primitive, Rope, RPALTuple, StringView
+from Parser.resolver import Reference
+from Tokenizer.tokenizer import Token
+
+"""
+Memoization of pure RPAL functions (--memo).
+
+The functions of recursive definitions ('rec') that are proven pure are memoized:
+their applications are cached on the closure (its function and environment) and
+the argument, in a table holding the most recently used `capacity` results.
+
+A function is proven pure when neither its body nor any function made in it refers
+to Print, and every application in them is one that cannot reach Print:
+    - of a primitive other than Print, to at most as many arguments as it takes;
+    - of a function of a recursive definition that is itself pure, to at most as
+      many arguments as its curried lambdas take (one more to select from a tuple
+      of functions), so the function applied is always one of its own closures;
+    - of a lambda written in place (e.g. a 'let'), likewise;
+    - of a constant, a tuple or an operator's result to one argument (a selection).
+Applications of parameters are never proven pure, since the argument may be any
+function. Functions whose names start with DECLARED_PREFIX are declared pure and
+memoized without proof; the programmer vouches they never print.
+"""
+
+DEFAULT_CAPACITY = 100000
+# Recursive definitions of names starting with this are memoized as declared pure
+DECLARED_PREFIX = "memo_"
+# Primitive functions with an effect
+IMPURE_PRIMITIVES = ["print"]
+# Number of arguments of primitive functions that take more than one
+PRIMITIVE_ARITIES = {"conc": 2}
+
+class IdentityKey:
+    """
+    A part of a memo key compared by the identity of an unhashable object (the
+    buffer of a tuple), which it keeps alive as long as the key.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return type(other) is IdentityKey and other.value is self.value
+
+    def __hash__(self):
+        return id(self.value)
+
+def valueKey(value):
+    """
+    Returns the memo key of an argument. Equal integers, truth values and strings
+    have equal keys; tuples, views and closures are keyed by identity (tuples by their
+    buffer and length, since the prefix of a buffer never changes).
+    """
+    valueType = type(value)
+    if valueType is int or valueType is bool or valueType is str:
+        return (valueType, value)
+    if valueType is Rope:
+        return (str, str(value))
+    if valueType is StringView:
+        return (StringView, value.base, value.offset)
+    if valueType is RPALTuple:
+        return (RPALTuple, IdentityKey(value.buffer), value.length)
+    # Primitives hash by name, closures by identity
+    return (valueType, value)
+
+def variableName(variable):
+    return variable.getValue() if type(variable) is Token else variable
+
+class PurityAnalysis:
+    """
+    Finds the functions of recursive definitions to memoize in a program's control structures.
+    """
+    def __init__(self, controls, primitives):
+        """
+        Args:
+            controls (list): The program's ControlStructure instances, indexed by number.
+            primitives (dict): The variables of the environment the program runs in.
+        """
+        self.controls = controls
+        self.primitives = primitives
+        # Per control structure: the binders of its environments, innermost first,
+        # each a ("lambda", Lambda) or ("rec", Rec) pair
+        self.scopes = {}
+        # Per function body: the structures evaluated in its environment (its own and its branches)
+        self.members = {}
+        # Per function body: the function bodies made in it
+        self.children = {}
+        self.recs = []
+
+    def walk(self):
+        """
+        Records the scope, members and children of every control structure reachable from the program.
+        """
+        pending = [(0, (), 0)]
+        while pending:
+            number, scope, body = pending.pop()
+            if number in self.scopes:
+                continue
+            self.scopes[number] = scope
+            self.members.setdefault(body, []).append(number)
+            self.children.setdefault(body, set())
+            for element in self.controls[number].elements:
+                if type(element) is Lambda:
+                    pending.append((element.k, (("lambda", element),) + scope, element.k))
+                    self.children[body].add(element.k)
+                elif type(element) is Rec:
+                    self.recs.append(element)
+                    recScope = (("rec", element),) + scope
+                    for lambdaControl in element.lambdas:
+                        pending.append((lambdaControl.k, (("lambda", lambdaControl),) + recScope, lambdaControl.k))
+                        self.children[body].add(lambdaControl.k)
+                elif type(element) is ControlStructure:
+                    pending.append((element.number, scope, body))
+
+    def curriedLambdas(self, k):
+        """
+        Returns the function body k followed by the bodies of the lambdas it directly
+        returns, for a curried function (fn x. fn y. ...).
+        """
+        bodies = [k]
+        elements = self.controls[k].elements
+        while len(elements) == 1 and type(elements[0]) is Lambda:
+            bodies.append(elements[0].k)
+            elements = self.controls[elements[0].k].elements
+        return bodies
+
+    def arity(self, lambdas, selected):
+        """
+        Returns the number of arguments the given functions can be applied to with
+        certainty of applying their own closures (one more when selected from a tuple).
+        """
+        return min(len(self.curriedLambdas(l.k)) for l in lambdas) + (1 if selected else 0)
+
+    def isPurePrimitive(self, name):
+        value = self.primitives.get(name)
+        return type(value) is Primitive and value.name not in IMPURE_PRIMITIVES
+
+    def checkApplication(self, head, count, scope, dependencies):
+        """
+        Checks an application of `head` to `count` arguments, adding the function
+        bodies its purity depends on to `dependencies`.
+
+        Returns:
+            bool: False if the application may reach Print.
+        """
+        if type(head) is Reference:
+            if head.isGlobal():
+                value = self.primitives.get(head.name)
+                return self.isPurePrimitive(head.name) and count <= PRIMITIVE_ARITIES.get(value.name, 1)
+            if head.depth >= len(scope):
+                return False
+            kind, binder = scope[head.depth]
+            if kind != "rec":
+                return False
+            if len(binder.variables) == 1:
+                lambdas, selected = binder.lambdas, len(binder.lambdas) > 1
+            else:
+                lambdas, selected = [binder.lambdas[head.slot]], False
+            dependencies.update(l.k for l in lambdas)
+            return count <= self.arity(lambdas, selected)
+        if type(head) is Lambda:
+            return count <= self.arity([head], False)
+        if type(head) is Rec:
+            return count <= self.arity(head.lambdas, len(head.lambdas) > 1)
+        if type(head) is Constant or type(head) is Tau or (type(head) is str and (head in BINARY_FUNCTIONS or head in UNARY_FUNCTIONS)):
+            return count <= 1
+        return False
+
+    def checkBody(self, k, dependencies):
+        """
+        Checks the function body k alone, adding the function bodies its purity depends on to `dependencies`.
+
+        Returns:
+            bool: False if the body refers to Print or makes an application that may reach it.
+        """
+        dependencies.update(self.children[k])
+        for number in self.members[k]:
+            elements = self.controls[number].elements
+            scope = self.scopes[number]
+            for index, element in enumerate(elements):
+                if type(element) is Reference and element.isGlobal() and not self.isPurePrimitive(element.name):
+                    return False
+                if type(element) is Token and not self.isPurePrimitive(element.getValue()):
+                    return False
+                if type(element) is str and element in self.primitives and not self.isPurePrimitive(element):
+                    return False
+                if element == "gamma" and (index == 0 or elements[index - 1] != "gamma"):
+                    # A run of gammas applies the element after them to that many arguments
+                    count = 1
+                    while elements[index + count] == "gamma":
+                        count += 1
+                    if not self.checkApplication(elements[index + count], count, scope, dependencies):
+                        return False
+        return True
+
+    def memoizedFunctions(self):
+        """
+        Returns the set of function bodies to memoize.
+        """
+        self.walk()
+        bodies = [k for k in self.members if k != 0]
+        dependencies = {k: set() for k in bodies}
+        impure = {k for k in bodies if not self.checkBody(k, dependencies[k])}
+        # A function is pure only if everything it depends on is
+        changed = True
+        while changed:
+            changed = False
+            for k in bodies:
+                if k not in impure and not dependencies[k].isdisjoint(impure):
+                    impure.add(k)
+                    changed = True
+
+        functions = set()
+        for rec in self.recs:
+            for index, lambdaControl in enumerate(rec.lambdas):
+                names = rec.variables if len(rec.variables) == 1 else [rec.variables[index]]
+                declared = any(variableName(name).startswith(DECLARED_PREFIX) for name in names)
+                curried = self.curriedLambdas(lambdaControl.k)
+                if declared or impure.isdisjoint(curried):
+                    functions.update(curried)
+        return functions
+
+class Memo:
+    """
+    A bounded LRU table of the results of applications of memoized functions, with hit/miss statistics.
+    """
+    def __init__(self, controls, primitives, capacity=DEFAULT_CAPACITY):
+        """
+        Args:
+            controls (list): The program's ControlStructure instances.
+            primitives (dict): The variables of the environment the program runs in.
+            capacity (int): The maximum number of results kept.
+        """
+        self.functions = PurityAnalysis(controls, primitives).memoizedFunctions()
+        self.capacity = capacity
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, closure, argument):
+        """
+        Returns the key of the application of a closure to an argument, or None if
+        the application is not memoized.
+        """
+        if closure.k not in self.functions:
+            return None
+        if len(closure.variables) == 1:
+            return (closure.k, closure.c, valueKey(argument))
+        if type(argument) is RPALTuple and len(argument) == len(closure.variables):
+            return (closure.k, closure.c, tuple(valueKey(value) for value in argument))
+        return None
+
+    def lookUp(self, key):
+        """
+        Returns the cached result for a key, or MISSING.
+        """
+        value = self.table.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.table.move_to_end(key)
+        return value
+
+    def store(self, key, value):
+        """
+        Caches a result, evicting the least recently used one when the table is full.
+        """
+        self.table[key] = value
+        if len(self.table) > self.capacity:
+            self.table.popitem(last=False)
+            self.evictions += 1
+
+    def report(self):
+        """
+        Returns the statistics as a line of text.
+        """
+        return (f"Memo: {len(self.functions)} functions memoized, {self.hits} hits, {self.misses} misses, "
+                f"{self.evictions} evictions, {len(self.table)}/{self.capacity} entries.")
@@ -0,0 +1,193 @@
+import math
+
+from Exception.RPALException import RPALException
+from CSE.values import NIL, STRING_TYPES, Native, RPALTuple
+
+"""
+Native libraries of tuple, string and numeric functions (--lib=<name>,...).
+
+Each library maps RPAL names to (arity, function) pairs. Loading a library binds
+its names in the primitive environment to Native values, which programs apply like
+curried RPAL functions. A native function receives the machine's call(function,
+argument) first, through which functions taking RPAL functions (Map, Filter, the
+folds) apply them; every engine provides one.
+
+Tuples are returned as RPAL tuples, and empty results as nil.
+"""
+
+def elements(value, name):
+    """
+    Returns the elements of a tuple (nil has none) as a list.
+    """
+    if value == NIL:
+        return []
+    if type(value) is not RPALTuple:
+        raise RPALException(f"{name} expects a tuple.")
+    return value.toList()
+
+def makeTuple(values):
+    return RPALTuple(values) if values else NIL
+
+def string(value, name):
+    if not isinstance(value, STRING_TYPES):
+        raise RPALException(f"{name} expects a string.")
+    return str(value)
+
+def integer(value, name):
+    if type(value) is not int:
+        raise RPALException(f"{name} expects an integer.")
+    return value
+
+def truthValue(value, name):
+    if type(value) is not bool:
+        raise RPALException(f"{name} expects its function to return a truth value.")
+    return value
+
+# list
+
+def nativeMap(call, function, values):
+    return makeTuple([call(function, value) for value in elements(values, "Map")])
+
+def nativeFilter(call, predicate, values):
+    return makeTuple([value for value in elements(values, "Filter") if truthValue(call(predicate, value), "Filter")])
+
+def nativeFoldl(call, function, initial, values):
+    """
+    Foldl f a (x1, ..., xn) = f (... (f a x1) ...) xn
+    """
+    result = initial
+    for value in elements(values, "Foldl"):
+        result = call(call(function, result), value)
+    return result
+
+def nativeFoldr(call, function, initial, values):
+    """
+    Foldr f a (x1, ..., xn) = f x1 (... (f xn a) ...)
+    """
+    result = initial
+    for value in reversed(elements(values, "Foldr")):
+        result = call(call(function, value), result)
+    return result
+
+def nativeReverse(call, values):
+    return makeTuple(elements(values, "Reverse")[::-1])
+
+def nativeRange(call, first, last):
+    """
+    Range a b = (a, a + 1, ..., b)
+    """
+    return makeTuple(list(range(integer(first, "Range"), integer(last, "Range") + 1)))
+
+def nativeAppend(call, values1, values2):
+    return makeTuple(elements(values1, "Append") + elements(values2, "Append"))
+
+def nativeSum(call, values):
+    return sum(integer(value, "Sum") for value in elements(values, "Sum"))
+
+# string
+
+def nativeSplit(call, separator, value):
+    """
+    Split sep s: the pieces of s between occurrences of sep ('' splits into characters).
+    """
+    separator = string(separator, "Split")
+    value = string(value, "Split")
+    return makeTuple(value.split(separator) if separator else list(value))
+
+def nativeJoin(call, separator, values):
+    separator = string(separator, "Join")
+    return separator.join(string(value, "Join") for value in elements(values, "Join"))
+
+def nativeExplode(call, value):
+    return makeTuple(list(string(value, "Explode")))
+
+def nativeLength(call, value):
+    return len(string(value, "Length"))
+
+def nativeItos(call, value):
+    return str(integer(value, "Itos"))
+
+def nativeStoi(call, value):
+    value = string(value, "Stoi")
+    try:
+        return int(value)
+    except ValueError:
+        raise RPALException(f"Stoi expects the digits of an integer, got '{value}'.")
+
+# math
+
+def nativeAbs(call, value):
+    return abs(integer(value, "Abs"))
+
+def nativeMax(call, value1, value2):
+    return max(integer(value1, "Max"), integer(value2, "Max"))
+
+def nativeMin(call, value1, value2):
+    return min(integer(value1, "Min"), integer(value2, "Min"))
+
+def nativeMod(call, value1, value2):
+    if integer(value2, "Mod") == 0:
+        raise RPALException("Division by zero.")
+    return integer(value1, "Mod") % value2
+
+def nativeGcd(call, value1, value2):
+    return math.gcd(integer(value1, "Gcd"), integer(value2, "Gcd"))
+
+def nativeIsqrt(call, value):
+    if integer(value, "Isqrt") < 0:
+        raise RPALException("Isqrt expects a non-negative integer.")
+    return math.isqrt(value)
+
+LIBRARIES = {
+    "list": {
+        "Map": (2, nativeMap),
+        "Filter": (2, nativeFilter),
+        "Foldl": (3, nativeFoldl),
+        "Foldr": (3, nativeFoldr),
+        "Reverse": (1, nativeReverse),
+        "Range": (2, nativeRange),
+        "Append": (2, nativeAppend),
+        "Sum": (1, nativeSum),
+    },
+    "string": {
+        "Split": (2, nativeSplit),
+        "Join": (2, nativeJoin),
+        "Explode": (1, nativeExplode),
+        "Length": (1, nativeLength),
+        "Itos": (1, nativeItos),
+        "Stoi": (1, nativeStoi),
+    },
+    "math": {
+        "Abs": (1, nativeAbs),
+        "Max": (2, nativeMax),
+        "Min": (2, nativeMin),
+        "Mod": (2, nativeMod),
+        "Gcd": (2, nativeGcd),
+        "Isqrt": (1, nativeIsqrt),
+    },
+}
+
+def loadLibraries(names, variables):
+    """
+    Binds the functions of the named libraries in a primitive environment's variables.
+
+    Args:
+        names (list): Library names, keys of LIBRARIES.
+        variables (dict): The variables to add the functions to (not modified on error).
+
+    Returns:
+        dict: A copy of `variables` with the functions added.
+
+    Raises:
+        RPALException: If a library does not exist or one of its names is already bound.
+    """
+    variables = dict(variables)
+    for name in dict.fromkeys(names):
+        library = LIBRARIES.get(name)
+        if library is None:
+            raise RPALException(f"Unknown library '{name}'. Use one of: {', '.join(LIBRARIES)}.")
+        for functionName, (arity, function) in library.items():
+            if functionName in variables:
+                raise RPALException(f"Library '{name}' redefines '{functionName}'.")
+            variables[functionName] = Native(functionName, arity, function)
+    return variables
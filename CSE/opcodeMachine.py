@@ -0,0 +1,343 @@
+from Environment.Environment import Environment
+from Exception.RPALException import RPALException
+from CSE.generateCS import Constant, ControlStructure, Eta, Lambda, Rec, Tau
+from CSE.operators import BINARY_FUNCTIONS, BUILTIN_OPERATOR_FUNCTIONS, UNARY_FUNCTIONS, conc, formatValue
+from CSE.values import DUMMY, MISSING, NIL, Native, Primitive, RPALTuple
+from CSE.CSEMachine import BUILTIN_FUNCTIONS, OTHER_KEYWORDS
+from Parser.resolver import Reference
+from Tokenizer.tokenizer import Token
+
+# Opcodes of lowered control elements, each an index into OpcodeMachine.handlers
+LOOKUP = 0  # argument: global Reference, Token or name to look up in the current environment
+CONSTANT = 1  # argument: the value to push
+LAMBDA = 2  # argument: the Lambda to close over the current environment
+GAMMA = 3  # argument: unused
+RESTORE = 4  # argument: the environment to return to once a function body is done
+BINARY = 5  # argument: the function of two operands
+UNARY = 6  # argument: the function of one operand
+BETA = 7  # argument: (then code, else code)
+TAU = 8  # argument: the number of tuple elements
+ILLEGAL = 9  # argument: the element that cannot be executed
+LOCAL = 10  # argument: (depth, slot) of a local variable
+REC = 11  # argument: the Rec whose functions to make
+STORE = 12  # argument: the memo key to store the result of a memoized application under
+
+# Marks the end of an application made by a native function through OpcodeMachine.call;
+# the machine stops before executing it
+CALL_MARKER = (ILLEGAL, "call")
+
+def lowerElement(element):
+    """
+    Lowers one control structure element (other than a conditional) to an (opcode, argument) pair.
+    """
+    if type(element) is Constant:
+        return (CONSTANT, element.value)
+    if type(element) is Reference:
+        if element.isGlobal():
+            return (LOOKUP, element)
+        return (LOCAL, (element.depth, element.slot))
+    if type(element) is Token:
+        return (LOOKUP, element)
+    if type(element) is Lambda:
+        return (LAMBDA, element)
+    if type(element) is Rec:
+        return (REC, element)
+    if type(element) is Tau:
+        return (TAU, element.getNumberOfElements())
+    if element == "gamma":
+        return (GAMMA, None)
+    if element in OTHER_KEYWORDS:
+        return (LOOKUP, element)
+    if element in BINARY_FUNCTIONS:
+        return (BINARY, BINARY_FUNCTIONS[element])
+    if element in UNARY_FUNCTIONS:
+        return (UNARY, UNARY_FUNCTIONS[element])
+    return (ILLEGAL, element)
+
+def lowerControlStructures(controlStructures, codes=None):
+    """
+    Lowers every control structure into code, a list of (opcode, argument) pairs.
+    A conditional (delta then, delta else, beta) becomes a single BETA whose
+    argument holds the code of both branches.
+
+    Args:
+        controlStructures (list): The ControlStructure instances, indexed by number.
+        codes (list, optional): The code lowered before from the same list, which has
+            grown since (see Session.session). Only structure 0 and the new structures
+            are lowered, in place.
+
+    Returns:
+        list: The code of each control structure, indexed by number.
+    """
+    if codes is None:
+        codes = []
+    start = len(codes)
+    codes.extend([] for _ in range(len(controlStructures) - start))
+    codes[0] = []
+    for cs in [controlStructures[0]] + controlStructures[max(start, 1):]:
+        code = codes[cs.number]
+        elements = cs.elements
+        i = 0
+        while i < len(elements):
+            element = elements[i]
+            if type(element) is ControlStructure:
+                if i + 2 >= len(elements) or type(elements[i + 1]) is not ControlStructure or elements[i + 2] != "beta":
+                    raise RPALException("Expected 'beta' after the branches of a conditional.")
+                code.append((BETA, (codes[element.number], codes[elements[i + 1].number])))
+                i += 3
+                continue
+            code.append(lowerElement(element))
+            i += 1
+    return codes
+
+class OpcodeMachine:
+    """
+    A CSE machine running control structures lowered to integer opcodes.
+    Every step pops one (opcode, argument) pair and calls the handler at that
+    index; applications dispatch once more on the type of the operator, and
+    operators carry their function from CSE.operators. Function returns restore
+    the caller's environment stored in the RESTORE element instead of searching
+    the stacks. Produces the same output as CSEMachine.
+    """
+
+    def __init__(self, controls, environment, memo=None):
+        """
+        Initializes the OpcodeMachine with the given control structures and environment,
+        memoizing applications with `memo` (a CSE.memo.Memo) if given.
+        """
+        if len(controls) == 0 or len(controls[0].elements) == 0:
+            raise RPALException("Control structure with number 0 has no elements.")
+        self.controls = controls
+        self.environment = environment
+        self.codes = lowerControlStructures(controls)
+        self.controlStack = [(RESTORE, environment)]
+        self.stack = []
+        self.currentEnvironment = environment
+        self.totalEnvironments = 1
+        self.memo = memo
+        self.controlStack.extend(self.codes[0])
+
+        self.handlers = [
+            self.lookUp, self.pushConstant, self.closeLambda, self.gamma, self.restore,
+            self.binary, self.unary, self.beta, self.tau, self.illegal, self.lookUpLocal,
+            self.closeRec, self.storeMemoized,
+        ]
+        # Applications dispatch on the type of the operator on top of the stack
+        self.applyHandlers = {
+            Lambda: self.applyLambda,
+            RPALTuple: self.select,
+            Primitive: self.applyPrimitive,
+            Eta: self.applyEta,
+            Native: self.applyNative,
+        }
+
+    def lookUp(self, name):
+        if type(name) is Reference:
+            self.stack.append(self.currentEnvironment.lookUpReference(name))
+        else:
+            self.stack.append(self.currentEnvironment.lookUpValue(name))
+
+    def lookUpLocal(self, address):
+        depth, slot = address
+        environment = self.currentEnvironment
+        for _ in range(depth):
+            environment = environment.parent
+        self.stack.append(environment.values[slot])
+
+    def pushConstant(self, value):
+        self.stack.append(value)
+
+    def closeLambda(self, lambdaControl):
+        closure = Lambda(lambdaControl.k, lambdaControl.variables)
+        closure.setC(self.currentEnvironment)
+        self.stack.append(closure)
+
+    def closeRec(self, rec):
+        frame = Environment(self.totalEnvironments, self.currentEnvironment, values=[None] * len(rec.variables))
+        self.totalEnvironments += 1
+        self.stack.append(rec.close(frame))
+
+    def gamma(self, _):
+        handler = self.applyHandlers.get(type(self.stack[-1]))
+        if handler is None:
+            raise RPALException(f"Illegal Function Appication")
+        handler(self.stack.pop())
+
+    def enter(self, closure, values):
+        """
+        Enters the body of a closure with a new frame binding the given values by slot.
+        A call in tail position (the next element restores the caller's environment) pushes
+        no RESTORE of its own: the caller has nothing left to do, so the pending RESTORE
+        returns straight to the caller's caller and tail-recursive loops run in constant space.
+        """
+        parentEnv = closure.c
+        if type(parentEnv) is not Environment:
+            raise RPALException(f"Parent environment of lambda {closure.k} is not a valid Environment.")
+        if self.controlStack[-1][0] != RESTORE:
+            self.controlStack.append((RESTORE, self.currentEnvironment))
+        self.currentEnvironment = Environment(self.totalEnvironments, parentEnv, values=values)
+        self.totalEnvironments += 1
+        self.controlStack.extend(self.codes[closure.k])
+
+    def memoized(self, closure, value):
+        """
+        Looks up a memoized application: on a hit, pushes the result and returns True;
+        on a miss, schedules storing the result after the body and returns False.
+        """
+        key = self.memo.key(closure, value)
+        if key is None:
+            return False
+        result = self.memo.lookUp(key)
+        if result is not MISSING:
+            self.stack.append(result)
+            return True
+        self.controlStack.append((STORE, key))
+        return False
+
+    def storeMemoized(self, key):
+        self.memo.store(key, self.stack[-1])
+
+    def applyLambda(self, closure):
+        """
+        Rules 4 and 11: binds one variable, or a tuple of values to several variables.
+        """
+        value = self.stack.pop()
+        if self.memo is not None and self.memoized(closure, value):
+            return
+        if len(closure.variables) == 1:
+            self.enter(closure, [value])
+            return
+        if type(value) is not RPALTuple:
+            raise RPALException("Expected a list of names on the stack for 'gamma' operation.")
+        if len(value) != len(closure.variables):
+            raise RPALException("Number of names does not match number of variables in lambda.")
+        self.enter(closure, list(value))
+
+    def select(self, tupleElements):
+        """
+        Rule 10: tuple element selection (1-based).
+        """
+        if len(tupleElements) == 0:
+            raise RPALException(f"Illegal Function Appication")
+        index = self.stack.pop()
+        if type(index) is not int:
+            raise RPALException("Index must be an integer.")
+        if index < 0 or index-1 >= len(tupleElements):
+            raise RPALException("Index out of bounds for tuple elements.")
+        self.stack.append(tupleElements[index-1])
+
+    def applyPrimitive(self, primitive):
+        """
+        Rules 3 and 12 and the built-in functions.
+        """
+        name = primitive.name
+        function = BUILTIN_OPERATOR_FUNCTIONS.get(name)
+        if function is not None:
+            self.stack.append(function(self.stack.pop()))
+        elif name == "conc":
+            self.controlStack.pop()  # Pop the second 'gamma' since it is a binary operation
+            value1 = self.stack.pop()
+            value2 = self.stack.pop()
+            self.stack.append(conc(value1, value2))
+        elif name == "Y":
+            lambdaControl = self.stack.pop()
+            if type(lambdaControl) is not Lambda:
+                raise RPALException("Expected a Lambda control structure on the stack for 'gamma' operation.")
+            self.stack.append(Eta(lambdaControl))
+        elif name in BUILTIN_FUNCTIONS:
+            print(formatValue(self.stack.pop()), end="")
+            self.stack.append(DUMMY)
+        else:
+            raise RPALException(f"Illegal Function Appication")
+
+    def applyNative(self, native):
+        self.stack.append(native.apply(self.stack.pop(), self.call))
+
+    def call(self, function, argument):
+        """
+        Applies a function value to an argument on behalf of a native function and
+        returns the result, running the machine until the application is done.
+        The application is entered below a marker, so it is never taken for a tail call.
+        """
+        self.controlStack.append(CALL_MARKER)
+        height = len(self.controlStack)
+        self.stack.append(argument)
+        self.stack.append(function)
+        self.controlStack.append((GAMMA, None))
+        self.interpret(height)
+        self.controlStack.pop()
+        return self.stack.pop()
+
+    def applyEta(self, eta):
+        """
+        Rule 13: applies eta to itself through its lambda before applying it to the argument.
+        """
+        self.stack.append(eta)
+        self.stack.append(eta.toLambda())
+        self.controlStack.append((GAMMA, None))
+        self.controlStack.append((GAMMA, None))
+
+    def restore(self, environment):
+        """
+        Rule 5: returns from a function body to the caller's environment.
+        """
+        self.currentEnvironment = environment
+
+    def binary(self, function):
+        operand1 = self.stack.pop()
+        operand2 = self.stack.pop()
+        self.stack.append(function(operand1, operand2))
+
+    def unary(self, function):
+        self.stack.append(function(self.stack.pop()))
+
+    def beta(self, branches):
+        """
+        Rule 8: continues with the code of the branch selected by the condition.
+        """
+        self.controlStack.extend(branches[0] if self.stack.pop() else branches[1])
+
+    def tau(self, numberOfElements):
+        """
+        Rule 9: builds a tuple from the values on top of the stack.
+        """
+        if len(self.stack) > 0 and self.stack[-1] == NIL:
+            return
+        listOfElements = []
+        for i in range(numberOfElements):
+            if len(self.stack) == 0:
+                return
+            listOfElements.append(self.stack.pop())
+        self.stack.append(RPALTuple(listOfElements))
+
+    def illegal(self, element):
+        raise RPALException(f"Illegal Function Appication")
+
+    def evaluate(self):
+        """
+        Evaluates control structure 0 in the machine's environment and returns its value.
+        Can be called again after structure 0 is replaced by a later program (see
+        Session.session); only the control structures added since are lowered.
+        """
+        self.codes = lowerControlStructures(self.controls, self.codes)
+        self.controlStack[:] = [(RESTORE, self.environment)] + self.codes[0]
+        self.stack[:] = []
+        self.currentEnvironment = self.environment
+        self.interpret()
+        return self.stack.pop()
+
+    def interpret(self, height=0):
+        """
+        Main interpreter loop: one index and one call per step until the control stack is empty
+        (or back to `height` elements, for a call from a native function).
+        """
+        controlStack = self.controlStack
+        handlers = self.handlers
+        if height == 0:
+            while controlStack:
+                opcode, argument = controlStack.pop()
+                handlers[opcode](argument)
+            return
+        while len(controlStack) > height:
+            opcode, argument = controlStack.pop()
+            handlers[opcode](argument)
@@ -0,0 +1,209 @@
+import operator
+
+from CSE.generateCS import Eta, Lambda
+from CSE.values import DUMMY, NIL, STRING_TYPES, Native, Rope, RPALTuple, StringView, valuesEqual
+from Exception.RPALException import RPALException
+from Tokenizer.tokenizer import Token
+
+"""
+Semantics of the RPAL operators and primitive functions, shared by every engine.
+Each operator is a plain function looked up by name in one of the tables below.
+Strings are decoded when the control structures are generated, so operators see
+the characters themselves (as str, a Rope built by 'Conc' or a StringView made
+by 'Stern').
+"""
+
+# Concatenations (and suffixes) shorter than this are copied; longer ones build a Rope (or StringView)
+ROPE_THRESHOLD = 64
+
+def divide(operand1, operand2):
+    """
+    Integer division truncating towards zero.
+    """
+    if operand2 == 0:
+        raise RPALException("Division by zero.")
+    return int(operand1 / operand2)
+
+def power(operand1, operand2):
+    """
+    Integer exponentiation.
+    """
+    if operand2 < 0:
+        raise RPALException("Negative exponent in '**' operation.")
+    return operand1 ** operand2
+
+def logicalAnd(operand1, operand2):
+    return operand1 and operand2
+
+def logicalOr(operand1, operand2):
+    return operand1 or operand2
+
+def augment(operand1, operand2):
+    """
+    Appends operand2 to the tuple operand1 ('nil' is the empty tuple) in amortized constant time.
+    """
+    if operand1 == NIL:
+        return RPALTuple([operand2])
+    if type(operand1) is RPALTuple:
+        return operand1.augment(operand2)
+    raise RPALException("Left operand of 'aug' must be a tuple.")
+
+def conc(value1, value2):
+    """
+    Concatenates two strings. Long results are Ropes, so repeated concatenation stays linear.
+    """
+    if not isinstance(value1, STRING_TYPES) or not isinstance(value2, STRING_TYPES):
+        raise RPALException("Both operands must be strings for 'conc' operation.")
+    if len(value1) + len(value2) < ROPE_THRESHOLD:
+        return str(value1) + str(value2)
+    return Rope(value1, value2)
+
+def stem(value):
+    """
+    Returns the first character of a string.
+    """
+    if type(value) is StringView:
+        return value.first()
+    if not isinstance(value, STRING_TYPES):
+        raise RPALException("Operand must be a string for 'stem' operation.")
+    value = str(value)
+    return value[0] if len(value) > 0 else ''
+
+def stern(value):
+    """
+    Returns a string without its first character, as a view of it unless it is short.
+    """
+    if type(value) is StringView:
+        return value.rest()
+    if not isinstance(value, STRING_TYPES):
+        raise RPALException("Operand must be a string for 'stern' operation.")
+    value = str(value)
+    if len(value) < ROPE_THRESHOLD:
+        return value[1:] if len(value) > 1 else ''
+    return StringView(value, 1)
+
+def notEqual(operand1, operand2):
+    return not valuesEqual(operand1, operand2)
+
+def isInteger(value):
+    # Truth values are bools, a subclass of int
+    return type(value) is int
+
+def isString(value):
+    return isinstance(value, STRING_TYPES)
+
+def isTruthValue(value):
+    return type(value) is bool
+
+def isFunction(value):
+    return isinstance(value, Lambda) or isinstance(value, Eta) or isinstance(value, Native)
+
+def isTuple(value):
+    """
+    Only non-empty tuples are tuples; nil is not.
+    """
+    return isinstance(value, RPALTuple) and len(value) > 0
+
+def isDummy(value):
+    return value == DUMMY
+
+def order(value):
+    """
+    Returns the number of elements of a tuple.
+    """
+    if type(value) is not RPALTuple:
+        raise RPALException("Operand must be a list for 'order' operation.")
+    return len(value)
+
+def null(value):
+    """
+    Checks whether a tuple is empty ('nil' is the empty tuple).
+    """
+    if value == NIL:
+        return True
+    if type(value) is not RPALTuple:
+        raise RPALException("Operand must be a list for 'null' operation.")
+    return len(value) == 0
+
+# Operators appearing in control structures, applied by rule 6 and rule 7
+BINARY_FUNCTIONS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": divide,
+    "**": power,
+    "eq": valuesEqual,
+    "ne": notEqual,
+    "gr": operator.gt,
+    "ge": operator.ge,
+    "ls": operator.lt,
+    "le": operator.le,
+    "aug": augment,
+    "&": logicalAnd,
+    "or": logicalOr,
+}
+UNARY_FUNCTIONS = {
+    "not": operator.not_,
+    "neg": operator.neg,
+}
+
+# Primitive functions of one argument, applied by rule 3 ('conc' takes two and is handled apart)
+BUILTIN_OPERATOR_FUNCTIONS = {
+    "stem": stem,
+    "stern": stern,
+    "isInteger": isInteger,
+    "isString": isString,
+    "isTruthValue": isTruthValue,
+    "isFunction": isFunction,
+    "isTuple": isTuple,
+    "isDummy": isDummy,
+    "order": order,
+    "null": null,
+}
+
+def formatClosure(closure):
+    """
+    Formats a closure the way Print shows it.
+    """
+    if len(closure.variables) == 1:
+        variable = closure.variables[0]
+        if type(variable) is Token:
+            variable = variable.getValue()
+        return f"[lambda closure: {variable}: {closure.k}]"
+    variables = [v.getValue() if isinstance(v, Token) else v for v in closure.variables]
+    return f"[lambda closure: {variables}: {closure.k}]"
+
+def formatTruthValue(value):
+    return "true" if value else "false"
+
+def formatNested(value):
+    """
+    Formats a value inside a tuple inside a tuple, which Print shows as a list.
+    """
+    if type(value) is bool:
+        return formatTruthValue(value)
+    if type(value) is RPALTuple:
+        return "[" + ", ".join(formatNested(item) for item in value) + "]"
+    return repr(value)
+
+def formatValue(value):
+    """
+    Formats a value the way Print shows it.
+    """
+    if type(value) is Lambda:
+        return formatClosure(value)
+    if type(value) is bool:
+        return formatTruthValue(value)
+    if type(value) is RPALTuple:
+        temp = []
+        for item in value:
+            if type(item) is Lambda:
+                temp.append(formatClosure(item))
+            elif type(item) is bool:
+                temp.append(formatTruthValue(item))
+            elif type(item) is RPALTuple:
+                temp.append(formatNested(item))
+            else:
+                temp.append(str(item))
+        return "(" + ", ".join(temp) + ")"
+    return str(value)
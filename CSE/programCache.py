@@ -0,0 +1,289 @@
+import mmap
+import os
+import struct
+import sys
+
+from CSE.generateCS import Constant, ControlStructure, Lambda, Rec, Tau
+from Exception.RPALException import RPALException
+from CSE.values import DUMMY, NIL
+from Parser.resolver import Reference
+from Tokenizer.tokenizer import Token
+
+# hashlib loads OpenSSL, which takes longer than running a small program;
+# the built-in SHA-256 module computes the same digests
+try:
+    from _sha2 import sha256
+except ImportError:
+    try:
+        from _sha256 import sha256
+    except ImportError:
+        from hashlib import sha256
+
+"""
+On-disk cache of compiled programs.
+
+A compiled program (.rpalc) holds the control structures produced by CSGenerator
+in a flat little-endian layout that is read back through mmap:
+
+    header      MAGIC, format version, SHA-256 key, string/structure/element/variable
+                counts, string id of the front end's warnings
+    strings     (count + 1) uint32 offsets into a UTF-8 blob, then the blob padded to 4 bytes
+    structures  one (first element, element count) uint32 pair per control structure
+    elements    one 4 x uint32 record (kind, a, b, c) per control structure element
+    variables   4 x uint32 records for the variables bound by lambdas
+
+The key is a hash of the interpreter version, the front end options and the program
+source, so a cache file is only used for the exact source and front end that produced it.
+The warnings the front end printed while compiling the program are kept with it and
+printed again whenever it is loaded, so a cached run prints what a fresh one does.
+"""
+
+MAGIC = b"RPALC\0\0\0"
+FORMAT_VERSION = 6
+# Bump whenever the tokenizer, parser, standardizer or CSGenerator change their output
+INTERPRETER_VERSION = "5"
+CACHE_DIRECTORY = "__rpalcache__"
+
+HEADER = struct.Struct("<8sI32sIIIII")
+RECORD = struct.Struct("<IIII")
+
+# Element record kinds
+LABEL = 0  # (LABEL, string id, -, -)
+TOKEN = 1  # (TOKEN, type string id, value string id, line number)
+LAMBDA = 2  # (LAMBDA, k, first variable, variable count)
+TAU = 3  # (TAU, number of elements, -, -)
+DELTA = 4  # (DELTA, control structure number, -, -)
+GLOBAL_REFERENCE = 5  # (GLOBAL_REFERENCE, name string id, depth, line number)
+LOCAL_REFERENCE = 6  # (LOCAL_REFERENCE, name string id, depth, slot)
+STRING_CONSTANT = 7  # (STRING_CONSTANT, string id, -, -)
+INTEGER_CONSTANT = 8  # (INTEGER_CONSTANT, string id of the decimal digits, -, -)
+LITERAL_CONSTANT = 9  # (LITERAL_CONSTANT, index in LITERAL_CONSTANTS, -, -)
+REC = 10  # (REC, first variable, variable count, lambda count); the LAMBDA records follow the variables
+
+LITERAL_CONSTANTS = (True, False, NIL, DUMMY)
+
+def sourceKey(source, variant=""):
+    """
+    Computes the cache key of a program.
+
+    Args:
+        source (bytes-like): The program source (e.g. an mmap of the file).
+        variant (str): The front end options that change the compiled program (e.g. "no-fold").
+
+    Returns:
+        bytes: The SHA-256 digest of the interpreter version, the variant and the source.
+    """
+    digest = sha256(f"{INTERPRETER_VERSION}:{variant}\n".encode())
+    digest.update(source)
+    return digest.digest()
+
+def fileKey(file, variant=""):
+    """
+    Computes the cache key of an open binary file without reading it into memory.
+    """
+    try:
+        source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty files cannot be mapped
+        return sourceKey(b"", variant)
+    try:
+        return sourceKey(source, variant)
+    finally:
+        source.close()
+
+def cachePath(filePath):
+    """
+    Returns the path of the compiled program for a source file, next to the source.
+    """
+    directory, name = os.path.split(os.path.abspath(filePath))
+    return os.path.join(directory, CACHE_DIRECTORY, name + "c")
+
+class CompiledWriter:
+    """
+    Serializes control structures into the flat .rpalc layout.
+    """
+    def __init__(self):
+        self.strings = []
+        self.stringIds = {}
+        self.elements = bytearray()
+        self.variables = bytearray()
+
+    def intern(self, value):
+        """
+        Returns the id of a string in the string table, adding it if needed.
+        """
+        stringId = self.stringIds.get(value)
+        if stringId is None:
+            stringId = len(self.strings)
+            self.strings.append(value)
+            self.stringIds[value] = stringId
+        return stringId
+
+    def encode(self, element):
+        """
+        Encodes one control structure element (or lambda variable) as a record.
+        """
+        if type(element) is str:
+            return RECORD.pack(LABEL, self.intern(element), 0, 0)
+        if type(element) is Token:
+            return RECORD.pack(TOKEN, self.intern(element.getType()), self.intern(element.getValue()), element.getLineNumber())
+        if type(element) is Constant:
+            value = element.value
+            if type(value) is str:
+                return RECORD.pack(STRING_CONSTANT, self.intern(value), 0, 0)
+            if type(value) is int:
+                return RECORD.pack(INTEGER_CONSTANT, self.intern(str(value)), 0, 0)
+            for index, literal in enumerate(LITERAL_CONSTANTS):
+                if type(value) is type(literal) and value == literal:
+                    return RECORD.pack(LITERAL_CONSTANT, index, 0, 0)
+        if type(element) is Reference:
+            if element.isGlobal():
+                return RECORD.pack(GLOBAL_REFERENCE, self.intern(element.name), element.depth, element.line)
+            return RECORD.pack(LOCAL_REFERENCE, self.intern(element.name), element.depth, element.slot)
+        if type(element) is Lambda:
+            first = len(self.variables) // RECORD.size
+            for variable in element.variables:
+                self.variables += self.encode(variable)
+            return RECORD.pack(LAMBDA, element.k, first, len(element.variables))
+        if type(element) is Rec:
+            # Lambdas are encoded first, since each appends its own variables
+            lambdas = [self.encode(lambdaControl) for lambdaControl in element.lambdas]
+            first = len(self.variables) // RECORD.size
+            for variable in element.variables:
+                self.variables += self.encode(variable)
+            for record in lambdas:
+                self.variables += record
+            return RECORD.pack(REC, first, len(element.variables), len(element.lambdas))
+        if type(element) is Tau:
+            return RECORD.pack(TAU, element.getNumberOfElements(), 0, 0)
+        if type(element) is ControlStructure:
+            return RECORD.pack(DELTA, element.number, 0, 0)
+        raise RPALException(f"Cannot compile control structure element {element!r}")
+
+    def write(self, key, controlStructures, warnings=""):
+        """
+        Returns the complete .rpalc image for the given control structures and the
+        warnings printed while compiling them.
+        """
+        warningsId = self.intern(warnings)
+        structures = bytearray()
+        for cs in controlStructures:
+            structures += struct.pack("<II", len(self.elements) // RECORD.size, len(cs.elements))
+            for element in cs.elements:
+                self.elements += self.encode(element)
+
+        blob = bytearray()
+        offsets = [0]
+        for value in self.strings:
+            blob += value.encode("utf-8")
+            offsets.append(len(blob))
+        blob += bytes(-len(blob) % 4)
+
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, key, len(self.strings), len(controlStructures),
+                             len(self.elements) // RECORD.size, len(self.variables) // RECORD.size, warningsId)
+        return b"".join([header, struct.pack(f"<{len(offsets)}I", *offsets), bytes(blob),
+                         bytes(structures), bytes(self.elements), bytes(self.variables)])
+
+def saveCompiled(path, key, controlStructures, warnings=""):
+    """
+    Writes the compiled program, with the warnings printed while compiling it, to
+    `path`, atomically replacing any previous version. Returns False (leaving no
+    partial file) when the program cannot be cached.
+    """
+    try:
+        image = CompiledWriter().write(key, controlStructures, warnings)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporaryPath = f"{path}.{os.getpid()}.tmp"
+        with open(temporaryPath, "wb") as file:
+            file.write(image)
+        os.replace(temporaryPath, path)
+        return True
+    except (OSError, RPALException):
+        return False
+
+def readCompiled(image, key):
+    """
+    Rebuilds the control structures from a .rpalc image.
+
+    Args:
+        image (bytes-like): The compiled program (e.g. an mmap of the .rpalc file).
+        key (bytes): The expected cache key.
+
+    Returns:
+        tuple: The ControlStructure instances and the warnings printed while compiling
+        them, or None if the image is stale or not a compiled program.
+    """
+    # Records are viewed in place as native uint32, which matches the file only on little-endian machines
+    if sys.byteorder != "little" or len(image) < HEADER.size:
+        return None
+    magic, version, imageKey, stringCount, structureCount, elementCount, variableCount, warningsId = HEADER.unpack_from(image, 0)
+    if magic != MAGIC or version != FORMAT_VERSION or imageKey != key:
+        return None
+
+    view = memoryview(image)
+    position = HEADER.size
+    offsets = view[position:position + 4 * (stringCount + 1)].cast("I")
+    position += 4 * (stringCount + 1)
+    blob = view[position:position + offsets[stringCount]]
+    strings = [str(blob[offsets[i]:offsets[i + 1]], "utf-8") for i in range(stringCount)]
+    position += offsets[stringCount] + (-offsets[stringCount] % 4)
+    structures = view[position:position + 8 * structureCount].cast("I")
+    position += 8 * structureCount
+    elements = view[position:position + RECORD.size * elementCount].cast("I")
+    position += RECORD.size * elementCount
+    variables = view[position:position + RECORD.size * variableCount].cast("I")
+
+    def decode(records, index):
+        kind, a, b, c = records[4 * index:4 * index + 4]
+        if kind == LABEL:
+            return strings[a]
+        if kind == TOKEN:
+            return Token(strings[a], strings[b], c)
+        if kind == LAMBDA:
+            return Lambda(a, [decode(variables, i) for i in range(b, b + c)])
+        if kind == REC:
+            return Rec([decode(variables, i) for i in range(a, a + b)],
+                       [decode(variables, i) for i in range(a + b, a + b + c)])
+        if kind == TAU:
+            return Tau(a)
+        if kind == STRING_CONSTANT:
+            return Constant(strings[a])
+        if kind == INTEGER_CONSTANT:
+            return Constant(int(strings[a]))
+        if kind == LITERAL_CONSTANT:
+            return Constant(LITERAL_CONSTANTS[a])
+        if kind == GLOBAL_REFERENCE:
+            return Reference(strings[a], c, b)
+        if kind == LOCAL_REFERENCE:
+            return Reference(strings[a], 0, b, c)
+        return controlStructures[a]
+
+    controlStructures = [ControlStructure(number) for number in range(structureCount)]
+    for cs in controlStructures:
+        first, count = structures[2 * cs.number], structures[2 * cs.number + 1]
+        cs.elements = [decode(elements, i) for i in range(first, first + count)]
+    return controlStructures, strings[warningsId]
+
+def loadCompiled(path, key):
+    """
+    Loads the compiled program at `path` through mmap.
+
+    Returns:
+        tuple: The ControlStructure instances and the warnings printed while compiling
+        them, or None if there is no usable compiled program.
+    """
+    try:
+        with open(path, "rb") as file:
+            image = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        return readCompiled(image, key)
+    except (ValueError, IndexError, TypeError, struct.error):
+        return None
+    finally:
+        try:
+            image.close()
+        except BufferError:
+            # A failed read may still hold views into the map; it is closed once they are collected
+            pass
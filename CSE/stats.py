@@ -0,0 +1,233 @@
+import json
+import time
+
+"""
+Run statistics (--stats).
+
+The front end's counts are taken between its phases: the tokens, the nodes of the
+AST as parsed, and the control structures generated with their elements. The
+front end runs as without statistics, the parser pulling tokens from the lazy
+tokenizer, which TimedTokens times on the side so tokenizing and parsing are
+reported apart. The
+machine's counters come from instrumenting the one machine running the program:
+its step handlers, and the methods entering function bodies, are replaced on the
+instance by wrappers counting them, so machines run without statistics pay nothing.
+
+    steps                  Control elements processed (CSE rules applied).
+    environments           Environments created by the run.
+    peakControlStack       Deepest control stack after a step.
+    peakStack              Deepest main (value) stack after a step.
+    maxEnvironmentChain    Longest chain of environments, from one entered to the
+                           primitive environment.
+
+The closure engine evaluates expressions directly, with neither control elements
+nor stacks, so it only counts environments and their chains.
+"""
+
+# The CSEMachine methods applying one rule each, called once per step
+CSE_STEPS = [
+    "rule1", "rule2", "ruleRec", "storeMemoized", "rule3", "rule4", "rule5", "rule6", "rule7",
+    "rule8", "rule9", "rule10", "rule11", "rule12", "applyNative", "rule13", "builtinFunction",
+]
+
+COUNT_LABELS = {
+    "tokens": "tokens",
+    "astNodes": "AST nodes",
+    "controlStructures": "control structures",
+    "controlElements": "control elements",
+}
+MACHINE_LABELS = {
+    "steps": "steps",
+    "environments": "environments created",
+    "peakControlStack": "peak control stack depth",
+    "peakStack": "peak main stack depth",
+    "maxEnvironmentChain": "max environment chain length",
+}
+
+class TimedTokens:
+    """
+    Wraps a lazy token iterator (e.g. scanFile) to count the tokens and time the
+    tokenizer, whose work is interleaved with the parser's as it pulls tokens.
+    """
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.count = 0
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            token = next(self.tokens)
+        finally:
+            self.seconds += time.perf_counter() - start
+        self.count += 1
+        return token
+
+def splitParsePhase(phases, tokens):
+    """
+    Splits the parse phase, which includes the time spent pulling tokens from the
+    tokenizer, into a tokenize phase and the parse phase proper.
+
+    Args:
+        phases (list): (phase, seconds) pairs, in the order the phases ran.
+        tokens (TimedTokens): The tokens the parser pulled.
+    """
+    for index, (name, seconds) in enumerate(phases):
+        if name == "parse":
+            phases[index:index + 1] = [("tokenize", tokens.seconds), ("parse", seconds - tokens.seconds)]
+            return
+
+def chainLength(environment):
+    """
+    Returns the number of environments from an environment to the outermost one.
+    """
+    length = 0
+    while environment is not None:
+        length += 1
+        environment = environment.parent
+    return length
+
+def controlCounts(controlStructures):
+    return {
+        "controlStructures": len(controlStructures),
+        "controlElements": sum(len(control.elements) for control in controlStructures),
+    }
+
+class MachineStats:
+    """
+    The counters of one machine's run.
+    """
+    def __init__(self, machine):
+        self.machine = machine
+        self.initialEnvironments = machine.totalEnvironments
+        # None for the counters the engine has no use for
+        self.steps = None
+        self.peakControlStack = None
+        self.peakStack = None
+        self.maxEnvironmentChain = chainLength(machine.environment)
+
+    def counted(self, handler):
+        """
+        Wraps a step handler to count the steps and record the stack depths they leave.
+        """
+        machine = self.machine
+        self.steps = self.peakControlStack = self.peakStack = 0
+        def step(*args):
+            self.steps += 1
+            result = handler(*args)
+            if len(machine.controlStack) > self.peakControlStack:
+                self.peakControlStack = len(machine.controlStack)
+            if len(machine.stack) > self.peakStack:
+                self.peakStack = len(machine.stack)
+            return result
+        return step
+
+    def entering(self, method):
+        """
+        Wraps a method entering a function body to record the length of the chain
+        of the environment it enters.
+        """
+        machine = self.machine
+        def enter(*args):
+            result = method(*args)
+            length = chainLength(machine.currentEnvironment)
+            if length > self.maxEnvironmentChain:
+                self.maxEnvironmentChain = length
+            return result
+        return enter
+
+    def compiling(self, compileStructure):
+        """
+        Wraps the closure engine's compileStructure, so every compiled body records
+        the length of the chain of the environment it runs in.
+        """
+        def compileBody(number, tail):
+            code = compileStructure(number, tail)
+            def body(env):
+                length = chainLength(env)
+                if length > self.maxEnvironmentChain:
+                    self.maxEnvironmentChain = length
+                return code(env)
+            return body
+        return compileBody
+
+    def counters(self):
+        return {
+            "steps": self.steps,
+            "environments": self.machine.totalEnvironments - self.initialEnvironments,
+            "peakControlStack": self.peakControlStack,
+            "peakStack": self.peakStack,
+            "maxEnvironmentChain": self.maxEnvironmentChain,
+        }
+
+def instrumentCSEMachine(machine, stats):
+    for name in CSE_STEPS:
+        setattr(machine, name, stats.counted(getattr(machine, name)))
+    machine.pushFrame = stats.entering(machine.pushFrame)
+
+def instrumentOpcodeMachine(machine, stats):
+    machine.handlers[:] = [stats.counted(handler) for handler in machine.handlers]
+    machine.enter = stats.entering(machine.enter)
+
+def instrumentClosureMachine(machine, stats):
+    machine.compileStructure = stats.compiling(machine.compileStructure)
+
+# Per engine (a key of Interpreter.interpreter.ENGINES), the function instrumenting its machines
+INSTRUMENTS = {
+    "cse": instrumentCSEMachine,
+    "opcode": instrumentOpcodeMachine,
+    "closure": instrumentClosureMachine,
+}
+
+def instrument(machine, engine):
+    """
+    Instruments a machine that has not run yet.
+
+    Args:
+        machine: The machine, of the engine's class.
+        engine (str): The engine's name, a key of Interpreter.interpreter.ENGINES.
+
+    Returns:
+        MachineStats: The machine's counters, updated as it runs.
+    """
+    stats = MachineStats(machine)
+    INSTRUMENTS[engine](machine, stats)
+    return stats
+
+def formatStats(engine, phases, counts, machineStats):
+    """
+    Returns the statistics of a run as text.
+
+    Args:
+        engine (str): The engine that ran the program.
+        phases (list): (phase, seconds) pairs, in the order the phases ran.
+        counts (dict): The front end's counts, by the keys of COUNT_LABELS.
+        machineStats (MachineStats): The machine's counters, or None if it did not run.
+    """
+    lines = ["Phases (ms):"]
+    lines.extend(f"{seconds * 1000:12.2f}  {name}" for name, seconds in phases)
+    lines.append(f"{sum(seconds for _, seconds in phases) * 1000:12.2f}  total")
+    lines.append("Counts:")
+    lines.extend(f"{counts[key]:12}  {label}" for key, label in COUNT_LABELS.items() if key in counts)
+    if machineStats is not None:
+        lines.append(f"Machine ({engine}):")
+        counters = machineStats.counters()
+        lines.extend(f"{'-' if counters[key] is None else counters[key]:>12}  {label}"
+                     for key, label in MACHINE_LABELS.items())
+    return "\n".join(lines)
+
+def statsJSON(engine, phases, counts, machineStats):
+    """
+    Returns the statistics of a run (see formatStats) as a line of JSON, with the
+    phase timings in seconds and null for the counters the engine does not have.
+    """
+    return json.dumps({
+        "engine": engine,
+        "phases": dict(phases),
+        "total": sum(seconds for _, seconds in phases),
+        "counts": counts,
+        "machine": machineStats.counters() if machineStats is not None else None,
+    })
@@ -0,0 +1,404 @@
+import importlib.util
+import os
+import py_compile
+
+from Exception.RPALException import RPALException
+from CSE.generateCS import Constant, ControlStructure, Lambda, Rec, Tau
+from CSE.values import DUMMY, NIL
+from CSE.operators import BINARY_FUNCTIONS, UNARY_FUNCTIONS
+from CSE.CSEMachine import OTHER_KEYWORDS
+from CSE.programCache import CACHE_DIRECTORY
+from Parser.resolver import Reference
+from Tokenizer.tokenizer import Token
+
+"""
+Ahead-of-time transpiler from control structures to Python modules.
+
+Every lambda body becomes a Python function of its environment, with the expression
+it stands for flattened into statements that evaluate operands right to left, as
+the machines do. The module runs on the ClosureRuntime of CSE.closureMachine, so it
+applies functions, loops over tail calls and prints exactly like the closure engine.
+Python byte-compiles the module and caches it in __pycache__, so running a
+transpiled program skips the front end and the compilation of its closures.
+"""
+
+# First line of every generated module; files without it are never overwritten
+HEADER = "# Generated by myrpal.py --compile from {source}; do not edit."
+# Bump whenever the generated code changes
+TRANSPILER_VERSION = "4"
+
+# Operators compiled to Python operators (on values the machines also apply them to directly)
+INLINE_BINARY_OPERATORS = {
+    "+": "{} + {}",
+    "-": "{} - {}",
+    "*": "{} * {}",
+    "gr": "{} > {}",
+    "ge": "{} >= {}",
+    "ls": "{} < {}",
+    "le": "{} <= {}",
+}
+INLINE_UNARY_OPERATORS = {
+    "not": "not {}",
+    "neg": "-{}",
+}
+# Operators compiled to calls of their CSE.operators function
+CALLED_OPERATORS = {
+    "/": "divide",
+    "eq": "valuesEqual",
+    "ne": "notEqual",
+    "**": "power",
+    "aug": "augment",
+    "&": "logicalAnd",
+    "or": "logicalOr",
+}
+# Conditionals nested deeper than this have their branches compiled into separate
+# functions, so the generated code stays within Python's indentation limit
+MAX_NESTING = 40
+
+def modulePath(filePath):
+    """
+    Returns the path of the transpiled module for a source file, next to the source.
+    """
+    directory, name = os.path.split(os.path.abspath(filePath))
+    return os.path.join(directory, CACHE_DIRECTORY, name.replace(".", "_") + ".py")
+
+def moduleKey(key):
+    """
+    Returns the key recorded in a transpiled module for the program's cache key.
+    """
+    return f"{TRANSPILER_VERSION}:{key.hex()}"
+
+class Transpiler:
+    """
+    Generates the Python module of a program from its control structures.
+    """
+    def __init__(self, controlStructures):
+        if len(controlStructures) == 0 or len(controlStructures[0].elements) == 0:
+            raise RPALException("Control structure with number 0 has no elements.")
+        self.controls = controlStructures
+        self.lines = []
+        self.references = {}
+        self.variables = {}
+        self.recs = []
+        self.pending = []
+        self.temporaries = 0
+
+    def parse(self, elements, index):
+        """
+        Parses the expression starting at elements[index] (control structures list
+        expressions in prefix order) into a tuple tree.
+
+        Returns:
+            tuple: The expression, and the index following it.
+        """
+        if index >= len(elements):
+            raise RPALException("Control structure ended in the middle of an expression.")
+        element = elements[index]
+        index += 1
+
+        if type(element) is Constant:
+            return ("constant", element.value), index
+        if type(element) is Reference:
+            return ("reference", element), index
+        if type(element) is Lambda:
+            return ("lambda", element), index
+        if type(element) is Rec:
+            return ("rec", element), index
+        if type(element) is Tau:
+            items = []
+            for _ in range(element.getNumberOfElements()):
+                item, index = self.parse(elements, index)
+                items.append(item)
+            return ("tau", items), index
+        if type(element) is ControlStructure:
+            if index + 1 >= len(elements) or type(elements[index]) is not ControlStructure or elements[index + 1] != "beta":
+                raise RPALException("Expected 'beta' after the branches of a conditional.")
+            guard, end = self.parse(elements, index + 2)
+            return ("conditional", guard, element.number, elements[index].number), end
+        if type(element) is Token:
+            return ("lookup", element.getValue(), element.getLineNumber()), index
+        if element in OTHER_KEYWORDS:
+            return ("lookup", element, 0), index
+        if element == "gamma":
+            rator, index = self.parse(elements, index)
+            rand, index = self.parse(elements, index)
+            return ("gamma", rator, rand), index
+        if element in BINARY_FUNCTIONS:
+            left, index = self.parse(elements, index)
+            right, index = self.parse(elements, index)
+            return ("binary", element, left, right), index
+        if element in UNARY_FUNCTIONS:
+            operand, index = self.parse(elements, index)
+            return ("unary", element, operand), index
+        return ("illegal",), index
+
+    def parseStructure(self, number):
+        """
+        Parses the control structure with the given number into one expression.
+        """
+        elements = self.controls[number].elements
+        expression, end = self.parse(elements, 0)
+        if end != len(elements):
+            raise RPALException(f"Control structure {number} is not a single expression.")
+        return expression
+
+    def emit(self, indent, line):
+        """
+        Appends a line of code at the given indentation level.
+        """
+        self.lines.append("    " * indent + line)
+
+    def assign(self, indent, expression):
+        """
+        Emits the evaluation of an expression into a new temporary and returns its name.
+        """
+        name = f"t{self.temporaries}"
+        self.temporaries += 1
+        self.emit(indent, f"{name} = {expression}")
+        return name
+
+    def constant(self, value):
+        """
+        Returns the Python expression of a constant value.
+        """
+        if type(value) in (int, str, bool):
+            return repr(value)
+        if value == NIL:
+            return "NIL"
+        if value == DUMMY:
+            return "DUMMY"
+        raise RPALException(f"Cannot transpile constant {value!r}")
+
+    def reference(self, reference):
+        """
+        Returns the Python expression reading a resolved identifier. Frame slots
+        are read directly; global references are looked up by name.
+        """
+        if reference.isGlobal():
+            key = (reference.name, reference.line, reference.depth)
+            name = self.references.get(key)
+            if name is None:
+                name = f"R{len(self.references)}"
+                self.references[key] = name
+            return f"env.lookUpReference({name})"
+        return "env" + ".parent" * reference.depth + f".values[{reference.slot}]"
+
+    def declareLambda(self, lambdaControl):
+        """
+        Declares the variables of a lambda and schedules its body.
+        """
+        k = lambdaControl.k
+        if k not in self.variables:
+            self.variables[k] = [v.getValue() if type(v) is Token else v for v in lambdaControl.variables]
+            self.pending.append((f"body{k}", k, True))
+        return k
+
+    def closure(self, lambdaControl):
+        """
+        Returns the Python expression making a closure of a lambda.
+        """
+        k = self.declareLambda(lambdaControl)
+        return f"makeClosure({k}, V{k}, env)"
+
+    def recursiveDefinition(self, rec):
+        """
+        Declares a recursive definition and returns the Python expression making its functions.
+        """
+        lambdas = ", ".join(f"Lambda({k}, V{k})" for k in map(self.declareLambda, rec.lambdas))
+        variables = [v.getValue() if type(v) is Token else v for v in rec.variables]
+        self.recs.append(f"Rec({variables!r}, [{lambdas}])")
+        return f"closeRec(D{len(self.recs) - 1}, env)"
+
+    def value(self, expression, indent):
+        """
+        Emits the statements evaluating an expression.
+
+        Returns:
+            str: A Python expression without side effects (a constant, a frame slot
+            or a temporary) holding the value.
+        """
+        kind = expression[0]
+        if kind == "constant":
+            return self.constant(expression[1])
+        if kind == "reference" and not expression[1].isGlobal():
+            return self.reference(expression[1])
+        if kind == "lambda":
+            return self.closure(expression[1])
+        if kind == "conditional":
+            guard = self.value(expression[1], indent)
+            name = f"t{self.temporaries}"
+            self.temporaries += 1
+            self.emit(indent, f"if {guard}:")
+            self.emit(indent + 1, f"{name} = {self.branch(expression[2], indent + 1)}")
+            self.emit(indent, "else:")
+            self.emit(indent + 1, f"{name} = {self.branch(expression[3], indent + 1)}")
+            return name
+        if kind == "illegal":
+            self.emit(indent, "runtime.illegal()")
+            return "None"
+        return self.assign(indent, self.operation(expression, indent))
+
+    def operation(self, expression, indent):
+        """
+        Emits the statements evaluating the operands of an expression, right to left,
+        and returns the Python expression applying its operator to them.
+        """
+        kind = expression[0]
+        if kind == "reference":
+            return self.reference(expression[1])
+        if kind == "rec":
+            return self.recursiveDefinition(expression[1])
+        if kind == "lookup":
+            return f"env.lookUpValue({expression[1]!r}, {expression[2]})"
+        if kind == "tau":
+            values = [self.value(item, indent) for item in reversed(expression[1])]
+            values.reverse()
+            return f"tupleOf([{', '.join(values)}])"
+        if kind == "gamma":
+            argument = self.value(expression[2], indent)
+            function = self.value(expression[1], indent)
+            return f"apply({function}, {argument})"
+        if kind == "binary":
+            right = self.value(expression[3], indent)
+            left = self.value(expression[2], indent)
+            operator = expression[1]
+            if operator in INLINE_BINARY_OPERATORS:
+                return INLINE_BINARY_OPERATORS[operator].format(left, right)
+            return f"{CALLED_OPERATORS[operator]}({left}, {right})"
+        if kind == "unary":
+            operand = self.value(expression[2], indent)
+            return INLINE_UNARY_OPERATORS[expression[1]].format(operand)
+        return self.value(expression, indent)
+
+    def result(self, expression, indent, tail):
+        """
+        Emits the statements evaluating an expression and returning its value. In
+        tail position, applications are returned as TailCalls.
+        """
+        kind = expression[0]
+        if kind == "conditional":
+            guard = self.value(expression[1], indent)
+            self.emit(indent, f"if {guard}:")
+            self.tailBranch(expression[2], indent + 1, tail)
+            self.emit(indent, "else:")
+            self.tailBranch(expression[3], indent + 1, tail)
+        elif kind == "gamma" and tail:
+            argument = self.value(expression[2], indent)
+            function = self.value(expression[1], indent)
+            self.emit(indent, f"return tailApply({function}, {argument})")
+        elif kind in ("constant", "lambda", "illegal"):
+            self.emit(indent, f"return {self.value(expression, indent)}")
+        else:
+            self.emit(indent, f"return {self.operation(expression, indent)}")
+
+    def branch(self, number, indent):
+        """
+        Emits the statements of a conditional branch and returns the expression of its value.
+        """
+        if indent < MAX_NESTING:
+            return self.value(self.parseStructure(number), indent)
+        self.pending.append((f"delta{number}", number, False))
+        return f"delta{number}(env)"
+
+    def tailBranch(self, number, indent, tail):
+        """
+        Emits the statements of a conditional branch returning its value.
+        """
+        if indent < MAX_NESTING:
+            self.result(self.parseStructure(number), indent, tail)
+        else:
+            self.pending.append((f"delta{number}", number, tail))
+            self.emit(indent, f"return delta{number}(env)")
+
+    def function(self, name, number, tail):
+        """
+        Emits the function evaluating the control structure with the given number.
+        """
+        self.temporaries = 0
+        self.emit(0, f"def {name}(env, apply=apply, tailApply=tailApply, makeClosure=makeClosure):")
+        self.result(self.parseStructure(number), 1, tail)
+        self.emit(0, "")
+
+    def transpile(self, key, sourceName):
+        """
+        Returns the source of the Python module for the program.
+
+        Args:
+            key (bytes): The program's cache key, recorded to detect stale modules.
+            sourceName (str): The name of the program's source file.
+        """
+        self.function("body0", 0, False)
+        while self.pending:
+            name, number, tail = self.pending.pop()
+            self.function(name, number, tail)
+        functions = self.lines
+
+        self.lines = []
+        self.emit(0, HEADER.format(source=sourceName))
+        self.emit(0, "from CSE.closureMachine import ClosureRuntime, makeClosure, tupleOf")
+        self.emit(0, "from CSE.generateCS import Lambda, Rec")
+        self.emit(0, "from CSE.operators import augment, divide, logicalAnd, logicalOr, notEqual, power")
+        self.emit(0, "from CSE.values import DUMMY, NIL, valuesEqual")
+        self.emit(0, "from Parser.resolver import Reference")
+        self.emit(0, "")
+        self.emit(0, f"SOURCE_KEY = {moduleKey(key)!r}")
+        self.emit(0, "")
+        for (referenceName, line, depth), name in self.references.items():
+            self.emit(0, f"{name} = Reference({referenceName!r}, {line}, {depth})")
+        for k in sorted(self.variables):
+            self.emit(0, f"V{k} = {self.variables[k]!r}")
+        for number, rec in enumerate(self.recs):
+            self.emit(0, f"D{number} = {rec}")
+        self.emit(0, "")
+        self.emit(0, "runtime = ClosureRuntime()")
+        self.emit(0, "apply = runtime.apply")
+        self.emit(0, "tailApply = runtime.tailApply")
+        self.emit(0, "closeRec = runtime.closeRec")
+        self.emit(0, "")
+        self.lines.extend(functions)
+        bodies = ", ".join(f"body{k}" if k == 0 or k in self.variables else "None" for k in range(len(self.controls)))
+        self.emit(0, f"runtime.bodies = [{bodies}]")
+        self.emit(0, "")
+        self.emit(0, "def main(environment):")
+        self.emit(1, "runtime.environment = environment")
+        self.emit(1, "runtime.interpret()")
+        return "\n".join(self.lines) + "\n"
+
+def writeModule(path, source):
+    """
+    Writes a transpiled module to `path` and byte-compiles it. The bytecode is
+    validated against the module's hash rather than its timestamp, so a module
+    rewritten within the same second is never run from stale bytecode.
+
+    Raises:
+        RPALException: If `path` exists and is not a transpiled module.
+    """
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            if not file.readline().startswith(HEADER.split("{")[0]):
+                raise RPALException(f"Refusing to overwrite {path}, which was not generated by --compile.")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporaryPath = f"{path}.{os.getpid()}.tmp"
+    with open(temporaryPath, "w", encoding="utf-8") as file:
+        file.write(source)
+    os.replace(temporaryPath, path)
+    py_compile.compile(path, doraise=True, invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH)
+
+def loadModule(path, key):
+    """
+    Imports the transpiled module at `path` (from its cached bytecode when it is current).
+
+    Returns:
+        module: The module, or None if there is none or it was transpiled from another source.
+    """
+    if not os.path.exists(path):
+        return None
+    spec = importlib.util.spec_from_file_location(f"rpal_{os.path.basename(path)[:-3]}", path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except (ImportError, SyntaxError):
+        return None
+    if getattr(module, "SOURCE_KEY", None) != moduleKey(key):
+        return None
+    return module
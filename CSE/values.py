@@ -0,0 +1,287 @@
+"""
+Runtime representations of RPAL values that are not plain Python values.
+"""
+
+def valuesEqual(value1, value2):
+    """
+    Equality of RPAL values. Truth values are Python bools, which Python takes
+    for the integers 0 and 1, but are never equal to an integer.
+    """
+    if (type(value1) is bool) is not (type(value2) is bool):
+        return False
+    return value1 == value2
+
+class RPALTuple:
+    """
+    An immutable RPAL tuple sharing an append-only buffer with the tuples it was built from.
+
+    A tuple is the first `length` elements of `buffer`. Augmenting the tuple that ends
+    at the end of its buffer appends to the buffer in place, so building a tuple by
+    repeated 'aug' takes amortized constant time per element; augmenting any other
+    tuple (one that was already augmented) copies its elements into a new buffer.
+    The elements of a tuple are never modified, so every tuple sharing a buffer
+    keeps its value.
+
+    Tuples index, iterate, compare and print like the Python lists they replace.
+    """
+    __slots__ = ("buffer", "length")
+
+    def __init__(self, elements=None):
+        """
+        Initialize a tuple holding the given elements (a list it takes ownership of).
+        """
+        self.buffer = elements if elements is not None else []
+        self.length = len(self.buffer)
+
+    def augment(self, element):
+        """
+        Returns a new tuple with `element` appended after the elements of this one.
+        """
+        if self.length == len(self.buffer):
+            buffer = self.buffer
+        else:
+            buffer = self.toList()
+        buffer.append(element)
+        result = RPALTuple.__new__(RPALTuple)
+        result.buffer = buffer
+        result.length = self.length + 1
+        return result
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError("tuple index out of range")
+        return self.buffer[index]
+
+    def __iter__(self):
+        buffer = self.buffer
+        for index in range(self.length):
+            yield buffer[index]
+
+    def __eq__(self, other):
+        if type(other) is not RPALTuple:
+            return NotImplemented
+        # Nested tuples are compared from a list of pairs, so no nesting is too deep
+        pending = [(self, other)]
+        while pending:
+            tuple1, tuple2 = pending.pop()
+            if tuple1.length != tuple2.length:
+                return False
+            if tuple1.buffer is tuple2.buffer:
+                continue
+            for a, b in zip(tuple1, tuple2):
+                if type(a) is RPALTuple and type(b) is RPALTuple:
+                    pending.append((a, b))
+                elif not valuesEqual(a, b):
+                    return False
+        return True
+
+    __hash__ = None
+
+    # Tuples order lexicographically, as lists do
+    def __lt__(self, other):
+        return self.toList() < other.toList() if type(other) is RPALTuple else NotImplemented
+
+    def __le__(self, other):
+        return self.toList() <= other.toList() if type(other) is RPALTuple else NotImplemented
+
+    def __gt__(self, other):
+        return self.toList() > other.toList() if type(other) is RPALTuple else NotImplemented
+
+    def __ge__(self, other):
+        return self.toList() >= other.toList() if type(other) is RPALTuple else NotImplemented
+
+    def toList(self):
+        """
+        Returns the elements of the tuple as a new list.
+        """
+        return self.buffer[:self.length]
+
+    def __repr__(self):
+        return repr(self.toList())
+
+class Rope:
+    """
+    A string built by 'Conc', kept as the two strings it joins until it is observed.
+
+    Concatenating is constant time, so building a string by repeated 'Conc' is linear
+    overall; the rope is flattened (once, iteratively) the first time its characters
+    are needed, and then behaves like the flat string everywhere.
+    """
+    __slots__ = ("left", "right", "length", "flat")
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.length = len(left) + len(right)
+        self.flat = None
+
+    def __str__(self):
+        if self.flat is None:
+            pieces = []
+            pending = [self]
+            while pending:
+                node = pending.pop()
+                if type(node) is not Rope:
+                    pieces.append(str(node))
+                elif node.flat is not None:
+                    pieces.append(node.flat)
+                else:
+                    pending.append(node.right)
+                    pending.append(node.left)
+            self.flat = "".join(pieces)
+            # The pieces are no longer needed once flattened
+            self.left = self.right = None
+        return self.flat
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other):
+        return str(self) == str(other) if isinstance(other, STRING_TYPES) else NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __lt__(self, other):
+        return str(self) < str(other) if isinstance(other, STRING_TYPES) else NotImplemented
+
+    def __le__(self, other):
+        return str(self) <= str(other) if isinstance(other, STRING_TYPES) else NotImplemented
+
+    def __gt__(self, other):
+        return str(self) > str(other) if isinstance(other, STRING_TYPES) else NotImplemented
+
+    def __ge__(self, other):
+        return str(self) >= str(other) if isinstance(other, STRING_TYPES) else NotImplemented
+
+    def __repr__(self):
+        return repr(str(self))
+
+class StringView:
+    """
+    A suffix of a string, as the base string and the offset it starts at.
+
+    'Stern' returns a view instead of copying the rest of the string, so walking a
+    string with 'Stem' and 'Stern' takes constant time and memory per step. Views
+    compare, order, print and concatenate like the suffix they stand for.
+    """
+    __slots__ = ("base", "offset")
+
+    def __init__(self, base, offset):
+        self.base = base
+        self.offset = offset
+
+    def first(self):
+        """
+        Returns the first character of the view ('' when it is empty).
+        """
+        return self.base[self.offset] if self.offset < len(self.base) else ''
+
+    def rest(self):
+        """
+        Returns the view without its first character.
+        """
+        return StringView(self.base, min(self.offset + 1, len(self.base)))
+
+    def __str__(self):
+        return self.base[self.offset:]
+
+    def __len__(self):
+        return len(self.base) - self.offset
+
+    def __eq__(self, other):
+        if not isinstance(other, STRING_TYPES):
+            return NotImplemented
+        # Compared in place, without copying the suffix
+        return len(self) == len(other) and self.base.startswith(str(other), self.offset)
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __lt__(self, other):
+        return str(self) < str(other) if isinstance(other, STRING_TYPES) else NotImplemented
+
+    def __le__(self, other):
+        return str(self) <= str(other) if isinstance(other, STRING_TYPES) else NotImplemented
+
+    def __gt__(self, other):
+        return str(self) > str(other) if isinstance(other, STRING_TYPES) else NotImplemented
+
+    def __ge__(self, other):
+        return str(self) >= str(other) if isinstance(other, STRING_TYPES) else NotImplemented
+
+    def __repr__(self):
+        return repr(str(self))
+
+# Representations of RPAL string values
+STRING_TYPES = (str, Rope, StringView)
+
+class Primitive:
+    """
+    A primitive function bound in the primitive environment (or one of the constants
+    nil and dummy), named by the name the machines dispatch on. Primitives are distinct from every string value,
+    so a program's strings can never be mistaken for them.
+    """
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, other):
+        return self.name == other.name if type(other) is Primitive else NotImplemented
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return repr(self.name)
+
+# The empty tuple
+NIL = Primitive("nil")
+# The value of 'dummy'
+DUMMY = Primitive("dummy")
+# Returned by CSE.memo.Memo.lookUp when there is no cached result; defined here so
+# the machines can test for it without importing the memo module
+MISSING = object()
+
+class Native:
+    """
+    A function of a native library (CSE.nativeLibrary), implemented in Python and
+    applied to its arguments one at a time like a curried RPAL function. Applying
+    it to fewer than `arity` arguments returns a Native holding the arguments so far.
+    """
+    __slots__ = ("name", "arity", "function", "arguments")
+
+    def __init__(self, name, arity, function, arguments=()):
+        self.name = name
+        self.arity = arity
+        self.function = function
+        self.arguments = arguments
+
+    def apply(self, argument, call):
+        """
+        Applies the function to one more argument.
+
+        Args:
+            argument: The argument.
+            call (callable): The machine's call(function, argument), which applies an
+                RPAL function value and returns its result, for natives taking functions.
+        """
+        arguments = self.arguments + (argument,)
+        if len(arguments) < self.arity:
+            return Native(self.name, self.arity, self.function, arguments)
+        return self.function(call, *arguments)
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return repr(self.name)
@@ -5,21 +5,50 @@ class Environment:
     """
     Represents an environment for variable bindings, supporting nested (parent) environments.
     Used for variable lookup and scope management in an interpreter.
+    Environments are referenced directly by the closures created in them (and by
+    their children), so an environment nothing live can reach is reclaimed.
     """
+    __slots__ = ("parent", "variables", "values", "number")
 
-    def __init__(self, number, parent=None, variables=None):
+    def __init__(self, number, parent=None, variables=None, values=None):
         """
         Initialize a new Environment.
 
         Args:
             number (int): Unique identifier for the environment.
             parent (Environment, optional): Reference to the parent environment. Defaults to None.
-            variables (dict, optional): Dictionary of variable bindings. Defaults to empty dict.
+            variables (dict, optional): Dictionary of variable bindings. Defaults to empty dict,
+                or to None for a frame.
+            values (list, optional): Variable bindings by slot, for the frame of a lambda
+                application addressed through Parser.resolver References. Defaults to None.
         """
         self.parent = parent  # Reference to the parent environment (for nested scopes)
-        self.variables = variables if variables is not None else {}  # Variable bindings in this environment
+        self.values = values  # Variable bindings by slot in this frame
+        # Variable bindings by name in this environment
+        self.variables = variables if variables is not None or values is not None else {}
         self.number = number  # Unique identifier for this environment
 
+    def lookUpReference(self, reference):
+        """
+        Look up the value of a resolved identifier.
+
+        Args:
+            reference (Reference): The lexical address of the identifier.
+
+        Returns:
+            The value in the referenced slot, or for a global reference, the value
+            found by name from the environment `reference.depth` parents up.
+
+        Raises:
+            RPALException: If a global identifier is not found in any environment.
+        """
+        environment = self
+        for _ in range(reference.depth):
+            environment = environment.parent
+        if reference.slot is None:
+            return environment.lookUpValue(reference.name, reference.line)
+        return environment.values[reference.slot]
+
     def lookUpValue(self, name, line=0):
         """
         Look up the value of a variable or token in the environment chain.
@@ -37,17 +66,10 @@ class Environment:
         
         # If name is a Token, extract its line number and value
         if type(name) is Token:
-            if name.getType() == "INT":
-                # If the token is an integer, return its integer value directly
-                return int(name.getValue())
-            if name.getType() == "STRING":
-                # If the token is a string, return its string value directly
-                return name.getValue()
-            
             line = name.getLineNumber()
             name = name.getValue()
-        # Check if the name exists in the current environment
-        if name in self.variables:
+        # Check if the name exists in the current environment (frames have no names)
+        if self.variables is not None and name in self.variables:
             #print(f"Found {name} in environment {self.number}")
             return self.variables[name]
         # If not found in the current environment, check the parent environment recursively
@@ -0,0 +1,162 @@
+import sys
+
+from Tokenizer.tokenizer import scanFile
+from Parser.parser import Parser
+from Parser.folder import FoldAST, countNodes
+from Parser.resolver import ResolveAST
+from Parser.standardizer import StandardizeAST
+from CSE.generateCS import CSGenerator
+from CSE.values import NIL, Primitive
+from CSE.programCache import cachePath, loadCompiled, saveCompiled
+
+"""
+The interpreter shared by myrpal.py and the modules running programs for it
+(Batch.batch, Server.server, Session.session): the primitive environment, the
+execution engines and the front end compiling a program into control structures,
+through the compiled program cache or not.
+"""
+
+# Predefined primitive environment variables for the interpreter
+PRIMITIVE_ENVIRONMENT_VARIABLES = {
+    "Print": Primitive("print"),
+    "nil": NIL,
+    "Y": Primitive("Y"),
+    "print": Primitive("print"),
+    "Conc": Primitive("conc"),
+    "Stem": Primitive("stem"),
+    "Stern": Primitive("stern"),
+    "Isinteger": Primitive("isInteger"),
+    "Isstring": Primitive("isString"),
+    "Istruthvalue": Primitive("isTruthValue"),
+    "Isfunction": Primitive("isFunction"),
+    "Istuple": Primitive("isTuple"),
+    "Isdummy": Primitive("isDummy"),
+    "Order": Primitive("order"),
+    "Null": Primitive("null"),
+}
+
+class EngineRegistry(dict):
+    """
+    The execution engines by name. Each maps to the path of its class, which is
+    imported the first time the engine is looked up.
+    """
+    def __getitem__(self, name):
+        engine = dict.__getitem__(self, name)
+        if type(engine) is str:
+            moduleName, _, className = engine.rpartition(".")
+            engine = getattr(__import__(moduleName, fromlist=[className]), className)
+            self[name] = engine
+        return engine
+
+# Execution engines selectable with --engine=<name>
+ENGINES = EngineRegistry({
+    "cse": "CSE.CSEMachine.CSEMachine",
+    "opcode": "CSE.opcodeMachine.OpcodeMachine",
+    "closure": "CSE.closureMachine.ClosureMachine",
+})
+
+def compileFile(file, printAST=False, fold=True, reportFold=False):
+    """
+    Runs the front end (tokenizer, parser, standardizer, resolver, constant folder
+    and control structure generator) over an open binary file.
+
+    Args:
+        file: The source file, opened in binary mode.
+        printAST (bool): Print the AST before standardizing it.
+        fold (bool): Fold constant expressions.
+        reportFold (bool): Report the number of nodes removed by folding on stderr.
+
+    Returns:
+        list: The generated ControlStructure instances.
+    """
+    # Tokenize the memory-mapped file lazily while parsing it into an AST,
+    # so the full token list is never resident
+    return compileTokens(scanFile(file), printAST, fold, reportFold)
+
+def compileTokens(tokens, printAST=False, fold=True, reportFold=False, endPhase=None, counts=None):
+    """
+    Runs the parser, standardizer, resolver, constant folder and control structure
+    generator over a program's tokens (see compileFile).
+
+    Args:
+        tokens (iterable): The program's Token objects, pulled on demand.
+        endPhase (callable): (Optional) Called with each phase's name when it ends
+            (see myrpal.main), and with None to discard the time spent counting.
+        counts (dict): (Optional) Receives the number of AST nodes and of control
+            structures and elements (see CSE.stats); requires endPhase.
+
+    Returns:
+        list: The generated ControlStructure instances.
+    """
+    par = Parser(tokens)
+    ast = par.E()
+    if endPhase is not None:
+        endPhase("parse")
+    if counts is not None:
+        counts["astNodes"] = countNodes(ast)
+
+    # Optionally print the AST if requested
+    if printAST:
+        ast.trav(0)
+        print()
+    if endPhase is not None:
+        endPhase(None)
+
+    # Standardize the AST for further processing
+    StandardizeAST().standardize(ast)
+    if endPhase is not None:
+        endPhase("standardize")
+    # Resolve identifiers to lexical addresses
+    ResolveAST().resolve(ast)
+    if endPhase is not None:
+        endPhase("resolve")
+    # Fold constant expressions
+    if fold:
+        removed = FoldAST(PRIMITIVE_ENVIRONMENT_VARIABLES).fold(ast)
+        if reportFold:
+            print(f"Constant folding removed {removed} nodes.", file=sys.stderr)
+        if endPhase is not None:
+            endPhase("fold")
+    # Generate control structures from the standardized AST
+    csGenerator = CSGenerator()
+    controlStructures = csGenerator.generate(ast)
+    if endPhase is not None:
+        endPhase("generate")
+    if counts is not None:
+        from CSE.stats import controlCounts
+        counts.update(controlCounts(controlStructures))
+        endPhase(None)
+    return controlStructures
+
+def loadOrCompileFile(file, file_path, key, fold=True):
+    """
+    Returns the control structures of a source file from the compiled program cache,
+    compiling the file and refreshing the cache when it is missing or stale. The
+    front end's warnings are printed either way, replayed from the cache on a hit.
+
+    Args:
+        file: The source file, opened in binary mode.
+        file_path (str): The path of the source file.
+        key (bytes): The file's cache key (see CSE.programCache.fileKey).
+        fold (bool): Fold constant expressions.
+
+    Returns:
+        list: The ControlStructure instances.
+    """
+    compiledPath = cachePath(file_path)
+    compiled = loadCompiled(compiledPath, key)
+    if compiled is not None:
+        controlStructures, warnings = compiled
+        print(warnings, end="")
+        return controlStructures
+    # Only needed to compile, which a cached run skips
+    import contextlib
+    import io
+    warnings = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(warnings):
+            controlStructures = compileFile(file, fold=fold)
+    finally:
+        print(warnings.getvalue(), end="")
+    saveCompiled(compiledPath, key, controlStructures, warnings.getvalue())
+    return controlStructures
@@ -0,0 +1,151 @@
+from Exception.RPALException import RPALException
+from Parser.parser import Node
+from Parser.resolver import Reference
+from CSE.generateCS import Constant, literalConstant
+from CSE.operators import BINARY_FUNCTIONS, BUILTIN_OPERATOR_FUNCTIONS, UNARY_FUNCTIONS, conc
+from CSE.values import STRING_TYPES, Primitive
+
+# Operators that are not folded: 'aug' builds tuples, which share mutable buffers
+UNFOLDED_OPERATORS = ["aug"]
+# Larger exponents are left to run time, so an unused huge power costs nothing
+MAX_FOLDED_EXPONENT = 64
+
+def countNodes(node):
+    """
+    Returns the number of nodes in the tree rooted at `node`.
+    """
+    count = 0
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        count += 1
+        pending.extend(current.child)
+    return count
+
+class FoldAST:
+    """
+    Constant folding pass over the resolved standardized tree.
+    Replaces applications of operators and string/type primitives to constants by
+    the constant they evaluate to, and conditionals with a constant guard by the
+    branch they take. An application that fails (e.g. a division by zero) is left
+    alone, so the error is still raised when, and only if, it is executed.
+    """
+    def __init__(self, primitives):
+        """
+        Initialize the FoldAST class.
+
+        Args:
+            primitives (dict): The variables of the environment the program runs in;
+                global references to the Primitive values in it are folded.
+        """
+        self.primitives = primitives
+        self.removed = 0
+
+    def fold(self, node):
+        """
+        Folds the tree rooted at `node` in place.
+
+        Args:
+            node: The root node of the resolved standardized tree.
+
+        Returns:
+            int: The number of nodes removed from the tree.
+
+        Raises:
+            RPALException: If the node is None or not a Node instance.
+        """
+        if node is None:
+            raise RPALException("Node is None")
+        if not isinstance(node, Node):
+            raise RPALException("Node is not an instance of Node class")
+        self.removed = 0
+        self.foldNode(node)
+        return self.removed
+
+    def replace(self, node, replacement):
+        """
+        Replaces `node` in place by `replacement` (a Constant or another node), counting the nodes removed.
+        """
+        before = countNodes(node)
+        if type(replacement) is Constant:
+            node.head = replacement
+            node.child = []
+        else:
+            node.head = replacement.head
+            node.child = replacement.child
+        self.removed += before - countNodes(node)
+
+    def primitiveName(self, node):
+        """
+        Returns the name of the primitive function a node refers to, or None.
+        """
+        reference = node.head
+        if type(reference) is not Reference or not reference.isGlobal() or node.child:
+            return None
+        value = self.primitives.get(reference.name)
+        return value.name if type(value) is Primitive else None
+
+    def evaluate(self, function, *operands):
+        """
+        Applies `function` to constant operands and returns the resulting Constant,
+        or None if the application fails or does not produce a constant value.
+        """
+        try:
+            value = function(*operands)
+        except Exception:
+            return None
+        if isinstance(value, STRING_TYPES):
+            return Constant(str(value))
+        if type(value) is int or type(value) is bool:
+            return Constant(value)
+        return None
+
+    def foldNode(self, node):
+        """
+        Folds the children of `node` and then `node` itself.
+        """
+        for child in node.child:
+            self.foldNode(child)
+
+        head = node.head
+        if type(head) is not str:
+            return
+        constants = [literalConstant(child) for child in node.child]
+
+        if head == "->" and len(node.child) == 3:
+            guard = constants[0]
+            if guard is not None and type(guard.value) is bool:
+                self.replace(node, node.child[1] if guard.value else node.child[2])
+            return
+
+        if None in constants:
+            if head == "gamma" and len(node.child) == 2 and constants[1] is not None:
+                self.foldApplication(node, constants[1].value)
+            return
+        values = [constant.value for constant in constants]
+
+        result = None
+        if head == "**" and not (type(values[1]) is int and values[1] <= MAX_FOLDED_EXPONENT):
+            return
+        if head in BINARY_FUNCTIONS and head not in UNFOLDED_OPERATORS and len(values) == 2:
+            result = self.evaluate(BINARY_FUNCTIONS[head], values[0], values[1])
+        elif head in UNARY_FUNCTIONS and len(values) == 1:
+            result = self.evaluate(UNARY_FUNCTIONS[head], values[0])
+        if result is not None:
+            self.replace(node, result)
+
+    def foldApplication(self, node, argument):
+        """
+        Folds a 'gamma' node applying a primitive (or 'Conc' and its first argument) to a constant.
+        """
+        rator = node.child[0]
+        name = self.primitiveName(rator)
+        result = None
+        if name in BUILTIN_OPERATOR_FUNCTIONS:
+            result = self.evaluate(BUILTIN_OPERATOR_FUNCTIONS[name], argument)
+        elif rator.head == "gamma" and len(rator.child) == 2 and self.primitiveName(rator.child[0]) == "conc":
+            first = literalConstant(rator.child[1])
+            if first is not None:
+                result = self.evaluate(conc, first.value, argument)
+        if result is not None:
+            self.replace(node, result)
@@ -1,4 +1,4 @@
-from Tokenizer.tokenizer import Token, tokenize
+from Tokenizer.tokenizer import Token, TokenStream, tokenize
 from Exception.RPALException import RPALException
 
 
@@ -43,29 +43,32 @@ class Node:
 
 class Parser:
     def __init__(self,tokens):
-        self.tokens = tokens
+        # tokens may be a list, any token iterator (pulled on demand) or a TokenStream
+        self.tokens = tokens if isinstance(tokens, TokenStream) else TokenStream(tokens)
         self.pos = 0
 
+    def hasToken(self):
+        return self.tokens.has(self.pos)
+
     def gettoken(self):
-        if self.pos<len(self.tokens):
-            return self.tokens[self.pos]
+        token = self.tokens.get(self.pos)
+        if token is not None:
+            return token
         else:
             return RPALException(f"index out of range")
     def movenext(self):
-        if self.pos < len(self.tokens):
+        if self.hasToken():
             self.pos += 1
+            # keep one token behind for list_form_finder to step back to
+            self.tokens.release(self.pos - 1)
         else:
             raise SyntaxError(f"Cannot move past end of tokens")
         
     def matchtype(self, value):
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos].type == value
-        return False
+        return self.tokens.matchType(self.pos, value)
     
     def match(self, value):
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos].value == value
-        return False
+        return self.tokens.matchValue(self.pos, value)
         
 
         
@@ -88,7 +91,7 @@ class Parser:
             li = []
             li.append(self.Vb())
             n = 1
-            while self.pos < len(self.tokens) and (self.matchtype("ID") or self.match("(")):
+            while self.hasToken() and (self.matchtype("ID") or self.match("(")):
                 li.append(self.Vb())
                 n+=1
             if self.match("."):
@@ -192,7 +195,7 @@ class Parser:
 
     def Bp(self):
         l1 = self.A()
-        if self.pos < len(self.tokens):
+        if self.hasToken():
             if self.match("gr") or self.match(">"):
                 self.movenext()
                 l2 = self.A()
@@ -255,7 +258,7 @@ class Parser:
             return Node("neg",[l1])
         else:
             l2 = self.At()
-            while self.pos < len(self.tokens):
+            while self.hasToken():
                 if self.match("+"):
                     self.movenext()
                     l3 = self.At()
@@ -274,7 +277,7 @@ class Parser:
 
     def At(self):
         l1 = self.Af()
-        while self.pos < len(self.tokens) and (self.match("*") or self.match("/")):
+        while self.hasToken() and (self.match("*") or self.match("/")):
             if self.match("*"):
                 self.movenext()
                 l2 = self.Af()
@@ -323,7 +326,7 @@ class Parser:
         return l1
     
     def can_start(self):
-        if self.pos >= len(self.tokens):
+        if not self.hasToken():
             return False
         return (self.matchtype("ID") or 
                 self.matchtype("INT") or 
@@ -336,7 +339,7 @@ class Parser:
     
     def R(self):
         l1 = self.Rn()
-        while self.pos < len(self.tokens) and self.can_start():
+        while self.hasToken() and self.can_start():
             l2 = self.Rn()
             #print("R -> R Rn")
             l1= Node ("gamma",[l1,l2])
@@ -378,7 +381,7 @@ class Parser:
             else:
                 raise RPALException(f"Exception at line {self.gettoken().getLineNumber() if type(self.gettoken()) is Token else 'last line'}. got ''{self.gettoken().getValue()  if type(self.gettoken()) is Token else 'null'}'' where expected value '')''")
         
-        elif self.matchtype("dummy"):
+        elif self.match("dummy"):
             l2 = Node("dummy")
             self.movenext()
             #print( "Rn -> dummy")
@@ -428,8 +431,8 @@ class Parser:
            
     
     def checkvl(self):
-        if self.gettoken().type == "ID" and (self.pos + 1 < len(self.tokens)):
-            return self.tokens[self.pos + 1].value == "," or self.tokens[self.pos + 1].value == "="
+        if self.gettoken().type == "ID":
+            return self.tokens.matchValue(self.pos + 1, ",") or self.tokens.matchValue(self.pos + 1, "=")
         return False
     def list_form_finder(self):
         if not self.matchtype("ID"):
@@ -462,7 +465,7 @@ class Parser:
             self.movenext()
             li.append(self.Vb())
             n = 1
-            while self.pos < len(self.tokens) and (self.matchtype("ID") or self.match("(")):
+            while self.hasToken() and (self.matchtype("ID") or self.match("(")):
                 li.append(self.Vb())
                 n+=1
             if self.match("="):
@@ -0,0 +1,107 @@
+from Exception.RPALException import RPALException
+from Parser.parser import Node
+from Tokenizer.tokenizer import Token
+
+# Primitive names that appear as labels (not identifiers) in the standardized tree
+PRIMITIVE_LABELS = ["Y"]
+
+class Reference:
+    """
+    A resolved identifier in the standardized tree and its control structures.
+    A local reference names the variable in slot `slot` of the environment found
+    `depth` parents up from the current one. A global reference (slot is None)
+    names a variable of the environment `depth` parents up (the one the program
+    runs in, usually the primitive environment), which is searched by name.
+    """
+    __slots__ = ("name", "line", "depth", "slot")
+
+    def __init__(self, name, line, depth, slot=None):
+        self.name = name
+        self.line = line
+        self.depth = depth
+        self.slot = slot
+
+    def isGlobal(self):
+        return self.slot is None
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"Reference({self.name}, {self.depth}, {self.slot})"
+
+def boundNames(binder):
+    """
+    Returns the names bound by the first child of a 'lambda' node, in slot order.
+    """
+    if binder.head == ",":
+        return [child.head.getValue() if type(child.head) is Token else child.head for child in binder.child]
+    if type(binder.head) is Token:
+        return [binder.head.getValue()]
+    return [binder.head]  # e.g. '()' binds its argument to an unreachable name
+
+class ResolveAST:
+    """
+    Lexical addressing pass over the standardized tree.
+    Replaces every identifier (and the primitive label Y) by a Reference,
+    so the machines find a variable with a fixed number of parent hops and one
+    list index instead of searching a chain of dictionaries.
+    """
+    def __init__(self):
+        """
+        Initialize the ResolveAST class.
+        This class does not require any initialization parameters.
+        """
+        pass
+
+    def resolveName(self, name, line, scopes):
+        """
+        Builds the Reference of `name` used under the given lambda scopes (innermost last).
+        """
+        depth = 0
+        for scope in reversed(scopes):
+            slot = scope.get(name)
+            if slot is not None:
+                return Reference(name, line, depth, slot)
+            depth += 1
+        return Reference(name, line, depth)
+
+    def resolve(self, node, scopes=None):
+        """
+        Recursively resolves the identifiers of the standardized tree rooted at `node`.
+        Already resolved identifiers are left alone, so the pass can run more than once.
+
+        Args:
+            node: The root node of the standardized tree.
+            scopes (list, optional): The enclosing lambda scopes, each a dict of name -> slot.
+
+        Raises:
+            RPALException: If the node is None or not a Node instance.
+        """
+        if node is None:
+            raise RPALException("Node is None")
+        if not isinstance(node, Node):
+            raise RPALException("Node is not an instance of Node class")
+        if scopes is None:
+            scopes = []
+
+        head = node.head
+        if type(head) is Token:
+            if head.getType() == "ID":
+                node.changeHead(self.resolveName(head.getValue(), head.getLineNumber(), scopes))
+            return
+        if head in PRIMITIVE_LABELS and not node.child:
+            node.changeHead(self.resolveName(head, 0, scopes))
+            return
+
+        if head == "lambda" and len(node.child) == 2:
+            # The binder is not an identifier use; the body sees one more scope
+            names = boundNames(node.getChild(0))
+            scope = {name: slot for slot, name in enumerate(names)}
+            scopes.append(scope)
+            self.resolve(node.getChild(1), scopes)
+            scopes.pop()
+            return
+
+        for child in node.child:
+            self.resolve(child, scopes)
@@ -1,7 +1,6 @@
 from Exception.RPALException import RPALException
 from Parser.parser import Node
 from Tokenizer.tokenizer import Token
-import copy
 
 # Utility function to check if a node has the specified label.
 def checkNodeLabel(node, label):
@@ -44,6 +43,19 @@ def checkForChildrenNumber(node, number, forMin=False):
         if len(node.child) != number:
             raise RPALException(f"Node has an unexpected number of children: expected {number}, for {node.head} got {len(node.child)}")
 
+# Utility function to copy a subtree.
+def copyTree(node):
+    """
+    Copy the nodes of a subtree (the tokens at its leaves are shared, as nothing changes them).
+
+    Args:
+        node: The root of the subtree.
+
+    Returns:
+        The root of the copy.
+    """
+    return Node(node.head, [copyTree(child) for child in node.child])
+
 class StandardizeAST:
     """
     Class to standardize the AST by checking node labels and children.
@@ -241,7 +253,7 @@ class StandardizeAST:
         equalNode = node.getChild(0)
         self.checkNode(equalNode, "=", 2)
         xNode = equalNode.getChild(0)
-        xNodeCopy = copy.deepcopy(xNode)  # Create a copy of xNode
+        xNodeCopy = copyTree(xNode)  # Create a copy of xNode
         eNode = equalNode.getChild(1)
 
         node.changeHead("=")
@@ -0,0 +1,81 @@
+import json
+import os
+import socket
+import sys
+
+"""
+Client of the interpreter daemon (see Server.server).
+
+Usage:
+    python Server/client.py <socket_path> <file_path> [--engine=<name>]
+
+Sends the program's path to the server listening on the socket, prints the output
+as it arrives and exits with status 1 if the program failed, like myrpal.py. Only
+the standard library is imported, so the client starts quickly.
+"""
+
+def request(socketPath, message):
+    """
+    Sends a request to the server and yields its response messages, the program's
+    output messages and then its outcome.
+
+    Args:
+        socketPath (str): The path of the server's Unix socket.
+        message (dict): The request (see Server.server).
+
+    Yields:
+        dict: The next message of the response.
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socketPath)
+        connection.sendall(json.dumps(message).encode() + b"\n")
+        buffer = b""
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if not line:
+                    continue
+                try:
+                    response = json.loads(line)
+                except ValueError:
+                    # The rest of a message cut off by a killed program
+                    continue
+                yield response
+                if "status" in response:
+                    return
+        yield {"status": "error", "error": "The server closed the connection.", "timings": {}}
+    finally:
+        connection.close()
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2:
+        print("Please provide the server's socket path and a file path as arguments.")
+        sys.exit(1)
+    message = {"path": os.path.abspath(args[1])}
+    for arg in args[2:]:
+        if arg.startswith("--engine="):
+            message["engine"] = arg[len("--engine="):]
+        else:
+            print("Invalid argument. Use --engine=<name> to select an engine.")
+            sys.exit(1)
+
+    try:
+        for response in request(args[0], message):
+            if "output" in response:
+                sys.stdout.write(response["output"])
+                sys.stdout.flush()
+            elif response["status"] != "ok":
+                print(f"Error: {response['error']}")
+                sys.exit(1)
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
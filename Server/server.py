@@ -0,0 +1,369 @@
+import contextlib
+import io
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import time
+from collections import OrderedDict
+
+from Environment.Environment import Environment
+from Exception.RPALException import RPALException
+from CSE.memo import Memo
+from CSE.nativeLibrary import loadLibraries
+from CSE.programCache import sourceKey
+from Tokenizer.tokenizer import scanTokens
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES, compileTokens
+
+"""
+Interpreter daemon (--serve).
+
+The server listens on a Unix socket with the interpreter imported and a table of
+recently compiled programs, and runs every request in a forked child, which shares
+that state copy-on-write and cannot change it for later requests.
+
+A request is one line of JSON:
+
+    {"source": "<program text>"} or {"path": "<program file>"}
+
+optionally with "engine", "fold", "libraries" and "memo" (a capacity, or null)
+overriding the server's options. The response is a stream of JSON lines, the
+program's output as it is printed followed by the outcome:
+
+    {"output": "<text>"}
+    ...
+    {"status": "ok" | "error" | "timeout", "error": <message or null>,
+     "timings": {"compile": seconds, "run": seconds}}
+
+Requests are read as they arrive, through the same selector as new connections,
+so a client slow to send its request never holds up the others. Programs are
+compiled by the server (so each is compiled once while it stays in the table) and
+run by the child, which the server kills after the timeout.
+"""
+
+DEFAULT_TIMEOUT = 60.0
+# Number of compiled programs kept
+DEFAULT_CAPACITY = 256
+# Longest time a client may take to send its request
+REQUEST_TIMEOUT = 5.0
+# Output is sent once this many characters are buffered, and when the program ends
+OUTPUT_CHUNK = 4096
+
+def sendMessage(connection, message):
+    connection.sendall(json.dumps(message).encode() + b"\n")
+
+class SocketOutput(io.TextIOBase):
+    """
+    A text stream sending what is written to it as {"output": ...} messages.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.pending = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.pending.append(text)
+        self.size += len(text)
+        if self.size >= OUTPUT_CHUNK:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.pending:
+            sendMessage(self.connection, {"output": "".join(self.pending)})
+            self.pending = []
+            self.size = 0
+
+class Server:
+    """
+    Accepts requests on a Unix socket and runs each in a forked child.
+    """
+    def __init__(self, path, options, timeout, capacity=DEFAULT_CAPACITY):
+        """
+        Args:
+            path (str): The path of the Unix socket.
+            options (dict): The default run options: engine, fold, libraries and
+                memoCapacity (None to not memoize), as given on the command line.
+            timeout (float): The seconds a program may run before its child is killed.
+            capacity (int): The number of compiled programs kept.
+        """
+        self.path = path
+        self.options = options
+        self.timeout = timeout
+        self.capacity = capacity
+        self.compiled = OrderedDict()
+        self.listener = None
+        self.selector = None
+        # Per connection whose request is being read: the bytes received and the deadline
+        self.requests = {}
+        # Per running child's pid: its client connection and deadline
+        self.children = {}
+
+    def compile(self, source, fold):
+        """
+        Returns the control structures of a program source (bytes), from the table of
+        compiled programs when it is there. The front end's warnings are printed
+        either way.
+        """
+        key = sourceKey(source, "" if fold else "no-fold")
+        entry = self.compiled.get(key)
+        if entry is not None:
+            self.compiled.move_to_end(key)
+            controlStructures, warnings = entry
+            print(warnings, end="")
+            return controlStructures
+        warnings = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(warnings):
+                controlStructures = compileTokens(scanTokens(source), fold=fold)
+        finally:
+            print(warnings.getvalue(), end="")
+        self.compiled[key] = (controlStructures, warnings.getvalue())
+        if len(self.compiled) > self.capacity:
+            self.compiled.popitem(last=False)
+        return controlStructures
+
+    def accept(self):
+        """
+        Accepts a client, whose request is then read as it arrives (see receive).
+        """
+        connection, _ = self.listener.accept()
+        connection.setblocking(False)
+        self.requests[connection] = (bytearray(), time.perf_counter() + REQUEST_TIMEOUT)
+        self.selector.register(connection, selectors.EVENT_READ)
+
+    def receive(self, connection):
+        """
+        Reads what a client has sent of its request without waiting for more, and
+        handles the request once its line is complete or the client stops sending.
+        """
+        data, _ = self.requests[connection]
+        try:
+            chunk = connection.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            # The client is gone
+            self.dropRequest(connection)
+            connection.close()
+            return
+        data += chunk
+        if chunk and b"\n" not in chunk:
+            return
+        self.dropRequest(connection)
+        connection.setblocking(True)
+        self.handle(connection, bytes(data))
+
+    def dropRequest(self, connection):
+        self.selector.unregister(connection)
+        del self.requests[connection]
+
+    def expireRequests(self):
+        """
+        Answers the clients that did not send their request in time with an error,
+        and closes their connections.
+        """
+        now = time.perf_counter()
+        for connection, (_, deadline) in list(self.requests.items()):
+            if now < deadline:
+                continue
+            self.dropRequest(connection)
+            connection.setblocking(True)
+            try:
+                sendMessage(connection, {"status": "error", "error": f"No request received within {REQUEST_TIMEOUT:g} s.", "timings": {}})
+            except OSError:
+                pass
+            connection.close()
+
+    def parseRequest(self, data):
+        """
+        Returns the request sent as a line of JSON.
+
+        Raises:
+            RPALException: If the request is not a JSON object with a source or a path.
+        """
+        try:
+            request = json.loads(data)
+        except ValueError:
+            raise RPALException("The request is not a line of JSON.")
+        if type(request) is not dict or ("source" in request) == ("path" in request):
+            raise RPALException("The request must have either a source or a path.")
+        return request
+
+    def handle(self, connection, data):
+        """
+        Compiles the program of a client's request and forks a child to run it.
+        """
+        start = time.perf_counter()
+        warnings = io.StringIO()
+        try:
+            request = self.parseRequest(data)
+            options = dict(self.options)
+            options.update({name: request[name] for name in ("engine", "fold", "libraries") if name in request})
+            if "memo" in request:
+                options["memoCapacity"] = request["memo"]
+            if options["engine"] not in ENGINES:
+                raise RPALException(f"Invalid engine. Use one of: {', '.join(ENGINES)}.")
+            if "source" in request:
+                source = str(request["source"]).encode()
+            else:
+                with open(request["path"], "rb") as file:
+                    source = file.read()
+            with contextlib.redirect_stdout(warnings):
+                controlStructures = self.compile(source, bool(options["fold"]))
+            if warnings.getvalue():
+                sendMessage(connection, {"output": warnings.getvalue()})
+        except Exception as e:
+            try:
+                if warnings.getvalue():
+                    sendMessage(connection, {"output": warnings.getvalue()})
+                sendMessage(connection, {"status": "error", "error": str(e), "timings": {}})
+            except OSError:
+                # The client is gone
+                pass
+            connection.close()
+            return
+        compileTime = time.perf_counter() - start
+
+        try:
+            pid = os.fork()
+        except OSError as e:
+            try:
+                sendMessage(connection, {"status": "error", "error": f"Could not start the interpreter: {e}", "timings": {}})
+            except OSError:
+                pass
+            connection.close()
+            return
+        if pid == 0:
+            # The child only keeps its own client's connection
+            self.selector.close()
+            self.listener.close()
+            for otherConnection in self.requests:
+                otherConnection.close()
+            for otherConnection, _ in self.children.values():
+                otherConnection.close()
+            self.runChild(connection, controlStructures, options, compileTime)
+        self.children[pid] = (connection, time.perf_counter() + self.timeout)
+
+    def runChild(self, connection, controlStructures, options, compileTime):
+        """
+        Runs a program in the forked child, streaming its output, and exits.
+        """
+        status = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            output = SocketOutput(connection)
+            sys.stdout = output
+            result = {"status": "ok", "error": None, "timings": {"compile": compileTime}}
+            start = time.perf_counter()
+            try:
+                primitiveVariables = loadLibraries(options["libraries"], PRIMITIVE_ENVIRONMENT_VARIABLES)
+                memo = None
+                if options["memoCapacity"] is not None:
+                    memo = Memo(controlStructures, primitiveVariables, int(options["memoCapacity"]))
+                machine = ENGINES[options["engine"]](controlStructures, Environment(0, variables=primitiveVariables), memo)
+                machine.interpret()
+            except Exception as e:
+                result["status"] = "error"
+                result["error"] = str(e)
+            result["timings"]["run"] = time.perf_counter() - start
+            output.flush()
+            sendMessage(connection, result)
+            status = 0
+        finally:
+            # Never return into the server's loop
+            os._exit(status)
+
+    def reap(self):
+        """
+        Collects the children that exited and kills those past their deadline,
+        closing their clients' connections.
+        """
+        now = time.perf_counter()
+        for pid, (connection, deadline) in list(self.children.items()):
+            message = None
+            finished, status = os.waitpid(pid, os.WNOHANG)
+            if finished == 0:
+                if now < deadline:
+                    continue
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                message = {"status": "timeout", "error": f"Timed out after {self.timeout:g} s.", "timings": {}}
+            elif os.waitstatus_to_exitcode(status) != 0:
+                message = {"status": "error", "error": f"Interpreter exited with code {os.waitstatus_to_exitcode(status)}.", "timings": {}}
+            if message is not None:
+                try:
+                    # Ends a message the child may have been cut off in
+                    connection.sendall(b"\n")
+                    sendMessage(connection, message)
+                except OSError:
+                    pass
+            connection.close()
+            del self.children[pid]
+
+    def listen(self):
+        """
+        Binds the socket, replacing a stale one left by a server that is gone.
+
+        Raises:
+            RPALException: If another server is listening on the path.
+        """
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                os.unlink(self.path)
+            else:
+                raise RPALException(f"A server is already listening on '{self.path}'.")
+            finally:
+                probe.close()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        listener.listen(128)
+        return listener
+
+    def serve(self):
+        """
+        Serves requests until the server is interrupted or terminated.
+        """
+        listener = self.listener = self.listen()
+        # Terminating the server ends the loop below like an interrupt
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        selector = self.selector = selectors.DefaultSelector()
+        selector.register(listener, selectors.EVENT_READ)
+        try:
+            while True:
+                deadlines = [deadline for _, deadline in self.requests.values()]
+                deadlines.extend(deadline for _, deadline in self.children.values())
+                timeout = None
+                if deadlines:
+                    timeout = max(0.0, min(deadlines) - time.perf_counter())
+                if self.children:
+                    # Children are polled for their exit
+                    timeout = min(0.01, timeout)
+                for key, _ in selector.select(timeout):
+                    if key.fileobj is listener:
+                        self.accept()
+                    else:
+                        self.receive(key.fileobj)
+                self.expireRequests()
+                self.reap()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            selector.close()
+            listener.close()
+            os.unlink(self.path)
+            for connection in self.requests:
+                connection.close()
+            for pid, (connection, _) in self.children.items():
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                connection.close()
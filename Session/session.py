@@ -0,0 +1,183 @@
+import sys
+
+from Environment.Environment import Environment
+from Exception.RPALException import RPALException
+from CSE.generateCS import CSGenerator
+from CSE.nativeLibrary import loadLibraries
+from CSE.operators import formatValue
+from CSE.values import DUMMY, RPALTuple
+from Parser.folder import FoldAST
+from Parser.parser import Parser
+from Parser.resolver import ResolveAST, boundNames
+from Parser.standardizer import StandardizeAST
+from Tokenizer.tokenizer import tokenizeSource
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Incremental sessions (--repl).
+
+A session runs inputs one at a time, each either a definition (what may follow
+'let', e.g. "rec fib n = ..." or "a = 1 and b = 2") or an expression. A definition
+is standardized, compiled and evaluated once, and the names it binds are added to
+the session's environment, between the primitive environment and every later input.
+An expression is evaluated in that environment and its value returned.
+
+All inputs are generated into one list of control structures by one generator and
+run by one machine, so the functions defined earlier keep their compiled code
+(and, on the opcode and closure engines, their lowered or compiled bodies) and are
+never compiled again. Names are looked up when used: defining a name again changes
+it for the functions defined earlier that use it.
+"""
+
+class IncompleteInput(RPALException):
+    """
+    Raised for an input that ends before its definition or expression does.
+    """
+
+class Session:
+    """
+    A persistent environment of definitions and the machine evaluating inputs in it.
+    """
+    def __init__(self, engine="cse", libraries=(), fold=True):
+        """
+        Args:
+            engine (str): The execution engine, a key of ENGINES.
+            libraries (list): The native libraries to load (see CSE.nativeLibrary).
+            fold (bool): Fold constant expressions.
+
+        Raises:
+            RPALException: If the engine or a library does not exist.
+        """
+        if engine not in ENGINES:
+            raise RPALException(f"Invalid engine. Use one of: {', '.join(ENGINES)}.")
+        self.engine = engine
+        self.fold = fold
+        self.primitives = loadLibraries(libraries, PRIMITIVE_ENVIRONMENT_VARIABLES)
+        self.environment = Environment(1, Environment(0, variables=self.primitives))
+        self.generator = CSGenerator()
+        self.machine = None
+
+    def parse(self, source):
+        """
+        Parses an input as a definition or, failing that, as an expression.
+
+        Returns:
+            tuple: (True, definition) or (False, expression), the root node of the AST.
+
+        Raises:
+            IncompleteInput: If the input ends in the middle of a definition or expression.
+            RPALException: If it is neither.
+        """
+        tokens = tokenizeSource(source)
+        if len(tokens) == 0:
+            raise IncompleteInput("Empty input.")
+        # The parser also raises SyntaxError, and fails on other errors at the end of input
+        definitionParser = Parser(tokens)
+        try:
+            definition = definitionParser.D()
+            if not definitionParser.hasToken():
+                return True, definition
+        except Exception:
+            pass
+        parser = Parser(tokens)
+        try:
+            expression = parser.E()
+        except Exception as e:
+            if not parser.hasToken() or not definitionParser.hasToken():
+                raise IncompleteInput(str(e))
+            if type(e) is not RPALException:
+                raise RPALException(str(e).strip())
+            raise
+        if parser.hasToken():
+            if not definitionParser.hasToken():
+                raise IncompleteInput("The definition is not complete.")
+            token = parser.gettoken()
+            raise RPALException(f"Exception at line {token.getLineNumber()}. got ''{token.getValue()}'' after the end of the input")
+        return False, expression
+
+    def evaluate(self, node):
+        """
+        Compiles a standardized tree and evaluates it in the session's environment.
+        """
+        # Resolved first, since only references to primitives are folded
+        ResolveAST().resolve(node)
+        # Names the session defines shadow the primitives, which are no longer folded
+        if self.fold:
+            FoldAST({name: value for name, value in self.primitives.items()
+                     if name not in self.environment.variables}).fold(node)
+        controls = self.generator.generate(node)
+        if self.machine is None:
+            self.machine = ENGINES[self.engine](controls, self.environment)
+        return self.machine.evaluate()
+
+    def execute(self, source):
+        """
+        Runs one input.
+
+        Args:
+            source (str): A definition or an expression.
+
+        Returns:
+            tuple: The names the input defined (empty for an expression) and its value
+            (for a definition of several names, the tuple of their values).
+
+        Raises:
+            IncompleteInput: If the input ends in the middle of a definition or expression.
+            RPALException: If it does not parse, compile or run; nothing is defined then.
+        """
+        isDefinition, node = self.parse(source)
+        StandardizeAST().standardize(node)
+        if not isDefinition:
+            return [], self.evaluate(node)
+
+        # A standardized definition is '=' with the bound names and their value
+        binder, valueNode = node.child
+        names = boundNames(binder)
+        value = self.evaluate(valueNode)
+        if len(names) == 1:
+            self.environment.variables[names[0]] = value
+        else:
+            if type(value) is not RPALTuple or len(value) != len(names):
+                raise RPALException(f"Cannot bind {len(names)} names to {formatValue(value)}.")
+            for name, item in zip(names, value):
+                self.environment.variables[name] = item
+        return names, value
+
+def repl(session):
+    """
+    Reads inputs from stdin and runs them in a session until end of input, printing
+    the names each definition binds and the value of each expression (unless it is
+    dummy, e.g. the value of Print). An input continues on the next lines until it is
+    complete, so a definition continued by 'and' or 'within' on the next line must be
+    in parentheses. Prompts are shown when stdin is a terminal.
+    """
+    interactive = sys.stdin.isatty()
+    lines = []
+    while True:
+        if interactive:
+            print("rpal> " if not lines else "  ... ", end="", flush=True)
+        line = sys.stdin.readline()
+        if not line:
+            break
+        lines.append(line)
+        source = "".join(lines)
+        if not source.strip():
+            lines = []
+            continue
+        try:
+            names, value = session.execute(source)
+        except IncompleteInput:
+            continue
+        except Exception as e:
+            print(f"Error: {e}")
+        else:
+            if names:
+                print(f"Defined {', '.join(names)}.")
+            elif value is not DUMMY:
+                print(formatValue(value))
+            else:
+                # Ends the line the expression printed
+                print()
+        lines = []
+    if lines:
+        print("Error: Incomplete input at end of file.")
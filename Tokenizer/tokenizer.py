@@ -1,51 +1,91 @@
+import mmap
 import re
+from array import array
 
-# List of reserved keywords for the language
-RESERVED_KEYWORDS = [
+from Exception.RPALException import RPALException
+
+# Set of reserved keywords for the language
+RESERVED_KEYWORDS = {
     "let", "in", "within", "where", "fn", "aug", "and", "or", "not",
     "gr", "ge", "ls", "le", "eq", "ne", "true", "false", "nil", "dummy", "rec"
+}
+
+# Named groups of the master pattern, tried in order at every position.
+# The string body refuses '//' so that a comment cuts a string short exactly
+# like the old line-based tokenizer, which split every line at the first '//'.
+TOKEN_SPECIFICATION = [
+    ("WHITESPACE", r"\s+"),
+    ("COMMENT", r"//[^\n]*"),
+    ("DOUBLE_OPERATOR", r">=|<=|->|\*\*"),
+    ("ID", r"[A-Za-z][A-Za-z0-9_]*"),
+    ("INT", r"[0-9]+"),
+    ("STRING", r"'(?:[^'\\\n/]|/(?!/)|\\[^\n/]|\\/(?!/))*'"),
+    ("OPERATOR", r"""[+\-*/&@|><.=~$!#%^_\[\]{}"`?]"""),
+    ("PUNCTUATION", r"[();,]"),
+    ("UNEXPECTED", r"."),
 ]
 
-# Check if a token is a reserved keyword
-def isReservedKeyword(token):
-    return token in RESERVED_KEYWORDS
+MASTER_PATTERN_SOURCE = "|".join(f"(?P<{name}>{pattern})" for name, pattern in TOKEN_SPECIFICATION)
+
+# The same pattern over raw UTF-8 bytes, used when scanning a memory-mapped file.
+# An unexpected character swallows its continuation bytes so it is reported once.
+MASTER_PATTERN_BYTES_SOURCE = "|".join(
+    f"(?P<{name}>{pattern})" for name, pattern in TOKEN_SPECIFICATION if name != "UNEXPECTED"
+).encode() + rb"|(?P<UNEXPECTED>[\xc0-\xff][\x80-\xbf]*|.)"
+
+# The compiled master patterns by source type (False: str, True: bytes)
+masterPatterns = {}
 
-# Check if an element is a valid ID
-def isID(element):
-    return re.match(r'^[A-Za-z][A-Za-z0-9_]*', element)
+def masterPattern(binary):
+    """
+    Returns the master pattern for str or bytes sources, compiling it on first use,
+    so a run only pays for compiling the one it scans with (files use bytes).
+    """
+    pattern = masterPatterns.get(binary)
+    if pattern is None:
+        pattern = masterPatterns[binary] = re.compile(MASTER_PATTERN_BYTES_SOURCE if binary else MASTER_PATTERN_SOURCE)
+    return pattern
 
-# Check if an element is an INT
-def isDigit(element):
-    return re.match(r'^[0-9]+', element)
+# Token types in the order of their compact kind codes
+TOKEN_KINDS = ("ID", "KEYWORD", "INT", "STRING", "OPERATOR", "(", ")", ";", ",")
+KIND_CODES = {kind: code for code, kind in enumerate(TOKEN_KINDS)}
 
-# Check if an element is a string (single-quoted)
-def isString(element):
-    return re.match(r"^'([^'\\]|\\.)*'", element)  # Handle escaped quotes
+# Values shared by every program, interned up front by each TokenStream
+FIXED_VALUES = sorted(RESERVED_KEYWORDS) + [
+    ">=", "<=", "->", "**", "+", "-", "*", "/", "&", "@", "|", ">", "<", ".", "=",
+    "~", "$", "!", "#", "%", "^", "_", "[", "]", "{", "}", '"', "`", "?",
+    "(", ")", ";", ",",
+]
+FIXED_IDS = {value: valueId for valueId, value in enumerate(FIXED_VALUES)}
 
-# Check if an element is a double operator (two characters)
-def isDoubleOperator(element):
-    # RPAL-specific double operators based on the grammar
-    double_ops = ['>=', '<=', '->', '**']
-    for op in double_ops:
-        if element.startswith(op):
-            return re.match(re.escape(op), element)
-    return None
+# Escape sequences of string literals and the characters they stand for
+STRING_ESCAPES = {"n": "\n", "t": "\t", "\\": "\\", "'": "'"}
+ESCAPE_PATTERN = re.compile(r"\\(.)")
 
-# Check if an element is an operator (single character)
-def isOperator(element):
-    # RPAL-specific single operators based on the grammar
-    return re.match(r'^[+\-*/&@|><.=~$!#%^_\[\]{}"`?]', element)
+def decodeString(value):
+    """
+    Decodes the value of a STRING token: drops the enclosing quotes and replaces
+    the escapes \\n, \\t, \\\\ and \\' (any other escape is kept as written).
 
-# Check if an element is a punctuation character
-def isPunctuation(element):
-    return re.match(r'^[\(\)\;\,]', element)
+    Args:
+        value (str): The token value, quotes included.
+
+    Returns:
+        str: The string the literal stands for.
+    """
+    body = value[1:-1]
+    if "\\" not in body:
+        return body
+    return ESCAPE_PATTERN.sub(lambda match: STRING_ESCAPES.get(match.group(1), match.group(0)), body)
 
-# Check if an element is a comment (starts with //)
-def isComment(element):
-    return re.match(r"^(//.*)", element)
+# Check if a token is a reserved keyword
+def isReservedKeyword(token):
+    return token in RESERVED_KEYWORDS
 
 # Token class to represent a lexical token
 class Token:
+    __slots__ = ("type", "value", "line_number")
+
     def __init__(self, type, value, line_number):
         self.type = type
         self.value = value
@@ -66,6 +106,83 @@ class Token:
     def __repr__(self):
         return self.__str__()
 
+def scanTokens(source, factory=Token):
+    """
+    Lazily tokenizes a whole source, yielding Token objects one at a time.
+
+    Args:
+        source (str or bytes-like): The complete program text. Bytes-like
+            sources (e.g. an mmap) are scanned as UTF-8 and token values are
+            decoded individually, so the source is never copied into a str.
+        factory (callable, optional): Called with (type, value, line number)
+            for every token. Defaults to Token.
+
+    Yields:
+        The result of factory for the next token of the source.
+
+    The source is walked by offset with the master pattern, so every character is
+    looked at once and no line is ever resliced. Whitespace and comments are
+    skipped, identifiers are classified as keywords through RESERVED_KEYWORDS,
+    and unexpected characters are reported and skipped one at a time.
+    """
+    binary = not isinstance(source, str)
+    pattern = masterPattern(binary)
+    newline = b"\n" if binary else "\n"
+    line_number = 1
+
+    for match in pattern.finditer(source):
+        kind = match.lastgroup
+        if kind == "WHITESPACE":
+            line_number += match.group().count(newline)
+            continue
+        if kind == "COMMENT":
+            continue
+        value = match.group()
+        if binary:
+            value = value.decode("utf-8", "replace")
+        if kind == "ID":
+            yield factory("KEYWORD" if value in RESERVED_KEYWORDS else "ID", value, line_number)
+        elif kind == "INT" or kind == "STRING":
+            yield factory(kind, value, line_number)
+        elif kind == "OPERATOR" or kind == "DOUBLE_OPERATOR":
+            yield factory("OPERATOR", value, line_number)
+        elif kind == "PUNCTUATION":
+            yield factory(value, value, line_number)
+        else:
+            print(f"Warning: Unexpected character '{value}' at line {line_number}")
+
+def scanFile(file):
+    """
+    Lazily tokenizes an open binary file through a read-only memory map.
+
+    Args:
+        file: A file object opened in binary mode.
+
+    Yields:
+        Token: The next token of the file.
+    """
+    try:
+        source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty files cannot be mapped and have no tokens
+        return
+    try:
+        yield from scanTokens(source)
+    finally:
+        source.close()
+
+def tokenizeSource(source):
+    """
+    Tokenizes a whole source string into a list of Token objects.
+
+    Args:
+        source (str): The complete program text.
+
+    Returns:
+        list: A list of Token objects.
+    """
+    return list(scanTokens(source))
+
 # Tokenize input lines into a list of tokens
 def tokenize(lines):
     """
@@ -77,100 +194,128 @@ def tokenize(lines):
     Returns:
         list: A list of Token objects.
     
-    The function processes each line, removing inline comments, and iteratively 
-    matches and extracts tokens in the following order:
-        - Double operators (==, !=, etc.)
-        - IDs and keywords
-        - INTs
-        - Strings
-        - Single operators
-        - Punctuation
-    
-    Each token is annotated with its type, value, and line number.
+    The lines are joined into one source (adding the line break a line is
+    missing, so line numbers still follow the list) and handed to
+    tokenizeSource. Each token is annotated with its type, value, and line number.
     """
-    tokens = []
-    
-    for line_number, line in enumerate(lines, start=1):
-        # Remove inline comments
-        line = line.split('//', 1)[0]
-
-        while line:
-            line = line.lstrip()  # Remove leading whitespace
-            if not line:
-                break
-
-            # Check for double operators first
-            match = isDoubleOperator(line)
-            if match:
-                tokens.append(Token("OPERATOR", match.group(), line_number))
-                line = line[match.end():]
-                continue
-
-            # ID or keyword
-            match = isID(line)
-            if match:
-                token = match.group()
-                if isReservedKeyword(token):
-                    tokens.append(Token("KEYWORD", token, line_number))
-                else:
-                    tokens.append(Token("ID", token, line_number))
-                line = line[match.end():]
-                continue
-
-            # INT
-            match = isDigit(line)
-            if match:
-                tokens.append(Token("INT", match.group(), line_number))
-                line = line[match.end():]
-                continue
-
-            # String
-            match = isString(line)
-            if match:
-                tokens.append(Token("STRING", match.group(), line_number))
-                line = line[match.end():]
-                continue
-
-            # Single operator
-            match = isOperator(line)
-            if match:
-                tokens.append(Token("OPERATOR", match.group(), line_number))
-                line = line[match.end():]
-                continue
-
-            # Punctuation
-            match = isPunctuation(line)
-            if match:
-                tokens.append(Token(match.group(), match.group(), line_number))
-                line = line[match.end():]
-                continue
-
-            # If no match found, it's an unexpected character
-            unexpected_char = line[0]
-            print(f"Warning: Unexpected character '{unexpected_char}' at line {line_number}")
-            line = line[1:]  # Skip the unexpected character
-
-    return tokens
-
-# Example usage and testing
-# def test_lexer():
-#     """Test the lexer with RPAL sample code"""
-#     test_code = [
-#         "let x = 42 in x + 1",
-#         "fn x . x + 1",
-#         "B -> Tc '|' Tc",
-#         "let add = fn x y . x + y in add 5 3",
-#         "x >= 10 and y <= 20",
-#         "2 ** 3 * 4",
-#         "// This is a comment",
-#         "'Hello World' aug 'Test'",
-#         "true or false",
-#         "not (x gr y)"
-#     ]
-    
-#     tokens = tokenize(test_code)
-#     for token in tokens:
-#         print(token)
+    return tokenizeSource("".join(line if line.endswith("\n") else line + "\n" for line in lines))
+
+# Released tokens are dropped from a TokenStream's arrays this many at a time
+RELEASE_CHUNK = 256
+
+class TokenStream:
+    """
+    A forward-only window over a token iterator, kept as a struct of arrays.
+    Tokens are pulled from the iterator only when the parser looks at them and
+    dropped once the parser has moved past them, so the full token list is never
+    resident. The window holds kind codes in an array('B'), values as ids into the
+    stream's intern table in an array('I') and line numbers in an array('I'), so
+    matchType/matchValue compare small ints, and Token objects are only made by
+    get, for the tokens the parser keeps.
+    """
+    def __init__(self, tokens):
+        """
+        Initialize a TokenStream.
+
+        Args:
+            tokens (iterable): Any iterable of Token objects (a list, scanTokens, scanFile, ...).
+        """
+        self.source = iter(tokens)
+        # Tokens pulled but not yet released
+        self.kinds = array("B")
+        self.values = array("I")
+        self.lines = array("I")
+        self.start = 0  # Absolute index of the window's first token
+        self.released = 0  # Absolute index of the first token not released
+        self.strings = list(FIXED_VALUES)  # Intern table: value id -> value
+        self.ids = dict(FIXED_IDS)  # Intern table: value -> value id
+
+    def pull(self):
+        """
+        Appends the next token of the iterator to the window, interning its value.
+
+        Returns:
+            bool: False at the end of input.
+        """
+        token = next(self.source, None)
+        if token is None:
+            return False
+        value = token.value
+        valueId = self.ids.get(value)
+        if valueId is None:
+            valueId = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        self.kinds.append(KIND_CODES[token.type])
+        self.values.append(valueId)
+        self.lines.append(token.line_number)
+        return True
+
+    def offset(self, index):
+        """
+        Returns the window position of the token at the absolute position `index`,
+        pulling tokens up to it, or -1 past the end of input.
+        """
+        if index < self.released:
+            raise RPALException(f"Token {index} has already been released")
+        offset = index - self.start
+        while offset >= len(self.kinds):
+            if not self.pull():
+                return -1
+        return offset
+
+    def has(self, index):
+        """
+        Checks whether there is a token at the absolute position `index`.
+        """
+        if index >= self.released and index - self.start < len(self.kinds):
+            return True
+        return self.offset(index) >= 0
+
+    def get(self, index):
+        """
+        Returns the token at the absolute position `index`, or None past the end of input.
+        """
+        offset = self.offset(index)
+        if offset < 0:
+            return None
+        return Token(TOKEN_KINDS[self.kinds[offset]], self.strings[self.values[offset]], self.lines[offset])
+
+    def release(self, index):
+        """
+        Forgets every token before the absolute position `index`. Their slots are
+        reused RELEASE_CHUNK tokens at a time, as deleting from the front of the
+        arrays moves the rest of the window.
+        """
+        if index <= self.released:
+            return
+        self.released = index
+        count = index - self.start
+        if count >= RELEASE_CHUNK:
+            del self.kinds[:count]
+            del self.values[:count]
+            del self.lines[:count]
+            self.start = index
+
+    def matchType(self, index, type):
+        """
+        Checks whether the token at `index` exists and has the given type.
+        """
+        offset = index - self.start
+        if index < self.released or offset >= len(self.kinds):
+            offset = self.offset(index)
+            if offset < 0:
+                return False
+        return self.kinds[offset] == KIND_CODES.get(type)
 
-# if __name__ == "__main__":
-#     test_lexer()
\ No newline at end of file
+    def matchValue(self, index, value):
+        """
+        Checks whether the token at `index` exists and has the given value. A value
+        never interned matches no token; the parser's literals hash once, so this is
+        one dictionary probe and an int comparison.
+        """
+        offset = index - self.start
+        if index < self.released or offset >= len(self.values):
+            offset = self.offset(index)
+            if offset < 0:
+                return False
+        return self.values[offset] == self.ids.get(value)
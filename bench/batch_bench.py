@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engine_bench import PROGRAMS
+from Batch.batch import DEFAULT_TIMEOUT, runBatch
+
+"""
+Batch runner benchmark.
+
+Usage:
+    python bench/batch_bench.py [copies] [engine]
+
+Writes `copies` (default 8) copies of the engine benchmark programs to a temporary
+directory and runs them once with one `python myrpal.py` process per program, then
+with --batch on 1, 2, 4, ... worker processes up to the number of CPUs. Reports
+the throughput of each run and its speedup over the separate processes.
+"""
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    engine = sys.argv[2] if len(sys.argv) > 2 else "cse"
+    options = {"engine": engine, "useCache": False, "fold": True, "libraries": [], "memoCapacity": None}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for copy in range(copies):
+            for name, source in PROGRAMS.items():
+                path = os.path.join(directory, f"{name}-{copy}")
+                with open(path, "w") as file:
+                    file.write(source)
+                paths.append(path)
+
+        start = time.perf_counter()
+        for path in paths:
+            subprocess.run([sys.executable, os.path.join(ROOT, "myrpal.py"), "--no-cache", f"--engine={engine}", path],
+                           check=True, stdout=subprocess.DEVNULL)
+        separate = time.perf_counter() - start
+        print(f"{len(paths)} programs on {engine}")
+        print(f"{'run':12} {'wall':>8} {'programs/s':>11} {'speedup':>8}")
+        print(f"{'processes':12} {separate:7.2f}s {len(paths) / separate:11.1f} {1:7.2f}x")
+
+        jobs = 1
+        while True:
+            summary = runBatch(directory, jobs, DEFAULT_TIMEOUT, options)["summary"]
+            if summary["ok"] != summary["programs"]:
+                raise SystemExit(f"{summary['programs'] - summary['ok']} programs failed with -j {jobs}")
+            print(f"{f'-j {jobs}':12} {summary['wall']:7.2f}s {summary['throughput']:11.1f} {separate / summary['wall']:7.2f}x")
+            if jobs >= (os.cpu_count() or 1):
+                break
+            jobs = min(jobs * 2, os.cpu_count())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Tokenizer.tokenizer import tokenizeSource
+from Parser.parser import Parser
+from Parser.standardizer import StandardizeAST
+from CSE.generateCS import CSGenerator
+from Environment.Environment import Environment
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Execution engine benchmark.
+
+Usage:
+    python bench/engine_bench.py [repeats] [engine ...]
+
+Runs a suite of compute-heavy programs (arithmetic, function application,
+deep recursion, higher-order functions, tuples and strings) on every engine
+(or the ones named) and reports the best time of `repeats` runs, relative to
+the first engine.
+"""
+
+PROGRAMS = {
+    "arithmetic": """
+let rec loop n acc =
+    n eq 0 -> acc
+    | loop (n - 1) ((acc + n * 3 - n / 2 + (n * n - n) / (n + 1) - 7 * 2 + 5) / 2)
+in Print (loop 3000 0)
+""",
+    "application": """
+let rec fib n = n ls 2 -> n | fib (n - 1) + fib (n - 2)
+in Print (fib 18)
+""",
+    "recursion": """
+let rec sum n = n eq 0 -> 0 | n + sum (n - 1)
+in Print (sum 5000)
+""",
+    "higher-order": """
+let compose f g x = f (g x) in
+let twice f = compose f f in
+let inc x = x + 1 in
+let rec iterate n f x = n eq 0 -> x | iterate (n - 1) f (f x)
+in Print (iterate 2000 (twice (twice inc)) 0)
+""",
+    "tuples": """
+let rec build n t = n eq 0 -> t | build (n - 1) (t aug n) in
+let rec total t i s = i gr Order t -> s | total t (i + 1) (s + t i)
+in Print (total (build 3000 nil) 1 0)
+""",
+    "strings": """
+let rec repeat n s = n eq 0 -> s | repeat (n - 1) (Conc s 'ab') in
+let rec count s n = s eq '' -> n | count (Stern s) (Stem s eq 'a' -> n + 1 | n)
+in Print (count (repeat 2000 '') 0)
+""",
+}
+
+def compileSource(source):
+    """
+    Runs the front end over a source string and returns its control structures.
+    """
+    ast = Parser(tokenizeSource(source)).E()
+    StandardizeAST().standardize(ast)
+    return CSGenerator().generate(ast)
+
+def measure(engine, source, repeats):
+    """
+    Returns the best interpretation time of `repeats` runs and the program's output.
+    """
+    best = None
+    output = None
+    for _ in range(repeats):
+        # Control structures are compiled afresh so no run can reuse another's state
+        machine = ENGINES[engine](compileSource(source), Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES))
+        captured = io.StringIO()
+        with contextlib.redirect_stdout(captured):
+            start = time.perf_counter()
+            machine.interpret()
+            elapsed = time.perf_counter() - start
+        output = captured.getvalue()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    engines = sys.argv[2:] or list(ENGINES)
+    print(f"{'program':12} {'engine':8} {'seconds':>9} {'speedup':>8}  output")
+    for name, source in PROGRAMS.items():
+        reference = None
+        for engine in engines:
+            elapsed, output = measure(engine, source, repeats)
+            reference = reference or elapsed
+            print(f"{name:12} {engine:8} {elapsed:9.3f} {reference / elapsed:7.2f}x  {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Tokenizer.tokenizer import tokenizeSource
+from Parser.parser import Parser
+from Parser.standardizer import StandardizeAST
+from CSE.generateCS import CSGenerator
+from CSE.CSEMachine import CSEMachine
+from Environment.Environment import Environment
+from Interpreter.interpreter import PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Environment lifetime benchmark.
+
+Usage:
+    python bench/environment_bench.py [outer ...]
+
+Runs a nested recursion of `outer` x 1000 function calls (the largest default
+is a million calls), each size in a fresh process, and reports the cost per
+call and the peak RSS. With environments reclaimed once dead, the per-call cost
+stays flat and the RSS does not grow with the number of calls.
+"""
+
+INNER = 1000
+
+PROGRAM = """
+let rec inner n = n eq 0 -> 0 | 1 + inner (n - 1) in
+let rec outer m = m eq 0 -> 0 | inner {inner} + outer (m - 1) in
+Print (outer {outer})
+"""
+
+def run(outer):
+    """
+    Runs the program for one size in this process and prints a JSON result line.
+    """
+    source = PROGRAM.format(inner=INNER, outer=outer)
+    ast = Parser(tokenizeSource(source)).E()
+    StandardizeAST().standardize(ast)
+    controlStructures = CSGenerator().generate(ast)
+    machine = CSEMachine(controlStructures, Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES))
+
+    start = time.perf_counter()
+    machine.interpret()
+    elapsed = time.perf_counter() - start
+    print()
+    # ru_maxrss is in kilobytes on Linux
+    print(json.dumps({"calls": outer * (INNER + 1), "seconds": elapsed,
+                      "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--run":
+        run(int(sys.argv[2]))
+        return
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 100, 300, 1000]
+    print(f"{'calls':>10} {'seconds':>9} {'us/call':>9} {'max RSS MB':>11}")
+    for outer in sizes:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", str(outer)],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{result['calls']:>10} {result['seconds']:>9.2f} "
+              f"{1e6 * result['seconds'] / result['calls']:>9.2f} {result['maxrss_mb']:>11.1f}")
+
+if __name__ == "__main__":
+    main()
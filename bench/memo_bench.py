@@ -0,0 +1,60 @@
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engine_bench import compileSource
+from Environment.Environment import Environment
+from CSE.memo import Memo
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Memoization benchmark.
+
+Usage:
+    python bench/memo_bench.py [n ...]
+
+Computes the naive doubly recursive Fibonacci number of each n on every engine,
+with and without --memo. Without memoization the time grows exponentially with n;
+with it, linearly. Runs without memoization are skipped above n = 22.
+"""
+
+PROGRAM = """
+let rec fib n = n ls 2 -> n | fib (n - 1) + fib (n - 2)
+in Print (fib {n})
+"""
+
+def run(engine, source, memoize):
+    """
+    Returns the interpretation time, the output and the memo statistics of one run.
+    """
+    controls = compileSource(source)
+    memo = Memo(controls, PRIMITIVE_ENVIRONMENT_VARIABLES) if memoize else None
+    machine = ENGINES[engine](controls, Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES), memo)
+    captured = io.StringIO()
+    with contextlib.redirect_stdout(captured):
+        start = time.perf_counter()
+        machine.interpret()
+        elapsed = time.perf_counter() - start
+    return elapsed, captured.getvalue(), memo.report() if memo else ""
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [16, 20, 200]
+    print(f"{'n':>5} {'engine':8} {'plain':>9} {'memo':>9}  statistics")
+    for n in sizes:
+        source = PROGRAM.format(n=n)
+        for engine in ENGINES:
+            memoTime, memoOutput, report = run(engine, source, True)
+            plain = "-"
+            if n <= 22:
+                plainTime, plainOutput, _ = run(engine, source, False)
+                if plainOutput != memoOutput:
+                    raise SystemExit(f"outputs differ on {engine}: {plainOutput} != {memoOutput}")
+                plain = f"{plainTime:.3f}"
+            print(f"{n:>5} {engine:8} {plain:>9} {memoTime:9.3f}  {report}")
+
+if __name__ == "__main__":
+    main()
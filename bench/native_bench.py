@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engine_bench import compileSource
+from Environment.Environment import Environment
+from CSE.nativeLibrary import LIBRARIES, loadLibraries
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Native library benchmark.
+
+Usage:
+    python bench/native_bench.py [size] [engine ...]
+
+Runs each native library function on tuples or strings of `size` elements
+(default 2000) against the same function written in RPAL, on every engine
+(or the ones named), and reports both times. The outputs must be equal.
+"""
+
+# name: (program using the native library, equivalent program in RPAL)
+PROGRAMS = {
+    "range": (
+        "Print (Order (Range 1 {size}))",
+        """let rec range a b t = a gr b -> t | range (a + 1) b (t aug a)
+in Print (Order (range 1 {size} nil))""",
+    ),
+    "map": (
+        "let sq x = x * x in Print (Sum (Map sq (Range 1 {size})))",
+        """let rec range a b t = a gr b -> t | range (a + 1) b (t aug a) in
+let rec map f t i r = i gr Order t -> r | map f t (i + 1) (r aug f (t i)) in
+let rec sum t i s = i gr Order t -> s | sum t (i + 1) (s + t i) in
+let sq x = x * x in Print (sum (map sq (range 1 {size} nil) 1 nil) 1 0)""",
+    ),
+    "filter": (
+        "let odd n = n - n / 2 * 2 eq 1 in Print (Order (Filter odd (Range 1 {size})))",
+        """let rec range a b t = a gr b -> t | range (a + 1) b (t aug a) in
+let rec filter p t i r = i gr Order t -> r | filter p t (i + 1) (p (t i) -> (r aug t i) | r) in
+let odd n = n - n / 2 * 2 eq 1 in Print (Order (filter odd (range 1 {size} nil) 1 nil))""",
+    ),
+    "fold": (
+        "let add a b = a + b in Print (Foldl add 0 (Range 1 {size}))",
+        """let rec range a b t = a gr b -> t | range (a + 1) b (t aug a) in
+let rec foldl f a t i = i gr Order t -> a | foldl f (f a (t i)) t (i + 1) in
+let add a b = a + b in Print (foldl add 0 (range 1 {size} nil) 1)""",
+    ),
+    "reverse": (
+        "Print (Reverse (Range 1 {size}) 1)",
+        """let rec range a b t = a gr b -> t | range (a + 1) b (t aug a) in
+let rec reverse t i r = i eq 0 -> r | reverse t (i - 1) (r aug t i) in
+let T = range 1 {size} nil in Print (reverse T (Order T) nil 1)""",
+    ),
+    "join": (
+        "Print (Length (Join ',' (Map Itos (Range 1 {size}))))",
+        """let rec itos n = n ls 10 -> Stem (select n) | Conc (itos (n / 10)) (Stem (select (n - n / 10 * 10)))
+where rec select n = n eq 0 -> '0123456789' | Stern (select (n - 1)) in
+let rec join t i s = i gr Order t -> s | join t (i + 1) (i eq 1 -> itos (t i) | Conc (Conc s ',') (itos (t i))) in
+let rec range a b t = a gr b -> t | range (a + 1) b (t aug a) in
+let rec length s n = s eq '' -> n | length (Stern s) (n + 1) in
+Print (length (join (range 1 {size} nil) 1 '') 0)""",
+    ),
+}
+
+def run(engine, source):
+    """
+    Returns the interpretation time and the output of one run with every library loaded.
+    """
+    variables = loadLibraries(list(LIBRARIES), PRIMITIVE_ENVIRONMENT_VARIABLES)
+    machine = ENGINES[engine](compileSource(source), Environment(0, variables=variables))
+    captured = io.StringIO()
+    with contextlib.redirect_stdout(captured):
+        start = time.perf_counter()
+        machine.interpret()
+        elapsed = time.perf_counter() - start
+    return elapsed, captured.getvalue()
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    engines = sys.argv[2:] or list(ENGINES)
+    print(f"{'function':8} {'engine':8} {'native':>9} {'rpal':>9} {'speedup':>8}  output")
+    for name, (native, rpal) in PROGRAMS.items():
+        for engine in engines:
+            nativeTime, nativeOutput = run(engine, native.format(size=size))
+            rpalTime, rpalOutput = run(engine, rpal.format(size=size))
+            if nativeOutput != rpalOutput:
+                raise SystemExit(f"outputs differ for {name} on {engine}: {nativeOutput} != {rpalOutput}")
+            print(f"{name:8} {engine:8} {nativeTime:9.4f} {rpalTime:9.3f} {rpalTime / nativeTime:7.1f}x  {nativeOutput}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Tokenizer.tokenizer import tokenizeSource
+from Parser.parser import Parser
+from Parser.standardizer import StandardizeAST
+from CSE.generateCS import CSGenerator
+from Environment.Environment import Environment
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Recursive definition benchmark.
+
+Usage:
+    python bench/rec_bench.py [engine ...]
+
+Runs recursion-heavy programs on every engine (or the ones named) with 'rec'
+generated as direct recursive closures and, for comparison, as applications of
+Y unrolled through an Eta on every call. Reports the time and the number of
+environments created by each run.
+"""
+
+PROGRAMS = {
+    "fib": """
+let rec fib n = n ls 2 -> n | fib (n - 1) + fib (n - 2)
+in Print (fib 16)
+""",
+    "ackermann": """
+let rec ack m n = m eq 0 -> n + 1 | n eq 0 -> ack (m - 1) 1 | ack (m - 1) (ack m (n - 1))
+in Print (ack 2 100)
+""",
+    "list-walk": """
+let rec build n t = n eq 0 -> t | build (n - 1) (t aug n) in
+let rec total t i = i gr Order t -> 0 | t i + total t (i + 1)
+in Print (total (build 2000 nil) 1)
+""",
+}
+
+def run(engine, source, recursiveDefinitions):
+    """
+    Returns the interpretation time, the number of environments created and the output of one run.
+    """
+    ast = Parser(tokenizeSource(source)).E()
+    StandardizeAST().standardize(ast)
+    controls = CSGenerator(recursiveDefinitions).generate(ast)
+    machine = ENGINES[engine](controls, Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES))
+    captured = io.StringIO()
+    with contextlib.redirect_stdout(captured):
+        start = time.perf_counter()
+        machine.interpret()
+        elapsed = time.perf_counter() - start
+    return elapsed, machine.totalEnvironments, captured.getvalue()
+
+def main():
+    engines = sys.argv[1:] or list(ENGINES)
+    print(f"{'program':10} {'engine':8} {'rec':>12} {'Y/eta':>12} {'speedup':>8}")
+    for name, source in PROGRAMS.items():
+        for engine in engines:
+            recTime, recEnvironments, recOutput = run(engine, source, True)
+            etaTime, etaEnvironments, etaOutput = run(engine, source, False)
+            if recOutput != etaOutput:
+                raise SystemExit(f"outputs differ on {engine}: {recOutput} != {etaOutput}")
+            print(f"{name:10} {engine:8} {recTime:11.3f}s {etaTime:11.3f}s {etaTime / recTime:7.2f}x")
+            print(f"{'':10} {'':8} {recEnvironments:>8} env {etaEnvironments:>8} env")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engine_bench import measure
+from Interpreter.interpreter import ENGINES
+
+"""
+Function return benchmark.
+
+Usage:
+    python bench/return_bench.py [size ...]
+
+Evaluates a tuple of `size` function applications, so every return happens
+with the results of the earlier applications on the operand stack and the
+remaining ones on the control stack. Reports the cost per return on every
+engine; with returns in constant time it stays flat as the size grows.
+"""
+
+PROGRAM = """
+let f x = x + 1
+in Print (Order ({applications}))
+"""
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 4000, 16000]
+    print(f"{'returns':>8} {'engine':8} {'seconds':>9} {'us/return':>10}")
+    for size in sizes:
+        source = PROGRAM.format(applications=", ".join(f"f {i}" for i in range(size)))
+        for engine in ENGINES:
+            elapsed, output = measure(engine, source, 1)
+            if output != str(size):
+                raise SystemExit(f"unexpected output from {engine}: {output}")
+            print(f"{size:>8} {engine:8} {elapsed:9.3f} {1e6 * elapsed / size:>10.2f}")
+
+if __name__ == "__main__":
+    main()
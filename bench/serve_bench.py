@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Server.client import request
+
+"""
+Interpreter daemon latency benchmark.
+
+Usage:
+    python bench/serve_bench.py [requests]
+
+Starts `myrpal.py --serve` on a temporary socket and runs tiny programs `requests`
+times each (default 200) through the client library in this process, and a tenth
+as many times through Server/client.py and through a cold `python myrpal.py`, both
+started per request. Reports the p50 and p99 latency of each.
+"""
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PROGRAMS = {
+    "print": "Print 'hello'",
+    "arithmetic": "Print ((1 + 2) * 3 - 4 / 2)",
+    "function": "let rec fact n = n eq 0 -> 1 | n * fact (n - 1) in Print (fact 10)",
+    "tuple": "let T = (1, 2, 3) aug 4 in Print (Order T, T 4)",
+}
+
+def percentile(times, fraction):
+    times = sorted(times)
+    return times[min(len(times) - 1, int(fraction * len(times)))]
+
+def report(name, method, times):
+    print(f"{name:10} {method:10} {percentile(times, 0.5) * 1000:8.2f}ms {percentile(times, 0.99) * 1000:8.2f}ms")
+
+def timed(function, count):
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as directory:
+        socketPath = os.path.join(directory, "rpal.sock")
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "myrpal.py"), "--serve", socketPath])
+        try:
+            while not os.path.exists(socketPath):
+                time.sleep(0.01)
+            print(f"{'program':10} {'method':10} {'p50':>10} {'p99':>10}")
+            for name, source in PROGRAMS.items():
+                path = os.path.join(directory, name)
+                with open(path, "w") as file:
+                    file.write(source)
+                outputs = set()
+
+                def library():
+                    outputs.add("".join(message.get("output", "") for message in request(socketPath, {"path": path})))
+                def client():
+                    outputs.add(subprocess.run([sys.executable, os.path.join(ROOT, "Server", "client.py"), socketPath, path],
+                                               check=True, capture_output=True, text=True).stdout)
+                def cold():
+                    outputs.add(subprocess.run([sys.executable, os.path.join(ROOT, "myrpal.py"), "--no-cache", path],
+                                               check=True, capture_output=True, text=True).stdout)
+
+                report(name, "library", timed(library, count))
+                report(name, "client", timed(client, max(1, count // 10)))
+                report(name, "cold CLI", timed(cold, max(1, count // 10)))
+                if len(outputs) != 1:
+                    raise SystemExit(f"outputs differ for {name}: {outputs}")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engine_bench import compileSource
+from Environment.Environment import Environment
+from Session.session import Session
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Incremental session benchmark.
+
+Usage:
+    python bench/session_bench.py [definitions] [engine ...]
+
+Builds a set of `definitions` (default 300) functions, each calling the one before,
+and runs a short expression using the last one in two ways on every engine (or the
+ones named): in a session already holding the definitions, and as a whole program
+defining them all with 'let', compiled and run from scratch as `myrpal.py` would.
+Also reports the time to add the definitions to the session one at a time.
+"""
+
+def definitions(count):
+    lines = ["f0 x = x + 1"]
+    for i in range(1, count):
+        lines.append(f"f{i} x = f{i - 1} (x + {i % 7})")
+    return lines
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    engines = sys.argv[2:] or list(ENGINES)
+    lines = definitions(count)
+    expression = f"Print (f{count - 1} 1)"
+    program = "".join(f"let {line} in\n" for line in lines) + expression
+
+    print(f"{count} definitions")
+    print(f"{'engine':8} {'define all':>11} {'session':>10} {'program':>10} {'speedup':>8}")
+    for engine in engines:
+        session = Session(engine)
+        start = time.perf_counter()
+        for line in lines:
+            session.execute(line)
+        defineTime = time.perf_counter() - start
+
+        sessionOutput = io.StringIO()
+        with contextlib.redirect_stdout(sessionOutput):
+            start = time.perf_counter()
+            session.execute(expression)
+            sessionTime = time.perf_counter() - start
+
+        programOutput = io.StringIO()
+        with contextlib.redirect_stdout(programOutput):
+            start = time.perf_counter()
+            machine = ENGINES[engine](compileSource(program), Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES))
+            machine.interpret()
+            programTime = time.perf_counter() - start
+        if sessionOutput.getvalue() != programOutput.getvalue():
+            raise SystemExit(f"outputs differ on {engine}: {sessionOutput.getvalue()} != {programOutput.getvalue()}")
+        print(f"{engine:8} {defineTime * 1000:9.1f}ms {sessionTime * 1000:8.2f}ms {programTime * 1000:8.2f}ms {programTime / sessionTime:7.1f}x")
+
+if __name__ == "__main__":
+    main()
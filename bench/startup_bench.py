@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+"""
+Cold start benchmark.
+
+Usage:
+    python bench/startup_bench.py [runs]
+
+Runs tiny programs `runs` times each (default 30) in a new `python myrpal.py`
+process, and in a new `python dist/myrpal.pyz` process when the zipapp has been
+built (python build_zipapp.py), and reports the median wall time of each next to
+that of `python -c pass`. Programs run with --no-cache, so each run tokenizes,
+parses and compiles its program as a first run would.
+"""
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PROGRAMS = {
+    "print": "Print 'hello'",
+    "function": "let rec fact n = n eq 0 -> 1 | n * fact (n - 1) in Print (fact 10)",
+    "tuple": "let T = (1, 2, 3) aug 4 in Print (Order T, T 4)",
+}
+
+def median(command, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2]
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    zipapp = os.path.join(ROOT, "dist", "myrpal.pyz")
+    print(f"{'python -c pass':22} {median([sys.executable, '-c', 'pass'], runs) * 1000:8.2f}ms")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, source in PROGRAMS.items():
+            path = os.path.join(directory, name)
+            with open(path, "w") as file:
+                file.write(source)
+            commands = {"myrpal.py": os.path.join(ROOT, "myrpal.py")}
+            if os.path.exists(zipapp):
+                commands["myrpal.pyz"] = zipapp
+            for method, script in commands.items():
+                elapsed = median([sys.executable, script, "--no-cache", path], runs)
+                print(f"{name:10} {method:11} {elapsed * 1000:8.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engine_bench import measure
+from Interpreter.interpreter import ENGINES
+from CSE.operators import conc, stem, stern
+
+"""
+String processing benchmark.
+
+Usage:
+    python bench/string_bench.py [size ...]
+
+Walks a string of `size` characters with 'Stem' and 'Stern', and builds one of
+`size` characters by repeated 'Conc', first through the operators alone and
+then with an RPAL loop on every engine. Both take time linear in the size, so
+the cost per character stays flat as the size grows.
+"""
+
+WALK = """
+let rec count s n = s eq '' -> n | count (Stern s) (Stem s eq 'a' -> n + 1 | n)
+in Print (count '{text}' 0)
+"""
+
+BUILD = """
+let rec build n s = n eq 0 -> s | build (n - 1) (Conc s 'x')
+in Print (Stem (build {size} ''))
+"""
+
+def walkWithOperators(text):
+    start = time.perf_counter()
+    while text != '':
+        stem(text)
+        text = stern(text)
+    return time.perf_counter() - start
+
+def buildWithOperators(size):
+    start = time.perf_counter()
+    text = ''
+    for _ in range(size):
+        text = conc(text, 'x')
+    str(text)
+    return time.perf_counter() - start
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    print(f"{'chars':>8} {'task':6} {'operators':>10}  {'engine':8} {'seconds':>8} {'us/char':>8}")
+    for size in sizes:
+        text = "abcdefghij" * (size // 10)
+        tasks = [
+            ("walk", walkWithOperators(text), WALK.format(text=text), str(size // 10)),
+            ("build", buildWithOperators(size), BUILD.format(size=size), "x"),
+        ]
+        for task, operators, source, expected in tasks:
+            for engine in ENGINES:
+                elapsed, output = measure(engine, source, 1)
+                if output != expected:
+                    raise SystemExit(f"unexpected output from {engine}: {output}")
+                print(f"{size:>8} {task:6} {operators:10.3f}  {engine:8} {elapsed:8.3f} {1e6 * elapsed / size:8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Tokenizer.tokenizer import tokenizeSource
+from Parser.folder import FoldAST
+from Parser.parser import Parser
+from Parser.resolver import ResolveAST
+from Parser.standardizer import StandardizeAST
+from CSE.generateCS import CSGenerator
+from Environment.Environment import Environment
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Benchmark suite of representative RPAL workloads, timed phase by phase.
+
+Usage:
+    python bench/suite_bench.py [--repeats N] [--warmup N] [--engine NAME ...]
+                                [--save [PATH]] [--compare PATH] [program ...]
+
+Runs the programs of bench/programs (deep recursion, tail loops, tuples built with
+aug, strings walked with Stem/Stern, Conc-heavy output, ...) and two generated
+ones, a large source for the tokenizer and parser and deeply nested definitions
+for the standardizer, or only the programs named. Every program is tokenized,
+parsed, standardized, resolved, folded, generated into control structures and
+interpreted `repeats` times (default 5) on every engine (or the ones named), after
+`warmup` untimed runs (default 1), and the median and minimum of each phase are
+reported. Interpretation is timed per engine and the front end over all runs.
+
+--save writes the results as JSON (by default to bench/baselines/<commit>.json),
+and --compare reports the medians against those of a saved baseline, marking
+the phases that got slower or faster by more than THRESHOLD.
+"""
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PROGRAM_DIRECTORY = os.path.join(ROOT, "bench", "programs")
+BASELINE_DIRECTORY = os.path.join(ROOT, "bench", "baselines")
+FRONT_END_PHASES = ("tokenize", "parse", "standardize", "resolve", "fold", "generate")
+# Relative change of a median reported as a regression or an improvement
+THRESHOLD = 0.10
+
+def largeSource(definitions):
+    """
+    Returns a program of many simultaneous definitions, mostly work for the
+    tokenizer and the parser.
+    """
+    lines = ["// Generated: many simultaneous definitions", "let"]
+    for i in range(definitions):
+        if i % 50 == 0:
+            lines.append(f"    // Block {i // 50}")
+        lines.append(f"    {'and ' if i else ''}f{i} x = x ls {i} -> x * {i} + 1 | (x - {i}) / 2 + Order ('{i}', x, 'f{i}')")
+    lines.append(f"in Print (f0 3 + f{definitions - 1} 4)")
+    return "\n".join(lines) + "\n"
+
+def deepNesting(depth):
+    """
+    Returns a program of nested function definitions with where clauses, mostly
+    work for the standardizer. Python's recursion limit bounds the depth to about 200.
+    """
+    lines = ["// Generated: nested definitions"]
+    for i in range(depth):
+        lines.append(f"let g{i} x y = x + y * z where z = (((({i % 7})))) in")
+    lines.append("Print (" + " + ".join(f"g{i} 1 2" for i in range(0, depth, 10)) + ")")
+    return "\n".join(lines) + "\n"
+
+GENERATED = {
+    "large_source": lambda: largeSource(2000),
+    "deep_nesting": lambda: deepNesting(150),
+}
+
+def loadPrograms(names):
+    """
+    Returns the sources of the suite's programs by name, or of the ones named.
+    """
+    programs = {}
+    for fileName in sorted(os.listdir(PROGRAM_DIRECTORY)):
+        if fileName.endswith(".rpal"):
+            with open(os.path.join(PROGRAM_DIRECTORY, fileName)) as file:
+                programs[fileName[:-len(".rpal")]] = file.read()
+    for name, generate in GENERATED.items():
+        programs[name] = generate()
+    for name in names:
+        if name not in programs:
+            sys.exit(f"Unknown program '{name}'. Use one of: {', '.join(programs)}.")
+    return {name: programs[name] for name in names} if names else programs
+
+def runPhases(source, engine):
+    """
+    Compiles and runs a program once, timing each phase.
+
+    Returns:
+        tuple: The phase timings in seconds, by phase, and the program's output.
+    """
+    timings = {}
+    start = time.perf_counter()
+    tokens = tokenizeSource(source)
+    timings["tokenize"], start = time.perf_counter() - start, time.perf_counter()
+    ast = Parser(tokens).E()
+    timings["parse"], start = time.perf_counter() - start, time.perf_counter()
+    StandardizeAST().standardize(ast)
+    timings["standardize"], start = time.perf_counter() - start, time.perf_counter()
+    ResolveAST().resolve(ast)
+    timings["resolve"], start = time.perf_counter() - start, time.perf_counter()
+    FoldAST(PRIMITIVE_ENVIRONMENT_VARIABLES).fold(ast)
+    timings["fold"], start = time.perf_counter() - start, time.perf_counter()
+    controlStructures = CSGenerator().generate(ast)
+    timings["generate"] = time.perf_counter() - start
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        start = time.perf_counter()
+        # Includes the engine's own preparation (lowering or compiling the control structures)
+        ENGINES[engine](controlStructures, Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES)).interpret()
+        timings["interpret"] = time.perf_counter() - start
+    return timings, output.getvalue()
+
+def summarize(times):
+    return {"median": statistics.median(times), "min": min(times), "runs": len(times)}
+
+def benchmark(source, engines, repeats, warmup):
+    """
+    Returns the timings of a program: {"phases": {phase: summary}, "interpret":
+    {engine: summary}, "output": the length of its output}.
+
+    Raises:
+        RuntimeError: If the engines print different outputs.
+    """
+    samples = {phase: [] for phase in FRONT_END_PHASES}
+    interpret = {engine: [] for engine in engines}
+    outputs = set()
+    for run in range(warmup + repeats):
+        for engine in engines:
+            timings, output = runPhases(source, engine)
+            outputs.add(output)
+            if run < warmup:
+                continue
+            for phase in FRONT_END_PHASES:
+                samples[phase].append(timings[phase])
+            interpret[engine].append(timings["interpret"])
+    if len(outputs) > 1:
+        raise RuntimeError("The engines printed different outputs.")
+    return {
+        "phases": {phase: summarize(times) for phase, times in samples.items()},
+        "interpret": {engine: summarize(times) for engine, times in interpret.items()},
+        "output": len(outputs.pop()),
+    }
+
+def commitId():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+def metadata(repeats, warmup):
+    return {
+        "commit": commitId(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "repeats": repeats,
+        "warmup": warmup,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def rows(result):
+    """
+    Yields (phase, summary) for the phases of a program's result, interpretation as
+    "interpret:<engine>".
+    """
+    yield from result["phases"].items()
+    for engine, summary in result["interpret"].items():
+        yield f"interpret:{engine}", summary
+
+def report(name, result, baseline):
+    print(f"{name} ({result['output']} characters of output)")
+    for phase, summary in rows(result):
+        line = f"    {phase:20} {summary['median'] * 1000:10.3f}ms {summary['min'] * 1000:10.3f}ms"
+        previous = dict(rows(baseline)).get(phase) if baseline is not None else None
+        if previous is not None and previous["median"] > 0:
+            ratio = summary["median"] / previous["median"]
+            mark = "slower" if ratio > 1 + THRESHOLD else "faster" if ratio < 1 - THRESHOLD else ""
+            line += f" {ratio:7.2f}x {mark}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the phases of a suite of RPAL programs.")
+    parser.add_argument("programs", nargs="*", help="programs to run (default: all)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--engine", action="append", choices=list(ENGINES), help="engine to run (default: all)")
+    parser.add_argument("--save", nargs="?", const="", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="compare with a JSON baseline")
+    args = parser.parse_args()
+    engines = args.engine or list(ENGINES)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        print(f"Compared with {args.compare} (commit {baseline['meta']['commit']}): median ratio, "
+              f"marked beyond {THRESHOLD:.0%}")
+    print(f"{'':24} {'median':>12} {'min':>12}")
+
+    results = {"meta": metadata(args.repeats, args.warmup), "programs": {}}
+    for name, source in loadPrograms(args.programs).items():
+        result = benchmark(source, engines, args.repeats, args.warmup)
+        results["programs"][name] = result
+        report(name, result, baseline.get("programs", {}).get(name))
+
+    if args.save is not None:
+        path = args.save or os.path.join(BASELINE_DIRECTORY, f"{results['meta']['commit'] or 'baseline'}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Saved {path}")
+
+if __name__ == "__main__":
+    main()
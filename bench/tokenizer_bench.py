@@ -0,0 +1,75 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Tokenizer.tokenizer import tokenizeSource
+
+"""
+Throughput benchmark for the tokenizer.
+
+Usage:
+    python bench/tokenizer_bench.py [megabytes] [repeats]
+
+Generates a synthetic RPAL source of the requested size (default 4 MB) twice,
+once as many short lines and once as a few very long lines, and reports the
+best of several runs in tokens/sec and MB/sec.
+"""
+
+FRAGMENTS = [
+    "let", "rec", "fib", "n", "=", "n", "ls", "2", "->", "n", "|",
+    "fib", "(n-1)", "+", "fib", "(n-2)", "in", "Print", "(fib", "20)",
+    "'a string with \\'escapes\\''", "x1_y", ">=", "**", "aug", "nil",
+    "(1,", "2,", "3)", "where", "f", "x", "=", "x", "*", "1000",
+]
+
+def generateSource(size, lineLength):
+    """
+    Builds a source of roughly `size` characters with lines of about `lineLength` characters.
+    """
+    rng = random.Random(42)
+    lines = []
+    total = 0
+    while total < size:
+        words = []
+        length = 0
+        while length < lineLength:
+            word = rng.choice(FRAGMENTS)
+            words.append(word)
+            length += len(word) + 1
+        if rng.random() < 0.1:
+            words.append("// trailing comment")
+        line = " ".join(words) + "\n"
+        lines.append(line)
+        total += len(line)
+    return "".join(lines)
+
+def measure(source, repeats):
+    """
+    Tokenizes `source` `repeats` times and returns (token count, best time in seconds).
+    """
+    best = None
+    count = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        count = len(tokenizeSource(source))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    size = int(megabytes * 1024 * 1024)
+
+    for label, lineLength in (("short lines", 80), ("long lines", 200000)):
+        source = generateSource(size, lineLength)
+        count, elapsed = measure(source, repeats)
+        mb = len(source.encode()) / (1024 * 1024)
+        print(f"{label:12} {mb:6.2f} MB  {count:9d} tokens  {elapsed:7.3f} s  "
+              f"{count / elapsed:12,.0f} tokens/s  {mb / elapsed:7.2f} MB/s")
+
+if __name__ == "__main__":
+    main()
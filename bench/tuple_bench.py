@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from engine_bench import measure
+from Interpreter.interpreter import ENGINES
+from CSE.operators import augment
+
+"""
+Tuple building benchmark.
+
+Usage:
+    python bench/tuple_bench.py [size ...]
+
+Builds a tuple of `size` elements by repeated 'aug', first through the 'aug'
+operator alone and then with an RPAL loop on every engine. The reference
+column times the same appends with the previous list copying representation
+(operand1 + [operand2]) for comparison; it is skipped above 20000 elements,
+where it takes seconds to minutes.
+"""
+
+PROGRAM = """
+let rec build n t = n eq 0 -> t | build (n - 1) (t aug n)
+in Print (Order (build {size} nil))
+"""
+
+def buildWithAugment(size):
+    start = time.perf_counter()
+    value = "nil"
+    for n in range(size):
+        value = augment(value, n)
+    return time.perf_counter() - start
+
+def buildWithCopies(size):
+    start = time.perf_counter()
+    value = []
+    for n in range(size):
+        value = value + [n]
+    return time.perf_counter() - start
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    print(f"{'elements':>9} {'aug':>8} {'copying':>8}  {'engine':8} {'seconds':>8}")
+    for size in sizes:
+        copying = f"{buildWithCopies(size):8.3f}" if size <= 20000 else f"{'-':>8}"
+        aug = buildWithAugment(size)
+        source = PROGRAM.format(size=size)
+        for engine in ENGINES:
+            elapsed, output = measure(engine, source, 1)
+            if output != str(size):
+                raise SystemExit(f"unexpected output from {engine}: {output}")
+            print(f"{size:>9} {aug:8.3f} {copying}  {engine:8} {elapsed:8.3f}")
+
+if __name__ == "__main__":
+    main()
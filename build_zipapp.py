@@ -0,0 +1,57 @@
+import argparse
+import os
+import py_compile
+import shutil
+import sys
+import tempfile
+import zipapp
+
+"""
+Builds the interpreter into a single-file zipapp.
+
+Usage:
+    python build_zipapp.py [output]
+
+Writes `output` (default: dist/myrpal.pyz), which runs like myrpal.py:
+
+    python dist/myrpal.pyz <file_path>
+
+Every module is stored with its bytecode, compiled for the Python that runs this
+script, so the zipapp starts without compiling any source (Python cannot write
+bytecode caches into an archive). Other Python versions fall back to the sources.
+"""
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PACKAGES = ["Batch", "CSE", "Environment", "Exception", "Interpreter", "Parser", "Server", "Session", "Tokenizer"]
+DEFAULT_OUTPUT = os.path.join(ROOT, "dist", "myrpal.pyz")
+
+def stage(directory):
+    """
+    Copies the sources into a directory with their bytecode next to them, where
+    zipimport looks for it. myrpal.py is also the archive's __main__.
+    """
+    sources = [("myrpal.py", "myrpal.py"), ("myrpal.py", "__main__.py")]
+    for package in PACKAGES:
+        for name in sorted(os.listdir(os.path.join(ROOT, package))):
+            if name.endswith(".py"):
+                sources.append((os.path.join(package, name), os.path.join(package, name)))
+    for source, target in sources:
+        targetPath = os.path.join(directory, target)
+        os.makedirs(os.path.dirname(targetPath), exist_ok=True)
+        shutil.copyfile(os.path.join(ROOT, source), targetPath)
+        # Unchecked hash-based bytecode is used without comparing it to the source
+        py_compile.compile(targetPath, cfile=targetPath + "c", dfile=target, doraise=True,
+                           invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build myrpal.py into a single-file zipapp.")
+    parser.add_argument("output", nargs="?", default=DEFAULT_OUTPUT)
+    output = parser.parse_args().output
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with tempfile.TemporaryDirectory() as directory:
+        stage(directory)
+        zipapp.create_archive(directory, output, interpreter="/usr/bin/env python3")
+    print(output)
+
+if __name__ == "__main__":
+    sys.exit(main())
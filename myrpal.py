@@ -1,29 +1,62 @@
+import builtins
+import os
 import sys
-from Tokenizer.tokenizer import tokenize
-from Parser.parser import Parser
-from Parser.standardizer import StandardizeAST
-from CSE.generateCS import CSGenerator
+import time
+
+class ImportTimer:
+    """
+    Times the imports made while it is installed (--startup-profile) by wrapping
+    builtins.__import__. Every module is recorded when it is first imported, with
+    the time spent importing it, including the modules it imports in turn.
+    """
+    def __init__(self):
+        self.original = builtins.__import__
+        # (depth, module name, seconds) in the order the imports started
+        self.records = []
+        self.depth = 0
+
+    def install(self):
+        builtins.__import__ = self.timedImport
+
+    def uninstall(self):
+        builtins.__import__ = self.original
+
+    def timedImport(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level != 0 or name in sys.modules:
+            return self.original(name, globals, locals, fromlist, level)
+        index = len(self.records)
+        self.records.append(None)
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            return self.original(name, globals, locals, fromlist, level)
+        finally:
+            self.depth -= 1
+            self.records[index] = (self.depth, name, time.perf_counter() - start)
+
+    def report(self, file):
+        """
+        Prints the imports as a tree, with their cumulative times in milliseconds.
+        """
+        print("Imports (cumulative ms):", file=file)
+        for depth, name, seconds in self.records:
+            print(f"{seconds * 1000:9.2f}  {'  ' * depth}{name}", file=file)
+
+# CPU time the Python interpreter spent starting up, before this module ran
+STARTUP_CPU_TIME = time.process_time()
+IMPORT_START = time.perf_counter()
+# Installed before the interpreter's modules are imported, so they are timed too
+importTimer = None
+if __name__ == "__main__" and "--startup-profile" in sys.argv[1:]:
+    importTimer = ImportTimer()
+    importTimer.install()
+
+# Modules only some options need (the other engines, the transpiler, memoization,
+# the native libraries, the batch runner, ...) are imported when they are used
 from Environment.Environment import Environment
-from CSE.CSEMachine import CSEMachine
-
-# Predefined primitive environment variables for the interpreter
-PRIMITIVE_ENVIRONMENT_VARIABLES = {
-    "Print": "print",
-    "nil": "nil",
-    "Y": "Y",
-    "print": "print",
-    "Conc": "conc",
-    "Stem": "stem",
-    "Stern": "stern",
-    "Isinteger": "isInteger",
-    "Isstring": "isString",
-    "Istruthvalue": "isTruthValue",
-    "Isfunction": "isFunction",
-    "Istuple": "isTuple",
-    "Isdummy": "isDummy",
-    "Order": "order",
-    "Null": "null",
-}
+from CSE.programCache import fileKey
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES, compileFile, compileTokens, loadOrCompileFile
+IMPORT_END = time.perf_counter()
 
 """
 Main entry for the program. Handles command-line args, reads the input file, and tokenizes its contents.
@@ -31,76 +64,378 @@ Main entry for the program. Handles command-line args, reads the input file, and
 Usage:
     python myrpal.py <file_path>
     python myrpal.py -ast <file_path>
+    python myrpal.py --no-cache <file_path>
+    python myrpal.py --engine=opcode <file_path>
+    python myrpal.py --engine=closure <file_path>
+    python myrpal.py --no-fold <file_path>
+    python myrpal.py --fold-report <file_path>
+    python myrpal.py --compile <file_path>
+    python myrpal.py --run <file_path>
+    python myrpal.py --memo[=<capacity>] [--memo-stats] <file_path>
+    python myrpal.py --lib=<name>[,<name>...] <file_path>
+    python myrpal.py --batch <directory_or_manifest> [-j <jobs>] [--timeout=<seconds>]
+    python myrpal.py --serve <socket_path> [--timeout=<seconds>]
+    python myrpal.py --repl
+    python myrpal.py --startup-profile <file_path>
+    python myrpal.py --stats[=json] <file_path>
 
 Args:
     <file_path>: Path to input file.
     -ast: (Optional) Print AST.
+    --no-cache: (Optional) Neither read nor write the compiled program cache.
+    --engine=<name>: (Optional) Execution engine, one of ENGINES (default: cse).
+    --no-fold: (Optional) Do not fold constant expressions.
+    --fold-report: (Optional) Report the number of nodes removed by constant folding on stderr.
+    --compile: (Optional) Transpile the program to a Python module in __rpalcache__,
+        byte-compile it and print its path, without running the program.
+    --run: (Optional) Run the program's transpiled module, transpiling it first when
+        it is missing or was transpiled from another version of the source.
+    --memo[=<capacity>]: (Optional) Memoize the pure functions of recursive definitions,
+        keeping up to <capacity> results (default: DEFAULT_CAPACITY of CSE.memo).
+    --memo-stats: (Optional) With --memo, report the memo table statistics on stderr.
+    --lib=<names>: (Optional) Load the named native libraries (LIBRARIES of
+        CSE.nativeLibrary: list, string, math) into the primitive environment.
+    --batch <source>: Run the programs of a directory or manifest (see Batch.batch) in
+        worker processes and print a JSON summary instead of running one file. Combines
+        with --no-cache, --no-fold, --engine, --memo and --lib.
+    -j <jobs>: (Optional) With --batch, the number of worker processes (default: one per CPU).
+    --serve <socket_path>: Serve programs sent over a Unix socket (see Server.server and
+        Server/client.py) until interrupted, instead of running one file. Combines with
+        --no-fold, --engine, --memo and --lib, which set the defaults of requests.
+    --repl: Read definitions and expressions from stdin one at a time and run them in
+        a session (see Session.session), instead of running one file. Combines with
+        --no-fold, --engine and --lib.
+    --timeout=<seconds>: (Optional) With --batch or --serve, the time a program may run
+        before it is stopped (default: DEFAULT_TIMEOUT of Batch.batch or Server.server).
+    --startup-profile: (Optional) Report the time of Python's startup, of each import
+        and of each phase of the run on stderr.
+    --stats[=json]: (Optional) Report the time of each phase, the numbers of tokens,
+        AST nodes and control structures, and the machine's counters (steps,
+        environments, peak stack depths, longest environment chain; see CSE.stats)
+        on stderr, as text or as a line of JSON. Bypasses the compiled program cache.
 
 Behavior:
-    - Validates arguments.
-    - Reads and prints file lines.
-    - Tokenizes lines into a list.
-    - Parses tokens into an abstract syntax tree (AST).
-    - Standardizes the AST.
-    - Generates control structures from the AST.
-    - Initializes the primitive environment.
-    - Creates and runs the CSE machine interpreter.
+    - Validates arguments. Engines, libraries and the transpiler are imported only
+      when the run uses them.
+    - With --batch, runs the batch's programs in a process pool and prints its summary.
+    - With --serve, listens on the socket and runs each request in a forked child.
+    - With --repl, runs the inputs read from stdin in a session keeping their definitions.
+    - Loads the compiled program from __rpalcache__/<file>c next to the source when
+      it was compiled from the same source by the same interpreter version.
+    - Otherwise, memory-maps the file and tokenizes it lazily.
+    - Parses tokens into an abstract syntax tree (AST), pulling them on demand.
+    - Standardizes the AST, resolves its identifiers and folds constant expressions.
+    - Generates control structures from the AST and refreshes the compiled program cache.
+    - Initializes the primitive environment, with the native libraries loaded by --lib.
+    - With --compile, transpiles the control structures to a Python module and stops.
+    - With --run, imports the transpiled module (from its cached bytecode) when it is
+      current, and runs it instead of a machine.
+    - Creates and runs the selected machine (the CSE machine by default), with --memo
+      memoizing the functions proven (or declared) pure.
     - Handles errors gracefully.
 """
 
+def runBatchCommand(source, jobs, timeout, options):
+    """
+    Runs the programs of a batch (--batch) and prints its JSON summary, exiting
+    with status 1 unless every program ran without error.
+    """
+    import json
+    from Batch.batch import DEFAULT_TIMEOUT, runBatch
+    try:
+        result = runBatch(source, jobs, timeout or DEFAULT_TIMEOUT, options)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    if result["summary"]["ok"] != result["summary"]["programs"]:
+        sys.exit(1)
+
+def serveCommand(socketPath, timeout, options):
+    """
+    Serves programs on a Unix socket (--serve) until interrupted.
+    """
+    from Server.server import DEFAULT_TIMEOUT, Server
+    try:
+        Server(socketPath, options, timeout or DEFAULT_TIMEOUT).serve()
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+def reportStartupProfile(phases):
+    """
+    Reports the interpreter's startup time, the imports and the phases of a run on
+    stderr (--startup-profile).
+    """
+    sys.stdout.flush()
+    print(file=sys.stderr)
+    print(f"Python startup (CPU): {STARTUP_CPU_TIME * 1000:.2f} ms", file=sys.stderr)
+    if importTimer is not None:
+        importTimer.report(sys.stderr)
+    print("Phases (ms):", file=sys.stderr)
+    for name, seconds in phases:
+        print(f"{seconds * 1000:9.2f}  {name}", file=sys.stderr)
+    print(f"{sum(seconds for _, seconds in phases) * 1000:9.2f}  total", file=sys.stderr)
+
+def reportStats(statsFormat, engine, phases, counts, machineStats):
+    """
+    Reports the phase timings, the front end's counts and the machine's counters of
+    a run on stderr, as text or as a line of JSON (--stats, see CSE.stats).
+    """
+    from CSE.stats import formatStats, statsJSON
+    sys.stdout.flush()
+    if statsFormat == "json":
+        print(statsJSON(engine, phases, counts, machineStats), file=sys.stderr)
+    else:
+        print(file=sys.stderr)
+        print(formatStats(engine, phases, counts, machineStats), file=sys.stderr)
+
 def main():
     """
     Main function to handle command-line arguments, file reading, tokenization,
     parsing, AST standardization, control structure generation, and interpretation.
     """
     printAST = False
+    useCache = True
+    fold = True
+    reportFold = False
+    engine = "cse"
+    compileOnly = False
+    runCompiled = False
+    memoCapacity = None
+    memoStats = False
+    libraries = []
+    batchSource = None
+    socketPath = None
+    interactive = False
+    jobs = None
+    timeout = None
+    startupProfile = False
+    statsFormat = None
+    file_path = None
+    # (phase, seconds) for --startup-profile and --stats
+    phases = [("imports", IMPORT_END - IMPORT_START)]
+    # Counts of the front end and counters of the machine for --stats
+    counts = {}
+    machineStats = None
+    phaseStart = time.perf_counter()
+
+    def endPhase(name):
+        nonlocal phaseStart
+        now = time.perf_counter()
+        # None drops the time since the last phase, spent collecting statistics
+        if name is not None:
+            phases.append((name, now - phaseStart))
+        phaseStart = now
 
     # Parse command-line arguments
-    args = sys.argv[1:]
-    if len(args) == 0:
+    if len(sys.argv) < 2:
         print("Please provide file path as argument.")
         sys.exit(1)
-    if len(args) == 1:
-        file_path = args[0]
-    elif len(args) == 2:
-        if args[0] == "-ast":
+    args = iter(sys.argv[1:])
+    for arg in args:
+        if arg == "-ast":
             printAST = True
-            file_path = args[1]
-        else:
+        elif arg == "--no-cache":
+            useCache = False
+        elif arg == "--no-fold":
+            fold = False
+        elif arg == "--fold-report":
+            reportFold = True
+        elif arg == "--compile":
+            compileOnly = True
+        elif arg == "--run":
+            runCompiled = True
+        elif arg == "--memo" or arg.startswith("--memo="):
+            from CSE.memo import DEFAULT_CAPACITY
+            memoCapacity = DEFAULT_CAPACITY
+            if arg != "--memo":
+                try:
+                    memoCapacity = int(arg[len("--memo="):])
+                except ValueError:
+                    memoCapacity = 0
+                if memoCapacity <= 0:
+                    print("Invalid memo capacity. Use a positive number of results.")
+                    sys.exit(1)
+        elif arg == "--memo-stats":
+            memoStats = True
+        elif arg.startswith("--lib="):
+            from CSE.nativeLibrary import LIBRARIES
+            libraries.extend(arg[len("--lib="):].split(","))
+            if not all(name in LIBRARIES for name in libraries):
+                print(f"Invalid library. Use one of: {', '.join(LIBRARIES)}.")
+                sys.exit(1)
+        elif arg == "--batch":
+            batchSource = next(args, None)
+            if batchSource is None:
+                print("Please provide a directory or manifest after --batch.")
+                sys.exit(1)
+        elif arg == "--startup-profile":
+            startupProfile = True
+        elif arg == "--stats" or arg.startswith("--stats="):
+            statsFormat = arg[len("--stats="):] if arg != "--stats" else "text"
+            if statsFormat not in ("text", "json"):
+                print("Invalid statistics format. Use --stats or --stats=json.")
+                sys.exit(1)
+        elif arg == "--repl":
+            interactive = True
+        elif arg == "--serve":
+            socketPath = next(args, None)
+            if socketPath is None:
+                print("Please provide a socket path after --serve.")
+                sys.exit(1)
+        elif arg == "-j" or arg.startswith("-j") and arg[2:].isdigit():
+            value = arg[2:] or next(args, "")
+            jobs = int(value) if value.isdigit() else 0
+            if jobs <= 0:
+                print("Invalid number of jobs. Use a positive number of processes.")
+                sys.exit(1)
+        elif arg.startswith("--timeout="):
+            try:
+                timeout = float(arg[len("--timeout="):])
+            except ValueError:
+                timeout = 0
+            if timeout <= 0:
+                print("Invalid timeout. Use a positive number of seconds.")
+                sys.exit(1)
+        elif arg.startswith("--engine="):
+            engine = arg[len("--engine="):]
+            if engine not in ENGINES:
+                print(f"Invalid engine. Use one of: {', '.join(ENGINES)}.")
+                sys.exit(1)
+        elif arg.startswith("-") or file_path is not None:
             print("Invalid argument. Use -ast to print AST.")
             sys.exit(1)
+        else:
+            file_path = arg
+    if batchSource is not None:
+        if file_path is not None or printAST or reportFold or compileOnly or runCompiled or memoStats or statsFormat is not None:
+            print("--batch takes no file path and cannot be combined with -ast, --fold-report, --compile, --run, --memo-stats or --stats.")
+            sys.exit(1)
+        runBatchCommand(batchSource, jobs, timeout, {
+            "engine": engine,
+            "useCache": useCache,
+            "fold": fold,
+            "libraries": libraries,
+            "memoCapacity": memoCapacity,
+        })
+        return
+    if interactive:
+        if file_path is not None or printAST or reportFold or compileOnly or runCompiled or memoCapacity is not None or memoStats or statsFormat is not None or batchSource is not None or socketPath is not None:
+            print("--repl takes no file path and only combines with --no-fold, --engine and --lib.")
+            sys.exit(1)
+        from Session.session import Session, repl
+        repl(Session(engine, libraries, fold))
+        return
+    if socketPath is not None:
+        if file_path is not None or printAST or reportFold or compileOnly or runCompiled or memoStats or statsFormat is not None or jobs is not None:
+            print("--serve takes no file path and cannot be combined with -ast, --fold-report, --compile, --run, --memo-stats, --stats or -j.")
+            sys.exit(1)
+        serveCommand(socketPath, timeout, {
+            "engine": engine,
+            "fold": fold,
+            "libraries": libraries,
+            "memoCapacity": memoCapacity,
+        })
+        return
+    if jobs is not None or timeout is not None:
+        print("-j and --timeout are options of --batch and --serve.")
+        sys.exit(1)
+    if file_path is None:
+        print("Please provide file path as argument.")
+        sys.exit(1)
+    if runCompiled and memoCapacity is not None:
+        print("--memo runs on an engine and cannot be combined with --run.")
+        sys.exit(1)
+    if statsFormat is not None and (compileOnly or runCompiled):
+        print("--stats counts the steps of an engine and cannot be combined with --compile or --run.")
+        sys.exit(1)
+
+    endPhase("arguments")
 
     # Read the input file and process its contents
-    with open(file_path, 'r') as file:
+    with open(file_path, 'rb') as file:
         try:
-            lines = file.readlines()
-            # Tokenize the input lines
-            tokens = tokenize(lines)
-            # Parse tokens into an AST
-            par = Parser(tokens)
-            ast = par.E()
-
-            # Optionally print the AST if requested
-            if printAST:
-                ast.trav(0)
-                print()
-
-            # Standardize the AST for further processing
-            StandardizeAST().standardize(ast)
-            # Generate control structures from the standardized AST
-            csGenerator = CSGenerator()
-            controlStructures = csGenerator.generate(ast)
-
-            # Initialize the primitive environment
-            primitiveEnvironment = Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES)
-            # Create and run the CSE machine interpreter
-            machine = CSEMachine(controlStructures, primitiveEnvironment)
-            machine.interpret()
+            key = fileKey(file, "" if fold else "no-fold")
+            endPhase("cache key")
+            # The AST, the folding report and the front end's statistics are only
+            # available from the front end, so -ast, --fold-report and --stats bypass the caches
+            useFrontEnd = printAST or reportFold or statsFormat is not None
+            module = None
+            if compileOnly or runCompiled:
+                from CSE.transpiler import Transpiler, loadModule, modulePath, writeModule
+            if runCompiled and not compileOnly and not useFrontEnd:
+                module = loadModule(modulePath(file_path), key)
+                endPhase("module load")
+
+            if module is None:
+                if statsFormat is not None:
+                    # Compiled like compileFile does, timing the lazy tokenizer within parsing
+                    from Tokenizer.tokenizer import scanFile
+                    from CSE.stats import TimedTokens, splitParsePhase
+                    tokens = TimedTokens(scanFile(file))
+                    endPhase(None)
+                    controlStructures = compileTokens(tokens, printAST, fold, reportFold, endPhase, counts)
+                    splitParsePhase(phases, tokens)
+                    counts["tokens"] = tokens.count
+                else:
+                    if useCache and not useFrontEnd:
+                        controlStructures = loadOrCompileFile(file, file_path, key, fold)
+                    else:
+                        controlStructures = compileFile(file, printAST, fold, reportFold)
+                    endPhase("compile")
+
+                if compileOnly or runCompiled:
+                    path = modulePath(file_path)
+                    writeModule(path, Transpiler(controlStructures).transpile(key, os.path.basename(file_path)))
+                    endPhase("transpile")
+                    if compileOnly:
+                        print(path)
+                        return
+                    module = loadModule(path, key)
+                    endPhase("module load")
+
+            # Initialize the primitive environment, with the native libraries requested
+            primitiveVariables = PRIMITIVE_ENVIRONMENT_VARIABLES
+            if libraries:
+                from CSE.nativeLibrary import loadLibraries
+                primitiveVariables = loadLibraries(libraries, PRIMITIVE_ENVIRONMENT_VARIABLES)
+            primitiveEnvironment = Environment(0, variables=primitiveVariables)
+            if module is not None:
+                # Run the transpiled program
+                module.main(primitiveEnvironment)
+                endPhase("run")
+            else:
+                memo = None
+                if memoCapacity is not None:
+                    from CSE.memo import Memo
+                    memo = Memo(controlStructures, primitiveVariables, memoCapacity)
+                # Create and run the selected machine
+                machineClass = ENGINES[engine]
+                endPhase("engine import")
+                machine = machineClass(controlStructures, primitiveEnvironment, memo)
+                if statsFormat is not None:
+                    from CSE.stats import instrument
+                    machineStats = instrument(machine, engine)
+                    endPhase(None)
+                try:
+                    machine.interpret()
+                finally:
+                    # Also timed when the program fails
+                    endPhase("run")
+                if memo is not None and memoStats:
+                    print(memo.report(), file=sys.stderr)
 
         except Exception as e:
             # Catch and print any errors during processing
             print(f"Error: {e}")
             sys.exit(1)
+        finally:
+            if startupProfile:
+                reportStartupProfile(phases)
+            if statsFormat is not None:
+                reportStats(statsFormat, engine, phases, counts, machineStats)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
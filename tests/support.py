@@ -0,0 +1,84 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+
+from Tokenizer.tokenizer import tokenizeSource
+from Environment.Environment import Environment
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES, compileTokens
+
+"""
+Helpers shared by the tests, which run with `python -m pytest` from the repository root.
+"""
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Programs exercising the corners of the language, by name: nil tuples (rule 9),
+# truth values next to integers, errors and recursion deeper than Python's default limit
+PROGRAMS = {
+    "arithmetic": "Print (1 + 2 * 3 - 4 / 2 ** 2, -5, 7 / 2)",
+    "strings": "Print (Conc 'ab' 'cd', Stem 'xyz', Stern 'xyz', 'a\\tb')",
+    "conditional": "let f x = x gr 2 -> 'big' | 'small' in Print (f 1, f 3)",
+    "tuples": "let t = (1, 'two', (3, true), nil aug 4) in Print (t, t 3 2, Order t, Order (t 4))",
+    "aug": "let rec upto n = n eq 0 -> nil | upto (n - 1) aug n in Print (upto 5)",
+    "nilTuple": "Print (nil, 2)",
+    "nilTupleReturned": "let f x = (nil, x) in Print (f 3)",
+    "nilTupleSelected": "let t = (nil, 1, 2) in Print (Istuple t, Null t)",
+    "truthValues": "Print (true eq 1, 1 eq true, false ne 0, (1, true) eq (1, 1), true, false or true)",
+    "typeTests": "Print (Isinteger true, Istruthvalue 1, Isstring 'a', Isfunction Print, Isdummy dummy)",
+    "where": "Print (f 3 where f x = x * y where y = 4)",
+    "within": "let a = 1 within b = a + 1 in Print b",
+    "simultaneous": "let x = 1 and y = 2 in Print (x, y)",
+    "curried": "let add x y z = x + y + z in let g = add 1 in Print (g 2 3)",
+    "tupleParameters": "let f (a, b) = a - b in Print (f (10, 3))",
+    "infix": "let Add x y = x + y in Print (2 @Add 3 @Add 4)",
+    "higherOrder": """
+        let rec map f t n = n eq 0 -> nil | map f t (n - 1) aug f (t n)
+        in let square x = x * x
+        in Print (map square (1, 2, 3, 4) 4)
+    """,
+    "fixedPoint": "let fact = Y (fn f. fn n. n eq 0 -> 1 | n * f (n - 1)) in Print (fact 20)",
+    "tailLoop": "let rec loop n acc = n eq 0 -> acc | loop (n - 1) (acc + n) in Print (loop 100000 0)",
+    "deepRecursion": "let rec sum n = n eq 0 -> 0 | 1 + sum (n - 1) in Print (sum 20000)",
+    "deepTuples": """
+        let rec nest n = n eq 0 -> 0 | (nest (n - 1), n)
+        in Print (nest 5000 eq nest 5000, nest 5000 eq nest 4999)
+    """,
+    "errorSelection": "Print ((1, 2) 3)",
+    "errorOperands": "Print (1 + 'a')",
+    "errorUnbound": "Print undefined",
+}
+
+def compileSource(source, fold=True):
+    """
+    Returns the control structures of a program's source.
+    """
+    return compileTokens(tokenizeSource(source), fold=fold)
+
+def runProgram(source, engine="cse", fold=True):
+    """
+    Compiles and runs a program on an engine (a key of Interpreter.interpreter.ENGINES).
+
+    Returns:
+        str: What the program printed, or "Error: <message>" if it failed.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            controlStructures = compileSource(source, fold)
+            ENGINES[engine](controlStructures, Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES)).interpret()
+        except Exception as e:
+            print(f"Error: {e}", end="")
+    return output.getvalue()
+
+def myrpal(*args, input=None):
+    """
+    Runs myrpal.py from the repository root with the given arguments, and `input`
+    (text) on its stdin if given.
+
+    Returns:
+        subprocess.CompletedProcess: Its exit status, output and error output (text).
+    """
+    return subprocess.run([sys.executable, os.path.join(ROOT, "myrpal.py"), *map(str, args)],
+                          input=input, capture_output=True, text=True, cwd=ROOT)
@@ -0,0 +1,101 @@
+import json
+import os
+
+import pytest
+
+from support import myrpal
+from Exception.RPALException import RPALException
+from Batch import batch
+from Batch.batch import listPrograms, runBatch
+
+"""
+The batch runner (--batch) reports every program it lists, in order, even when
+programs fail, run past the timeout or bring down their worker.
+"""
+
+OPTIONS = {"engine": "cse", "useCache": False, "fold": True, "libraries": [], "memoCapacity": None}
+
+LOOP = "let rec loop n = loop n in loop 1"
+
+def writePrograms(directory, programs):
+    """
+    Writes programs, given by file name, to a directory.
+    """
+    for name, source in programs.items():
+        (directory / name).write_text(source)
+
+def testDirectoryListsItsFiles(tmp_path):
+    writePrograms(tmp_path, {"b.rpal": "Print 2", "a.rpal": "Print 1", ".hidden": "Print 3"})
+    (tmp_path / "__rpalcache__").mkdir()
+    (tmp_path / "sub").mkdir()
+    assert listPrograms(str(tmp_path)) == [str(tmp_path / "a.rpal"), str(tmp_path / "b.rpal")]
+
+def testManifest(tmp_path):
+    manifest = tmp_path / "programs.txt"
+    manifest.write_text("# programs\n\nb.rpal\n  a.rpal  \n\n# missing.rpal\nmissing.rpal\n")
+    assert listPrograms(str(manifest)) == [str(tmp_path / name) for name in ["b.rpal", "a.rpal", "missing.rpal"]]
+
+    writePrograms(tmp_path, {"a.rpal": "Print 1", "b.rpal": "Print 2"})
+    records = runBatch(str(manifest), 2, 10, OPTIONS)["programs"]
+    assert [(record["status"], record["output"]) for record in records] == [("ok", "2"), ("ok", "1"), ("error", "")]
+    assert "missing.rpal" in records[2]["error"]
+
+@pytest.mark.parametrize("lines", ["", "# no programs\n\n"])
+def testEmptyManifest(tmp_path, lines):
+    manifest = tmp_path / "programs.txt"
+    manifest.write_text(lines)
+    with pytest.raises(RPALException, match="lists no programs"):
+        listPrograms(str(manifest))
+
+def testMissingSource(tmp_path):
+    with pytest.raises(RPALException, match="neither a directory nor a manifest file"):
+        listPrograms(str(tmp_path / "missing"))
+
+def testTimedOutWorkerIsReplaced(tmp_path, monkeypatch):
+    stopped = []
+    stop = batch.Worker.stop
+    def recordStop(worker):
+        stopped.append(worker.process)
+        stop(worker)
+    monkeypatch.setattr(batch.Worker, "stop", recordStop)
+    writePrograms(tmp_path, {"a.rpal": "Print 1", "b.rpal": LOOP, "c.rpal": "Print 3"})
+    result = runBatch(str(tmp_path), 1, 0.5, OPTIONS)
+    assert [record["status"] for record in result["programs"]] == ["ok", "timeout", "ok"]
+    assert result["programs"][1]["error"] == "Timed out after 0.5 s."
+    assert result["programs"][2]["output"] == "3"
+    # The worker running the loop was killed, and a new one ran the last program
+    assert len(stopped) == 1 and not stopped[0].is_alive()
+
+def testDeadWorkerIsReplaced(tmp_path, monkeypatch):
+    runProgram = batch.runProgram
+    def dieOnExit(path, options):
+        if path.endswith("exit.rpal"):
+            os._exit(3)
+        return runProgram(path, options)
+    # Forked workers run the patched function
+    monkeypatch.setattr(batch, "runProgram", dieOnExit)
+    writePrograms(tmp_path, {"a.rpal": "Print 1", "b_exit.rpal": "Print 2", "c.rpal": "Print 3"})
+    records = runBatch(str(tmp_path), 1, 10, OPTIONS)["programs"]
+    assert [record["status"] for record in records] == ["ok", "error", "ok"]
+    assert records[1]["error"] == "Worker exited with code 3."
+    assert records[2]["output"] == "3"
+
+def testSummary(tmp_path):
+    writePrograms(tmp_path, {"a.rpal": "Print (1, 2)", "b.rpal": "Print (1 + 'a')", "c.rpal": LOOP})
+    process = myrpal("--batch", tmp_path, "-j", 2, "--timeout=0.5")
+    assert process.returncode == 1
+    result = json.loads(process.stdout)
+    assert set(result) == {"programs", "summary"}
+
+    ok, error, timeout = result["programs"]
+    assert set(ok) == set(error) == set(timeout) == {"path", "status", "output", "error", "timings"}
+    assert (ok["path"], ok["status"], ok["output"], ok["error"]) == (str(tmp_path / "a.rpal"), "ok", "(1, 2)", None)
+    assert set(ok["timings"]) == {"compile", "run", "total"}
+    assert (error["status"], set(error["timings"])) == ("error", {"compile", "total"})
+    assert (timeout["status"], set(timeout["timings"])) == ("timeout", {"total"})
+
+    summary = result["summary"]
+    assert set(summary) == {"programs", "ok", "errors", "timeouts", "jobs", "wall", "throughput", "timings"}
+    assert [summary[name] for name in ["programs", "ok", "errors", "timeouts", "jobs"]] == [3, 1, 1, 1, 2]
+    assert summary["throughput"] == pytest.approx(3 / summary["wall"])
+    assert summary["timings"]["total"] == pytest.approx(sum(record["timings"]["total"] for record in result["programs"]))
@@ -0,0 +1,32 @@
+import pytest
+
+from support import PROGRAMS, runProgram
+
+"""
+The engines (Interpreter.interpreter.ENGINES) must print the same output as the
+CSE machine, including for its corner cases: tuples whose first element is nil
+(rule 9), truth values next to integers, errors and recursion deeper than Python's
+default recursion limit.
+"""
+
+ENGINES = ["cse", "opcode", "closure"]
+
+@pytest.mark.parametrize("engine", ENGINES[1:])
+@pytest.mark.parametrize("name", PROGRAMS)
+def testEnginePrintsLikeCSEMachine(name, engine):
+    source = PROGRAMS[name]
+    assert runProgram(source, engine) == runProgram(source, "cse")
+
+@pytest.mark.parametrize("engine", ENGINES)
+def testNilTuples(engine):
+    assert runProgram("Print (nil, 2)", engine) == "nil"
+    assert runProgram("let f x = (nil, x) in Print (f 3)", engine) == "nil"
+
+@pytest.mark.parametrize("engine", ENGINES)
+def testUnfoldedPrograms(engine):
+    source = "Print (1 + 2, (nil, 3), true eq 1)"
+    assert runProgram(source, engine, fold=False) == runProgram(source, engine)
+
+def testClosureEngineRecursesBeyondThePythonStack():
+    source = "let rec sum n = n eq 0 -> 0 | 1 + sum (n - 1) in Print (sum 400000)"
+    assert runProgram(source, "closure") == "400000"
@@ -0,0 +1,85 @@
+import pytest
+
+from support import PROGRAMS, runProgram
+from Tokenizer.tokenizer import tokenizeSource
+from Parser.folder import MAX_FOLDED_EXPONENT, FoldAST, countNodes
+from Parser.parser import Parser
+from Parser.resolver import ResolveAST
+from Parser.standardizer import StandardizeAST
+from Interpreter.interpreter import PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Constant folding only replaces what it can evaluate safely at compile time, and
+never changes what a program prints.
+"""
+
+def folded(source):
+    """
+    Returns the folded tree of a program and the number of nodes folding removed.
+    """
+    ast = Parser(tokenizeSource(source)).E()
+    StandardizeAST().standardize(ast)
+    ResolveAST().resolve(ast)
+    removed = FoldAST(PRIMITIVE_ENVIRONMENT_VARIABLES).fold(ast)
+    return ast, removed
+
+def operators(ast):
+    """
+    Returns the operators (string heads) of a tree.
+    """
+    heads = []
+    pending = [ast]
+    while pending:
+        node = pending.pop()
+        if type(node.head) is str:
+            heads.append(node.head)
+        pending.extend(node.child)
+    return heads
+
+def testFoldsConstantExpressions():
+    ast, removed = folded("Print (1 + 2 * 3, 'a' eq 'a', not true, Conc 'ab' 'cd', Stem 'xyz')")
+    assert not {"+", "*", "eq", "not"} & set(operators(ast))
+    assert operators(ast).count("gamma") == 1
+    assert removed > 0
+
+def testFoldsConditionalsWithConstantGuards():
+    ast, _ = folded("let x = 3 in Print (2 gr 1 -> x | x + 1)")
+    assert "->" not in operators(ast)
+    assert "+" not in operators(ast)
+
+@pytest.mark.parametrize("exponent, foldedAway", [(MAX_FOLDED_EXPONENT, True), (MAX_FOLDED_EXPONENT + 1, False)])
+def testLargeExponentsAreLeftToRunTime(exponent, foldedAway):
+    ast, _ = folded(f"Print (2 ** {exponent})")
+    assert ("**" not in operators(ast)) is foldedAway
+    assert runProgram(f"Print (2 ** {exponent})") == str(2 ** exponent)
+
+@pytest.mark.parametrize("source", ["Print (1 / 0)", "Print (1 + 'a')", "Print (Stem 1)", "Print (Conc 1 'a')"])
+def testFailingApplicationsAreLeftToRunTime(source):
+    ast, removed = folded(source)
+    assert removed == 0
+    assert runProgram(source).startswith("Error:")
+    assert runProgram(source) == runProgram(source, fold=False)
+
+def testUntakenFailingBranchIsNeverRun():
+    assert runProgram("Print (true -> 1 | 1 / 0)") == "1"
+
+def testAugIsNotFolded():
+    ast, _ = folded("Print (nil aug 1)")
+    assert "aug" in operators(ast)
+
+def testShadowedPrimitivesAreNotFolded():
+    source = "let Conc x y = x in Print (Conc 'ab' 'cd')"
+    assert runProgram(source) == runProgram(source, fold=False) == "ab"
+
+def testRemovedCountsNodes():
+    source = "Print (1 + 2 + 3)"
+    ast = Parser(tokenizeSource(source)).E()
+    StandardizeAST().standardize(ast)
+    ResolveAST().resolve(ast)
+    before = countNodes(ast)
+    removed = FoldAST(PRIMITIVE_ENVIRONMENT_VARIABLES).fold(ast)
+    assert before - countNodes(ast) == removed == 4
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def testFoldingDoesNotChangeOutput(name):
+    assert runProgram(PROGRAMS[name], fold=False) == runProgram(PROGRAMS[name])
@@ -0,0 +1,82 @@
+import contextlib
+import io
+
+import pytest
+
+from support import compileSource
+from Environment.Environment import Environment
+from CSE.memo import Memo, PurityAnalysis, variableName
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+--memo only memoizes the recursive functions proven pure (or declared pure with
+the memo_ prefix), so memoized runs print what runs without it print.
+"""
+
+def memoizedNames(source):
+    """
+    Returns the names of the recursive functions of a program that are memoized.
+    """
+    analysis = PurityAnalysis(compileSource(source), PRIMITIVE_ENVIRONMENT_VARIABLES)
+    functions = analysis.memoizedFunctions()
+    names = set()
+    for rec in analysis.recs:
+        for index, lambdaControl in enumerate(rec.lambdas):
+            if lambdaControl.k in functions:
+                variables = rec.variables if len(rec.variables) == 1 else [rec.variables[index]]
+                names.update(variableName(variable) for variable in variables)
+    return names
+
+def runMemoized(source, engine):
+    """
+    Runs a program on an engine with --memo, returning its output and memo table.
+    """
+    controlStructures = compileSource(source)
+    memo = Memo(controlStructures, PRIMITIVE_ENVIRONMENT_VARIABLES)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        ENGINES[engine](controlStructures, Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES), memo).interpret()
+    return output.getvalue(), memo
+
+FIB = "let rec fib n = n ls 2 -> n | fib (n - 1) + fib (n - 2) in Print (fib 25)"
+
+@pytest.mark.parametrize("source, names", [
+    (FIB, {"fib"}),
+    ("let rec f x y = x eq 0 -> y | f (x - 1) (Conc y 'a') in Print (f 3 '')", {"f"}),
+    ("let rec f n = n eq 0 -> nil | f (n - 1) aug Stem 'ab' in Print (f 2)", {"f"}),
+    # Prints
+    ("let rec f n = n eq 0 -> Print 'done' | f (n - 1) in f 3", set()),
+    # Print under another name
+    ("let P = Print in let rec f n = n eq 0 -> P n | f (n - 1) in f 1", set()),
+    # Applies a parameter, which may be any function
+    ("let rec app g n = n eq 0 -> g 0 | app g (n - 1) in app Print 2", set()),
+    # Applies a function that is not pure
+    ("let rec p n = Print n in let rec f n = n eq 0 -> p 0 | f (n - 1) in f 2", set()),
+    # Returns a function that prints
+    ("let rec f n = n eq 0 -> (fn x. Print x) | f (n - 1) in f 2 'x'", set()),
+    # Declared pure
+    ("let rec memo_f n = n eq 0 -> Print 'done' | memo_f (n - 1) in memo_f 3", {"memo_f"}),
+])
+def testPurity(source, names):
+    assert memoizedNames(source) == names
+
+@pytest.mark.parametrize("engine", ["cse", "opcode", "closure"])
+def testMemoizedRunsPrintTheSameOutput(engine):
+    output, memo = runMemoized(FIB, engine)
+    assert output == "75025"
+    assert memo.hits > 0
+
+@pytest.mark.parametrize("engine", ["cse", "opcode", "closure"])
+def testImpureFunctionsStillPrint(engine):
+    source = "let rec f n = n eq 0 -> Print 'x' | f (n - 1) in (f 2, f 2, f 2)"
+    output, memo = runMemoized(source, engine)
+    assert output == "xxx"
+    assert memo.hits == memo.misses == 0
+
+def testCapacityBoundsTheTable():
+    controlStructures = compileSource(FIB)
+    memo = Memo(controlStructures, PRIMITIVE_ENVIRONMENT_VARIABLES, 4)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ENGINES["cse"](controlStructures, Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES), memo).interpret()
+    assert len(memo.table) == 4
+    assert memo.evictions > 0
@@ -0,0 +1,113 @@
+import contextlib
+import io
+
+import pytest
+
+from support import compileSource, myrpal
+from Environment.Environment import Environment
+from Exception.RPALException import RPALException
+from CSE.closureMachine import ClosureRuntime
+from CSE.nativeLibrary import LIBRARIES, loadLibraries, nativeFilter, nativeFoldl, nativeFoldr, nativeMap
+from CSE.values import DUMMY, NIL, Native, RPALTuple
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Native library functions (--lib) apply RPAL functions through the call of every
+engine, and reject arguments of the wrong type with an RPALException.
+"""
+
+ENGINE_NAMES = ["cse", "opcode", "closure"]
+
+LIBRARY_VARIABLES = loadLibraries(list(LIBRARIES), PRIMITIVE_ENVIRONMENT_VARIABLES)
+
+def runWithLibraries(source, engine):
+    """
+    Runs a program on an engine with all the native libraries loaded.
+
+    Returns:
+        str: What the program printed, or "Error: <message>" if it failed.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            ENGINES[engine](compileSource(source), Environment(0, variables=LIBRARY_VARIABLES)).interpret()
+        except Exception as e:
+            print(f"Error: {e}", end="")
+    return output.getvalue()
+
+def machineCall(source, engine):
+    """
+    Evaluates a program on an engine, returning its value and the machine's call,
+    the function native functions apply RPAL functions with.
+    """
+    machine = ENGINES[engine](compileSource(source), Environment(0, variables=LIBRARY_VARIABLES))
+    value = machine.evaluate()
+    # The closure engine applies functions with its runtime's apply
+    return value, machine.apply if isinstance(machine, ClosureRuntime) else machine.call
+
+@pytest.mark.parametrize("engine", ENGINE_NAMES)
+def testCallAppliesClosures(engine):
+    double, call = machineCall("fn x. 2 * x", engine)
+    assert nativeMap(call, double, RPALTuple([1, 2, 3])).toList() == [2, 4, 6]
+    assert nativeMap(call, double, NIL) == NIL
+    positive, call = machineCall("fn x. x gr 0", engine)
+    assert nativeFilter(call, positive, RPALTuple([-1, 2, 0, 3])).toList() == [2, 3]
+    subtract, call = machineCall("fn x. fn y. x - y", engine)
+    assert nativeFoldl(call, subtract, 10, RPALTuple([1, 2])) == 7
+    assert nativeFoldr(call, subtract, 10, RPALTuple([1, 2])) == 9
+
+@pytest.mark.parametrize("engine", ENGINE_NAMES)
+def testCallAppliesPrint(engine, capsys):
+    printFunction, call = machineCall("Print", engine)
+    assert nativeMap(call, printFunction, RPALTuple([1, "a"])).toList() == [DUMMY, DUMMY]
+    assert capsys.readouterr().out == "1a"
+
+PROGRAM = """
+    let double x = 2 * x
+    in let rec count n = n eq 0 -> 0 | 1 + count (n - 1)
+    in let printed = Map Print (1, 2)
+    in Print (Map double (1, 2, 3), Filter (fn x. x gr 1) (1, 2, 3),
+              Foldl (fn a. fn x. a - x) 10 (1, 2), Foldr (fn x. fn a. x - a) 10 (1, 2),
+              Map count (3, 4), Map double nil, printed)
+"""
+
+OUTPUT = "12([2, 4, 6], [2, 3], 7, 9, [3, 4], nil, ['dummy', 'dummy'])"
+
+@pytest.mark.parametrize("engine", ENGINE_NAMES)
+def testHigherOrderFunctions(engine):
+    assert runWithLibraries(PROGRAM, engine) == OUTPUT
+
+def testHigherOrderFunctionsWhenTranspiled(tmp_path):
+    path = tmp_path / "program.rpal"
+    path.write_text(PROGRAM)
+    assert myrpal("--lib=list", "--run", path).stdout == OUTPUT
+
+@pytest.mark.parametrize("source, error", [
+    ("Print (Map (fn x. x) 3)", "Map expects a tuple."),
+    ("Print (Foldl (fn a. fn x. a) 0 'abc')", "Foldl expects a tuple."),
+    ("Print (Filter (fn x. x) (1, 2))", "Filter expects its function to return a truth value."),
+    ("Print (Range 1 'b')", "Range expects an integer."),
+    ("Print (Sum (1, true))", "Sum expects an integer."),
+    ("Print (Join ', ' ('a', 1))", "Join expects a string."),
+    ("Print (Stoi '1a')", "Stoi expects the digits of an integer, got '1a'."),
+    ("Print (Mod 7 0)", "Division by zero."),
+    ("Print (Mod 'a' 2)", "Mod expects an integer."),
+    ("Print (Isqrt (-1))", "Isqrt expects a non-negative integer."),
+])
+@pytest.mark.parametrize("engine", ENGINE_NAMES)
+def testWrongArguments(source, error, engine):
+    assert runWithLibraries(source, engine) == f"Error: {error}"
+
+def testLoadLibraries():
+    variables = loadLibraries(["list", "list"], PRIMITIVE_ENVIRONMENT_VARIABLES)
+    assert type(variables["Map"]) is Native
+    assert "Map" not in PRIMITIVE_ENVIRONMENT_VARIABLES
+    with pytest.raises(RPALException, match="Unknown library 'lists'"):
+        loadLibraries(["lists"], PRIMITIVE_ENVIRONMENT_VARIABLES)
+
+def testRedefiningANameIsAnError():
+    variables = dict(PRIMITIVE_ENVIRONMENT_VARIABLES, Map="defined")
+    with pytest.raises(RPALException, match="Library 'list' redefines 'Map'."):
+        loadLibraries(["string", "list"], variables)
+    assert "Split" not in variables
+    assert variables["Map"] == "defined"
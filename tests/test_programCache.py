@@ -0,0 +1,95 @@
+import os
+import struct
+
+import pytest
+
+from support import PROGRAMS, compileSource, myrpal
+from Environment.Environment import Environment
+from CSE import programCache
+from CSE.programCache import HEADER, CompiledWriter, cachePath, loadCompiled, readCompiled, saveCompiled, sourceKey
+from Interpreter.interpreter import ENGINES, PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Compiled programs (.rpalc) must read back as the control structures written, and
+must never be used for another source, front end or interpreter version.
+"""
+
+def runControlStructures(controlStructures, capsys):
+    ENGINES["cse"](controlStructures, Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES)).interpret()
+    return capsys.readouterr().out
+
+@pytest.mark.parametrize("name", [name for name in PROGRAMS if not name.startswith("error")])
+def testRoundTrip(name, capsys):
+    source = PROGRAMS[name]
+    key = sourceKey(source.encode())
+    controlStructures = compileSource(source)
+    image = CompiledWriter().write(key, controlStructures)
+    loaded, warnings = readCompiled(image, key)
+    assert warnings == ""
+    # Written again, the control structures read back give the same image
+    assert CompiledWriter().write(key, loaded) == image
+    assert runControlStructures(loaded, capsys) == runControlStructures(compileSource(source), capsys)
+
+def testTruthValuesStayApartFromIntegers(capsys):
+    source = "Print (true, 1, false, 0, true eq 1)"
+    key = sourceKey(source.encode())
+    loaded, _ = readCompiled(CompiledWriter().write(key, compileSource(source)), key)
+    assert runControlStructures(loaded, capsys) == "(true, 1, false, 0, false)"
+
+def testSaveAndLoad(tmp_path):
+    source = PROGRAMS["higherOrder"]
+    key = sourceKey(source.encode())
+    path = str(tmp_path / "__rpalcache__" / "program.rpalc")
+    assert saveCompiled(path, key, compileSource(source))
+    assert os.listdir(tmp_path / "__rpalcache__") == ["program.rpalc"]
+    loaded, _ = loadCompiled(path, key)
+    assert CompiledWriter().write(key, loaded) == CompiledWriter().write(key, compileSource(source))
+
+def testStaleOrDamagedFilesAreNotUsed(tmp_path):
+    source = PROGRAMS["tuples"]
+    key = sourceKey(source.encode())
+    path = str(tmp_path / "program.rpalc")
+    assert loadCompiled(path, key) is None
+    saveCompiled(path, key, compileSource(source))
+    assert loadCompiled(path, sourceKey((source + " ").encode())) is None
+    assert loadCompiled(path, sourceKey(source.encode(), "no-fold")) is None
+
+    with open(path, "rb") as file:
+        image = file.read()
+    for damaged in [b"", image[:HEADER.size - 1], image[:len(image) // 2], b"RPALX" + image[5:],
+                    image[:8] + struct.pack("<I", programCache.FORMAT_VERSION + 1) + image[12:]]:
+        with open(path, "wb") as file:
+            file.write(damaged)
+        assert loadCompiled(path, key) is None
+
+def testKeyCoversTheInterpreterVersion(monkeypatch):
+    key = sourceKey(b"Print 1")
+    monkeypatch.setattr(programCache, "INTERPRETER_VERSION", programCache.INTERPRETER_VERSION + "+")
+    assert sourceKey(b"Print 1") != key
+
+def testEditedSourceIsRecompiled(tmp_path):
+    path = tmp_path / "program.rpal"
+    path.write_text("Print (1 + 2)")
+    assert myrpal(path).stdout == "3"
+    assert os.path.exists(cachePath(str(path)))
+    assert myrpal(path).stdout == "3"
+    path.write_text("Print (1 + 3)")
+    assert myrpal(path).stdout == "4"
+    assert myrpal("--no-fold", path).stdout == "4"
+    assert myrpal(path).stdout == "4"
+
+def testWarningsAreKept():
+    source = "Print (1 \u00e9 2)"
+    key = sourceKey(source.encode())
+    warnings = "Warning: Unexpected character '\u00e9' at line 1\n"
+    _, loaded = readCompiled(CompiledWriter().write(key, compileSource(source), warnings), key)
+    assert loaded == warnings
+
+def testWarningsAreReplayedFromTheCache(tmp_path):
+    path = tmp_path / "program.rpal"
+    path.write_text("Print (1 \u00e9 2)", encoding="utf-8")
+    first = myrpal(path)
+    assert os.path.exists(cachePath(str(path)))
+    second = myrpal(path)
+    assert "Warning: Unexpected character '\u00e9' at line 1" in first.stdout
+    assert (second.stdout, second.stderr) == (first.stdout, first.stderr)
@@ -0,0 +1,76 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from support import ROOT
+from Server.server import Server
+
+"""
+The interpreter daemon (--serve) answers every client, whatever the others do.
+"""
+
+OPTIONS = {"engine": "cse", "fold": True, "libraries": [], "memoCapacity": None}
+
+def receiveAll(connection):
+    data = b""
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            return [json.loads(line) for line in data.splitlines()]
+        data += chunk
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "server.sock")
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "myrpal.py"), "--serve", path], cwd=ROOT)
+    deadline = time.perf_counter() + 10
+    while not os.path.exists(path):
+        assert time.perf_counter() < deadline and process.poll() is None
+        time.sleep(0.01)
+    yield path
+    process.terminate()
+    process.wait()
+
+def request(path, data):
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(path)
+    connection.sendall(data)
+    with connection:
+        return receiveAll(connection)
+
+def testIdleClientsDoNotHoldUpOthers(server):
+    idle = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    idle.connect(server)
+    partial = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    partial.connect(server)
+    partial.sendall(b'{"source": "Print ')
+    with idle, partial:
+        start = time.perf_counter()
+        messages = request(server, b'{"source": "Print (1, 2)"}\n')
+        assert time.perf_counter() - start < 2
+        assert messages[0] == {"output": "(1, 2)"}
+        assert messages[-1]["status"] == "ok"
+        partial.sendall(b'(nil, 2)"}\n')
+        messages = receiveAll(partial)
+        assert messages[0] == {"output": "nil"}
+
+def testInvalidRequest(server):
+    messages = request(server, b"Print 1\n")
+    assert messages == [{"status": "error", "error": "The request is not a line of JSON.", "timings": {}}]
+
+def testForkFailureIsReported(monkeypatch, tmp_path):
+    def fork():
+        raise OSError("Resource temporarily unavailable")
+    monkeypatch.setattr(os, "fork", fork)
+    serverSide, clientSide = socket.socketpair()
+    with clientSide:
+        Server(str(tmp_path / "server.sock"), OPTIONS, 10).handle(serverSide, b'{"source": "Print 1"}\n')
+        messages = receiveAll(clientSide)
+    assert messages[-1]["status"] == "error"
+    assert "Could not start the interpreter" in messages[-1]["error"]
+    assert serverSide.fileno() == -1
@@ -0,0 +1,76 @@
+import pytest
+
+from support import myrpal
+from CSE.generateCS import Constant
+from CSE.operators import formatValue
+from Exception.RPALException import RPALException
+from Session.session import IncompleteInput, Session
+
+"""
+Sessions (--repl) keep their definitions from one input to the next, on every engine.
+"""
+
+ENGINES = ["cse", "opcode", "closure"]
+
+def run(session, *inputs):
+    """
+    Runs inputs in a session and returns the formatted value of the last one.
+    """
+    for source in inputs:
+        names, value = session.execute(source)
+    return formatValue(value)
+
+@pytest.mark.parametrize("engine", ENGINES)
+def testDefinitionsCarryAcrossInputs(engine):
+    session = Session(engine)
+    assert session.execute("a = 1 and b = 2")[0] == ["a", "b"]
+    assert session.execute("rec fib n = n ls 2 -> n | fib (n - 1) + fib (n - 2)")[0] == ["fib"]
+    assert run(session, "double x = 2 * x", "double (fib 10) + a + b") == "113"
+
+@pytest.mark.parametrize("engine", ENGINES)
+def testRedefiningAName(engine):
+    session = Session(engine)
+    assert run(session, "x = 1", "f y = x + y", "f 1") == "2"
+    # Names are looked up when used, so earlier functions see the new definition
+    assert run(session, "x = 10", "f 1") == "11"
+    assert run(session, "f y = y", "f 1") == "1"
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("fold", [True, False])
+def testShadowingAPrimitive(engine, fold):
+    session = Session(engine, fold=fold)
+    assert run(session, "Conc 'a' 'b'") == "ab"
+    assert run(session, "Conc x y = y", "Conc 'a' 'b'") == "b"
+    assert run(session, "Stem 'abc'") == "a"
+
+def testPrimitiveApplicationsAreFolded():
+    session = Session()
+    run(session, "Conc 'a' (Stem 'bc')")
+    assert [type(element) for element in session.generator.getControlStructures()[0].elements] == [Constant]
+    # The session's own Conc is applied, not folded away
+    run(session, "Conc x y = y", "Conc 'a' 'b'")
+    assert session.generator.getControlStructures()[0].elements[:2] == ["gamma", "gamma"]
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("source", ["1 +", "f (1,", "x =", "rec f n = n eq 0 ->", "let x = 1 in"])
+def testPartialInputIsIncomplete(engine, source):
+    with pytest.raises(IncompleteInput):
+        Session(engine).execute(source)
+
+@pytest.mark.parametrize("engine", ENGINES)
+def testErrorsDefineNothing(engine):
+    session = Session(engine)
+    with pytest.raises(RPALException):
+        session.execute("x = 1 / 0")
+    with pytest.raises(RPALException):
+        session.execute("x")
+    assert run(session, "x = 3", "x") == "3"
+
+@pytest.mark.parametrize("engine", ENGINES)
+def testRepl(engine):
+    inputs = "x = 2\nrec f n = n eq 0 -> 1\n  | n * f (n - 1)\nf (x + 3)\nPrint 'hi'\ny\nf (\n"
+    result = myrpal("--repl", f"--engine={engine}", input=inputs)
+    assert result.stdout.splitlines() == [
+        "Defined x.", "Defined f.", "120", "hi", "Error: Undeclared Identifier <y> in line 1",
+        "Error: Incomplete input at end of file.",
+    ]
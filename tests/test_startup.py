@@ -0,0 +1,40 @@
+import pytest
+
+from support import myrpal
+
+"""
+--startup-profile reports Python's startup, the imports and the phases of a run,
+and a run only imports the modules of the options it uses.
+"""
+
+def importedModules(stderr):
+    """
+    Returns the modules listed in the import tree of a --startup-profile report.
+    """
+    lines = stderr.split("Imports (cumulative ms):\n")[1].split("Phases (ms):\n")[0]
+    return {line.split()[1] for line in lines.splitlines()}
+
+def testStartupProfile(tmp_path):
+    path = tmp_path / "program.rpal"
+    path.write_text("let f x = x * 2 in Print (f 21)")
+    result = myrpal("--startup-profile", "--no-cache", path)
+    assert result.returncode == 0
+    assert result.stdout == "42"
+    assert result.stderr.lstrip().startswith("Python startup (CPU): ")
+    phases = result.stderr.split("Phases (ms):\n")[1].splitlines()
+    assert [line.split(None, 1)[1] for line in phases] == ["imports", "arguments", "cache key", "compile", "engine import", "run", "total"]
+    assert all(float(line.split()[0]) >= 0 for line in phases)
+    assert "CSE.CSEMachine" in importedModules(result.stderr)
+
+@pytest.mark.parametrize("options, module", [
+    ([], None),
+    (["--memo"], "CSE.memo"),
+    (["--engine=closure"], "CSE.closureMachine"),
+    (["--lib=list"], "CSE.nativeLibrary"),
+])
+def testOptionalModulesAreImportedOnlyWhenUsed(options, module, tmp_path):
+    path = tmp_path / "program.rpal"
+    path.write_text("Print 1")
+    modules = importedModules(myrpal("--startup-profile", "--no-cache", *options, path).stderr)
+    optional = {"CSE.memo", "CSE.opcodeMachine", "CSE.closureMachine", "CSE.nativeLibrary", "CSE.transpiler", "CSE.stats"}
+    assert modules & optional == ({module} if module else set())
@@ -0,0 +1,21 @@
+import json
+
+from support import myrpal
+from Tokenizer.tokenizer import tokenizeSource
+
+"""
+--stats reports the phases and counts of the run the CLI makes.
+"""
+
+def testStatsTimeTheLazyTokenizer(tmp_path):
+    source = "let rec f n = n eq 0 -> 1 | n * f (n - 1) in Print (f 10, 'text', (1, 2))"
+    path = tmp_path / "program.rpal"
+    path.write_text(source)
+    result = myrpal("--stats=json", path)
+    assert result.stdout == "(3628800, text, [1, 2])"
+    stats = json.loads(result.stderr)
+    phases = list(stats["phases"])
+    assert phases.index("tokenize") + 1 == phases.index("parse")
+    assert all(seconds >= 0 for seconds in stats["phases"].values())
+    assert stats["counts"]["tokens"] == len(tokenizeSource(source))
+    assert stats["machine"]["steps"] > 0
@@ -0,0 +1,111 @@
+import contextlib
+import io
+
+import pytest
+
+from Exception.RPALException import RPALException
+from Tokenizer.tokenizer import FIXED_VALUES, RELEASE_CHUNK, Token, TokenStream, scanFile, tokenize, tokenizeSource
+
+"""
+The tokenizer must produce the tokens, line numbers and warnings of the original
+line-based tokenizer, whose output on these sources is recorded below, on every
+path: source strings, lists of lines and memory-mapped files.
+"""
+
+# (source, (type, value, line number) of every token, warnings printed)
+CASES = [
+    (
+        "let x = 'a//b' in x",
+        [("KEYWORD", "let", 1), ("ID", "x", 1), ("OPERATOR", "=", 1), ("ID", "a", 1)],
+        "Warning: Unexpected character ''' at line 1\n",
+    ),
+    (
+        "Print ('it\\'s', 'a\\\\', '\\n\\t')",
+        [("ID", "Print", 1), ("(", "(", 1), ("STRING", "'it\\'s'", 1), (",", ",", 1), ("STRING", "'a\\\\'", 1), (",", ",", 1), ("STRING", "'\\n\\t'", 1), (")", ")", 1)],
+        "",
+    ),
+    (
+        "x>=1<=2->3**4 * -5 ls 6",
+        [("ID", "x", 1), ("OPERATOR", ">=", 1), ("INT", "1", 1), ("OPERATOR", "<=", 1), ("INT", "2", 1), ("OPERATOR", "->", 1), ("INT", "3", 1), ("OPERATOR", "**", 1), ("INT", "4", 1), ("OPERATOR", "*", 1), ("OPERATOR", "-", 1), ("INT", "5", 1), ("KEYWORD", "ls", 1), ("INT", "6", 1)],
+        "",
+    ),
+    (
+        "a_1 B2 _c 3x",
+        [("ID", "a_1", 1), ("ID", "B2", 1), ("OPERATOR", "_", 1), ("ID", "c", 1), ("INT", "3", 1), ("ID", "x", 1)],
+        "",
+    ),
+    (
+        "x é ✓ y",
+        [("ID", "x", 1), ("ID", "y", 1)],
+        "Warning: Unexpected character 'é' at line 1\nWarning: Unexpected character '✓' at line 1\n",
+    ),
+    (
+        "f(x;y,z) @g",
+        [("ID", "f", 1), ("(", "(", 1), ("ID", "x", 1), (";", ";", 1), ("ID", "y", 1), (",", ",", 1), ("ID", "z", 1), (")", ")", 1), ("OPERATOR", "@", 1), ("ID", "g", 1)],
+        "",
+    ),
+    (
+        "// only a comment\nPrint 1 // trailing\n'a' // 'b'",
+        [("ID", "Print", 2), ("INT", "1", 2), ("STRING", "'a'", 3)],
+        "",
+    ),
+    (
+        "let\r\n  rec f n =\n\n n eq 0 -> true | false\nin f 2",
+        [("KEYWORD", "let", 1), ("KEYWORD", "rec", 2), ("ID", "f", 2), ("ID", "n", 2), ("OPERATOR", "=", 2), ("ID", "n", 4), ("KEYWORD", "eq", 4), ("INT", "0", 4), ("OPERATOR", "->", 4), ("KEYWORD", "true", 4), ("OPERATOR", "|", 4), ("KEYWORD", "false", 4), ("KEYWORD", "in", 5), ("ID", "f", 5), ("INT", "2", 5)],
+        "",
+    ),
+]
+
+def tokensOf(scan, source):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tokens = list(scan(source))
+    return [(token.type, token.value, token.line_number) for token in tokens], output.getvalue()
+
+@pytest.mark.parametrize("source, tokens, warnings", CASES)
+def testSourceMatchesOldTokenizer(source, tokens, warnings):
+    assert tokensOf(tokenizeSource, source) == (tokens, warnings)
+
+@pytest.mark.parametrize("source, tokens, warnings", CASES)
+def testLinesMatchOldTokenizer(source, tokens, warnings):
+    assert tokensOf(tokenize, source.splitlines(keepends=True)) == (tokens, warnings)
+
+@pytest.mark.parametrize("source, tokens, warnings", CASES)
+def testFileMatchesOldTokenizer(source, tokens, warnings, tmp_path):
+    path = tmp_path / "program.rpal"
+    path.write_bytes(source.encode())
+    with open(path, "rb") as file:
+        assert tokensOf(scanFile, file) == (tokens, warnings)
+
+def testEmptyFile(tmp_path):
+    path = tmp_path / "empty.rpal"
+    path.write_bytes(b"")
+    with open(path, "rb") as file:
+        assert list(scanFile(file)) == []
+
+def testTokenStreamReleasesTokens():
+    stream = TokenStream(iter([Token("ID", "x", 1), Token("OPERATOR", "+", 1), Token("INT", "1", 2)]))
+    assert stream.matchType(0, "ID")
+    assert stream.matchValue(1, "+")
+    assert not stream.matchValue(2, "-")
+    assert stream.get(3) is None
+    stream.release(2)
+    assert stream.get(2).value == "1"
+    with pytest.raises(RPALException):
+        stream.get(0)
+    with pytest.raises(RPALException):
+        stream.matchValue(1, "+")
+
+def testTokenStreamWindowIsCompact():
+    tokens = tokenizeSource("let x = 'a' in (x, y, 12)" * 100)
+    stream = TokenStream(tokens)
+    for index, token in enumerate(tokens):
+        assert stream.matchType(index, token.type) and stream.matchValue(index, token.value)
+        assert not stream.matchValue(index, "never seen")
+        got = stream.get(index)
+        assert (got.type, got.value, got.line_number) == (token.type, token.value, token.line_number)
+        stream.release(index)
+    assert not stream.has(len(tokens))
+    assert len(stream.kinds) == len(stream.values) == len(stream.lines) < RELEASE_CHUNK
+    # x, y, 'a' and 12, each kept once
+    assert len(stream.strings) - len(FIXED_VALUES) == 4
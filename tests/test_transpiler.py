@@ -0,0 +1,50 @@
+import contextlib
+import hashlib
+import io
+import os
+
+import pytest
+
+from support import PROGRAMS, compileSource, myrpal, runProgram
+from Environment.Environment import Environment
+from CSE.transpiler import Transpiler, loadModule, writeModule
+from Interpreter.interpreter import PRIMITIVE_ENVIRONMENT_VARIABLES
+
+"""
+Transpiled programs (--compile, --run) must print what the CSE machine prints.
+"""
+
+def runTranspiled(source, directory):
+    """
+    Transpiles a program into a module in `directory`, imports it and runs it.
+
+    Returns:
+        str: What the program printed, or "Error: <message>" if it failed.
+    """
+    key = hashlib.sha256(source.encode()).digest()
+    path = os.path.join(str(directory), "program_rpal.py")
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            writeModule(path, Transpiler(compileSource(source)).transpile(key, "program.rpal"))
+            loadModule(path, key).main(Environment(0, variables=PRIMITIVE_ENVIRONMENT_VARIABLES))
+        except Exception as e:
+            print(f"Error: {e}", end="")
+    return output.getvalue()
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def testTranspiledProgramPrintsLikeCSEMachine(name, tmp_path):
+    source = PROGRAMS[name]
+    assert runTranspiled(source, tmp_path) == runProgram(source, "cse")
+
+def testCompileThenRun(tmp_path):
+    source = "let f x = (nil, x) in let g x = (x, nil) in Print (f 3, g 4, Order (g 4))"
+    path = tmp_path / "program.rpal"
+    path.write_text(source)
+    modulePath = myrpal("--compile", path).stdout.strip()
+    assert os.path.exists(modulePath)
+    modified = os.stat(modulePath).st_mtime_ns
+    assert myrpal("--run", path).stdout == runProgram(source, "cse")
+    # The module transpiled by --compile was current, so --run did not rewrite it
+    assert os.stat(modulePath).st_mtime_ns == modified
+    assert myrpal("--run", path).stdout == myrpal("--engine=cse", "--no-cache", path).stdout